@@ -1,14 +1,29 @@
-import uuid
+import json
+import time
 import logging
 from os import path
 from datetime import datetime
+from io import BytesIO
+from hashlib import sha256
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
 
 from indra.statements import Agent, Statement, stmts_from_json
-from indra.assemblers.html import HtmlAssembler
 from indra.util.statement_presentation import group_and_sort_statements, \
     make_string_from_sort_key
 
-from bioagents.settings import IMAGE_DIR, TIMESTAMP_PICS
+from bioagents.settings import IMAGE_DIR, TIMESTAMP_PICS, REQUEST_WORKERS, \
+    REQUEST_QUEUE_LIMIT, STATS_FILE, STATS_DUMP_INTERVAL, CLJSON_CACHE_SIZE, \
+    PROVENANCE_WORKERS, PROVENANCE_QUEUE_LIMIT, BATCH_WORKERS, \
+    BATCH_MAX_SIZE, TRAFFIC_RECORD_DIR, TASK_DEADLINES
+from bioagents.cache import LRUCache
+from bioagents.dispatch import RequestDispatcher
+from bioagents.metrics import TaskStats
+from bioagents.deadline import DeadlineExceeded, request_deadline, \
+    get_deadline
+from bioagents.replay import start_recording
+from bioagents.provenance import ProvenancePublisher, make_provenance_key, \
+    get_provenance_store
 from kqml.cl_json import CLJsonConverter
 
 logging.basicConfig(format='%(levelname)s: %(name)s - %(message)s',
@@ -16,7 +31,6 @@ logging.basicConfig(format='%(levelname)s: %(name)s - %(message)s',
 logger = logging.getLogger('Bioagents')
 
 
-from indra.assemblers.english import EnglishAssembler
 from kqml import KQMLModule, KQMLPerformative, KQMLList, KQMLString
 
 
@@ -25,17 +39,85 @@ class BioagentException(Exception):
 
 
 class Bioagent(KQMLModule):
-    """Abstract class for bioagents."""
+    """Abstract class for bioagents.
+
+    Each entry of `tasks` is either the name of a task, or a tuple of the name
+    and the maximum number of requests for that task that may be handled at
+    the same time when requests are handled by a pool of workers (see the
+    `num_workers` keyword argument and `settings.REQUEST_WORKERS`).
+
+    Every bioagent also handles the tasks in `builtin_tasks`, which are
+    common to all agents.
+
+    The sub-requests of a BATCH request for the tasks in
+    `parallel_safe_tasks` may be handled at the same time. Other tasks in a
+    batch are handled one after the other.
+
+    A request may have a deadline, given as a number of seconds in the
+    :deadline parameter of the request message, or else by the default for
+    its task in `task_deadlines`, which is updated with the deadlines set for
+    the agent in TASK_DEADLINES. Requests still waiting for a worker when
+    their deadline passes are answered with a TIMEOUT failure, and long
+    running code can check the deadline with the functions in
+    `bioagents.deadline`.
+    """
     name = "Generic Bioagent (Should probably be overwritten)"
     tasks = []
+    builtin_tasks = ['GET-AGENT-STATS', 'BATCH']
+    parallel_safe_tasks = []
+    task_deadlines = {}
     converter = CLJsonConverter(token_bools=True)
+    # Caches of CL-JSON conversions in both directions, shared by all agents
+    # in a process.
+    to_cljson_cache = LRUCache(CLJSON_CACHE_SIZE)
+    from_cljson_cache = LRUCache(CLJSON_CACHE_SIZE)
 
     def __init__(self, **kwargs):
+        num_workers = kwargs.pop('num_workers', REQUEST_WORKERS)
+        max_queue_size = kwargs.pop('max_queue_size', REQUEST_QUEUE_LIMIT)
+        stats_file = kwargs.pop('stats_file', STATS_FILE)
+        provenance_workers = kwargs.pop('provenance_workers',
+                                        PROVENANCE_WORKERS)
+        record_dir = kwargs.pop('record_dir', TRAFFIC_RECORD_DIR)
+        self.task_deadlines = dict(self.task_deadlines)
+        self.task_deadlines.update(TASK_DEADLINES.get(self.name, {}))
+        self._send_lock = Lock()
+        self.stats = TaskStats(self.name)
         super(Bioagent, self).__init__(name=self.name, **kwargs)
         self.my_log_file = self._add_log_file()
-        for task in self.tasks:
+        self.task_names, task_limits = \
+            _parse_tasks(self.tasks + self.builtin_tasks)
+        for task in self.task_names:
             self.subscribe_request(task)
 
+        if num_workers:
+            self._dispatcher = RequestDispatcher(num_workers, max_queue_size,
+                                                 task_limits, name=self.name)
+            logger.info("%s will handle requests with %d workers."
+                        % (self.name, num_workers))
+        else:
+            self._dispatcher = None
+
+        # Provenance is published in the background, except when testing,
+        # where the messages should be sent before the reply.
+        if provenance_workers and not self.testing:
+            self._provenance = \
+                ProvenancePublisher(provenance_workers, PROVENANCE_QUEUE_LIMIT,
+                                    name=self.name)
+        else:
+            self._provenance = None
+
+        if record_dir:
+            self._recorder = start_recording(self, record_dir)
+            logger.info("%s is recording its traffic in %s."
+                        % (self.name, record_dir))
+        else:
+            self._recorder = None
+
+        if stats_file:
+            stats_file = stats_file.format(name=self.name)
+            self.stats.start_periodic_dump(stats_file, STATS_DUMP_INTERVAL)
+
         self.ready()
         self.start()
         logger.info("%s has started and is ready." % self.name)
@@ -52,10 +134,26 @@ class Bioagent(KQMLModule):
         logger.addHandler(handler)
         return log_file_name
 
+    @classmethod
+    def _cl_to_json(cls, cl_entity):
+        """Convert cl-json into json, using the cache if possible.
+
+        The cache holds json strings so that each call gets fresh objects.
+        """
+        if not isinstance(cl_entity, KQMLList):
+            return cls.converter.cl_to_json(cl_entity)
+        key = cl_entity.to_string()
+        json_str = cls.from_cljson_cache.get(key)
+        if json_str is None:
+            entity_json = cls.converter.cl_to_json(cl_entity)
+            cls.from_cljson_cache.put(key, json.dumps(entity_json))
+            return entity_json
+        return json.loads(json_str)
+
     @classmethod
     def get_agent(cls, cl_agent):
         """Get an agent from the kqml cl-json representation (KQMLList)."""
-        agent_json = cls.converter.cl_to_json(cl_agent)
+        agent_json = cls._cl_to_json(cl_agent)
         if isinstance(agent_json, list):
             return [ensure_agent_type(Agent._from_json(agj))
                     for agj in agent_json]
@@ -65,7 +163,7 @@ class Bioagent(KQMLModule):
     @classmethod
     def get_statement(cls, cl_statement):
         """Get an INDRA Statement from cl-json"""
-        stmt_json = cls.converter.cl_to_json(cl_statement)
+        stmt_json = cls._cl_to_json(cl_statement)
         if not stmt_json:
             return None
         elif isinstance(stmt_json, list):
@@ -78,8 +176,20 @@ class Bioagent(KQMLModule):
         """Convert an Agent or a Statement into cljson.
 
         `entity` is expected to have a method `to_json` which returns valid
-        json.
+        json. The cl-json of Agents and Statements is cached, so the same
+        entities are not converted again and again.
         """
+        # Use the cache if all the entities are Agents or Statements.
+        if isinstance(entity, list):
+            keys = [_get_cljson_key(e) for e in entity]
+            if all(key is not None for key in keys):
+                return KQMLList([cls._get_cached_cljson(e, key)
+                                 for e, key in zip(entity, keys)])
+        else:
+            key = _get_cljson_key(entity)
+            if key is not None:
+                return cls._get_cached_cljson(entity, key)
+
         # Regularize the input to plain JSON
         if isinstance(entity, list):
             entity_json = [e.to_json() if hasattr(e, 'to_json')
@@ -91,6 +201,19 @@ class Bioagent(KQMLModule):
             entity_json = entity.copy()
         return cls.converter.cl_from_json(entity_json)
 
+    @classmethod
+    def _get_cached_cljson(cls, entity, key):
+        """Get the cl-json of an Agent or Statement, using the cache.
+
+        Each call gets a copy of the lists of the cached cl-json, so that
+        replies built from it can be changed without changing the cache.
+        """
+        cl_entity = cls.to_cljson_cache.get(key)
+        if cl_entity is None:
+            cl_entity = cls.converter.cl_from_json(entity.to_json())
+            cls.to_cljson_cache.put(key, cl_entity)
+        return _copy_kqml_lists(cl_entity)
+
     def receive_tell(self, msg, content):
         tell_content = content[0].to_string().upper()
         if tell_content == 'START-CONVERSATION':
@@ -116,17 +239,87 @@ class Bioagent(KQMLModule):
             reply_content = self.make_failure('INVALID_REQUEST')
             return self.reply_with_content(msg, reply_content)
 
-        if task in self.tasks:
-            reply_content = self._respond_to(task, content)
+        if self._recorder is not None and not hasattr(msg, 'record_id') \
+                and not isinstance(msg, _BatchItemMessage):
+            self._recorder.record_request(msg, task)
+
+        if task in self.task_names:
+            deadline = self._get_request_deadline(msg, task)
+            if deadline is not None and deadline <= time.time():
+                logger.warning("The deadline of a %s request passed before "
+                               "it was handled." % task)
+                reply_content = self.make_failure(
+                    'TIMEOUT',
+                    description='The deadline passed before the request '
+                                'could be handled.')
+                return self.reply_with_content(msg, reply_content)
+            # Hand the request over to the worker pool, if there is one. The
+            # worker calls receive_request again, so any error handling added
+            # by children around this method also applies to the worker.
+            if self._dispatcher is not None \
+                    and not self._dispatcher.is_worker_thread() \
+                    and not isinstance(msg, _BatchItemMessage):
+                if self._dispatcher.submit(task, self.receive_request, msg,
+                                           content):
+                    return
+                logger.warning("%s is saturated, refusing task %s."
+                               % (self.name, task))
+                reply_content = self.make_failure(
+                    'AGENT_BUSY',
+                    description='Too many requests are waiting to be handled.'
+                    )
+                return self.reply_with_content(msg, reply_content)
+            with request_deadline(deadline):
+                reply_content = self._respond_to(task, content)
         else:
             logger.error('Could not perform task.')
             logger.error("Task %s not found in %s." %
-                         (task, str(self.tasks)))
+                         (task, str(self.task_names)))
             reply_content = self.make_failure('UNKNOWN_TASK')
 
         return self.reply_with_content(msg, reply_content)
 
+    def _get_request_deadline(self, msg, task):
+        """Get the time stamp of the deadline of a request, or None.
+
+        The deadline is counted from when the request is first received, and
+        is stored on the message so that it holds while the request waits
+        for a worker. A request without a deadline of its own or of its task
+        inherits the deadline of the request being handled, if any.
+        """
+        try:
+            return msg.deadline_time
+        except AttributeError:
+            pass
+        seconds = None
+        deadline_arg = msg.get('deadline')
+        if deadline_arg is not None:
+            try:
+                seconds = float(deadline_arg.to_string())
+            except ValueError:
+                logger.warning('Ignoring invalid deadline: %s'
+                               % deadline_arg.to_string())
+        if seconds is None:
+            seconds = self.task_deadlines.get(task)
+        if seconds is not None:
+            deadline_time = time.time() + seconds
+        else:
+            deadline_time = get_deadline()
+        msg.deadline_time = deadline_time
+        return deadline_time
+
     def _respond_to(self, task, content):
+        """Respond to the task, recording statistics on the response."""
+        start = self.stats.start_task(task)
+        try:
+            reply_content = self._get_response(task, content)
+        except Exception as e:
+            self.stats.finish_task(task, start, error=e.__class__.__name__)
+            raise
+        self.stats.finish_task(task, start, reply_content)
+        return reply_content
+
+    def _get_response(self, task, content):
         """Get the method to responsd to the task indicated by task."""
         resp_name = "respond_" + task.replace('-', '_').lower()
         try:
@@ -140,6 +333,9 @@ class Bioagent(KQMLModule):
         try:
             reply_content = resp(content)
             return reply_content
+        except DeadlineExceeded as e:
+            logger.warning('%s: %s' % (task, e))
+            return self.make_failure('TIMEOUT', description=str(e))
         except BioagentException:
             raise
         except Exception as e:
@@ -149,9 +345,119 @@ class Bioagent(KQMLModule):
 
     def reply_with_content(self, msg, reply_content):
         """A wrapper around the reply method from KQMLModule."""
+        if isinstance(msg, _BatchItemMessage):
+            msg.reply_content = reply_content
+            return
+        if self._recorder is not None:
+            self._recorder.record_reply(msg, reply_content)
         reply_msg = KQMLPerformative('reply')
         reply_msg.set('content', reply_content)
-        self.reply(msg, reply_msg)
+        size = self.reply(msg, reply_msg)
+        try:
+            task = msg.get('content').head().upper()
+        except Exception:
+            task = 'INVALID_REQUEST'
+        self.stats.record_reply(task, size)
+        return
+
+    def reply(self, msg, reply_msg):
+        """Reply to a message, returning the size of the reply in bytes."""
+        sender = msg.get('sender')
+        if sender is not None:
+            reply_msg.set('receiver', sender)
+        reply_with = msg.get('reply-with')
+        if reply_with is not None:
+            reply_msg.set('in-reply-to', reply_with)
+        return self.send(reply_msg)
+
+    def send(self, msg):
+        """Send a message, returning the size of the message in bytes.
+
+        The message is serialized before it is written so that messages sent
+        from different threads don't interleave.
+        """
+        buff = BytesIO()
+        msg.write(buff)
+        data = buff.getvalue()
+        with self._send_lock:
+            try:
+                self.out.write(data)
+            except IOError:
+                logger.error('IOError during message sending')
+            self.out.write(b'\n')
+            self.out.flush()
+        return len(data)
+
+    def respond_get_agent_stats(self, content):
+        """Return the statistics collected on the requests handled so far."""
+        msg = KQMLList('SUCCESS')
+        msg.set('stats', self.make_cljson(self.get_agent_stats()))
+        return msg
+
+    def get_agent_stats(self):
+        """Get a dict of statistics, which agents may extend with their own."""
+        stats = self.stats.get_stats()
+        stats['to_cljson_cache'] = self.to_cljson_cache.get_stats()
+        stats['from_cljson_cache'] = self.from_cljson_cache.get_stats()
+        stats['queue_depth'] = self._dispatcher.get_queue_depth() \
+            if self._dispatcher is not None else 0
+        if self._provenance is not None:
+            stats['provenance'] = self._provenance.get_stats()
+        return stats
+
+    def respond_batch(self, content):
+        """Respond to each of a list of requests, returning all results.
+
+        The requests are given as a list of request contents under
+        :requests, and the reply contents are returned in the same order
+        under :results. A request that fails gives a FAILURE in the results
+        without affecting the other requests.
+        """
+        requests = content.get('requests')
+        if requests is None or not isinstance(requests, KQMLList):
+            return self.make_failure('MISSING_REQUESTS')
+        if len(requests) > BATCH_MAX_SIZE:
+            return self.make_failure(
+                'BATCH_TOO_LARGE',
+                description='At most %d requests may be batched.'
+                            % BATCH_MAX_SIZE)
+        items = [_BatchItemMessage(sub_content) for sub_content in requests]
+        tasks = {item.task for item in items}
+        num_workers = min(BATCH_WORKERS, len(items))
+        if num_workers > 1 and tasks <= set(self.parallel_safe_tasks):
+            deadline = get_deadline()
+
+            def respond_with_deadline(item):
+                with request_deadline(deadline):
+                    self._respond_to_batch_item(item)
+
+            with ThreadPoolExecutor(num_workers) as executor:
+                list(executor.map(respond_with_deadline, items))
+        else:
+            for item in items:
+                self._respond_to_batch_item(item)
+        results = KQMLList()
+        for item in items:
+            results.append(item.reply_content)
+        msg = KQMLList('SUCCESS')
+        msg.set('results', results)
+        return msg
+
+    def _respond_to_batch_item(self, item):
+        if item.task is None or item.task == 'BATCH' \
+                or item.task not in self.task_names:
+            item.reply_content = self.make_failure('UNKNOWN_TASK')
+            return
+        # The request goes through receive_request like any other, so that
+        # the error handling of children applies to it.
+        try:
+            self.receive_request(item, item.get('content'))
+        except Exception as e:
+            logger.exception(e)
+            item.reply_content = self.make_failure(
+                'INTERNAL_FAILURE', description=str(e))
+        if item.reply_content is None:
+            item.reply_content = self.make_failure('NO_REPLY')
         return
 
     def tell(self, content):
@@ -167,6 +473,9 @@ class Bioagent(KQMLModule):
         return self.send(msg)
 
     def error_reply(self, msg, comment):
+        if isinstance(msg, _BatchItemMessage):
+            msg.reply_content = self.make_failure('ERROR', comment)
+            return
         if not self.testing:
             return KQMLModule.error_reply(self, msg, comment)
         else:
@@ -183,6 +492,7 @@ class Bioagent(KQMLModule):
 
     def send_null_provenance(self, stmt, for_what, reason=''):
         """Send out that no provenance could be found for a given Statement."""
+        from indra.assemblers.english import EnglishAssembler
         content_fmt = ('<h4>No supporting evidence found for {statement} from '
                        '{cause}{reason}.</h4>')
         content = KQMLList('add-provenance')
@@ -195,8 +505,22 @@ class Bioagent(KQMLModule):
                                   ev_counts=None, source_counts=None):
         """Send out a provenance tell for a list of INDRA Statements.
 
-        The message is used to provide evidence supporting a conclusion.
+        The message is used to provide evidence supporting a conclusion. If
+        the agent has provenance workers, the report is assembled and sent in
+        the background, and a report identical to one still waiting to be
+        sent is dropped.
         """
+        if self._provenance is None:
+            return self._publish_provenance(stmt_list, for_what, limit,
+                                            ev_counts, source_counts)
+        key = (for_what, limit,
+               tuple(sorted(stmt.get_hash() for stmt in stmt_list)))
+        return self._provenance.publish(key, self._publish_provenance,
+                                        list(stmt_list), for_what, limit,
+                                        ev_counts, source_counts)
+
+    def _publish_provenance(self, stmt_list, for_what, limit, ev_counts,
+                            source_counts):
         logger.info("Sending provenance for %d statements for \"%s\"."
                     % (len(stmt_list), for_what))
         title = "Supporting evidence for %s" % for_what
@@ -214,78 +538,48 @@ class Bioagent(KQMLModule):
     def _make_evidence_html(stmts, ev_counts=None, source_counts=None,
                             title='Results from the INDRA database'):
         "Make html from a set of statements."
+        from indra.assemblers.html import HtmlAssembler
         ha = HtmlAssembler(stmts, db_rest_url='db.indra.bio', title=title,
                            ev_totals=ev_counts, source_counts=source_counts)
         return ha.make_model()
 
     @staticmethod
-    def _stash_evidence_html(html):
-        """Make html for a set of statements, return a link to the file.
-
-        The if the PROVENANCE_LOCATION environment variable determines where
-        the content is stored. The variable should be divided by colons, the
-        first division indicating whether the file is stored locally or on s3,
-        being either "file" or "s3" respectively.
-
-        If the html will be stored locally, the next and last division should
-        be a path (absolute would be best) to the location where html files
-        will be stored. For example:
+    def _stash_evidence_html(html, key=None):
+        """Store an html evidence page, returning a link to it.
 
-            file:/home/myname/projects/cwc-integ/provenance
-
-        If the html will be stored on s3, the next division should be the
-        bucket, and the last division should be a prefix to a "directory" where
-        the html files will be stored. For example:
-
-            s3:cwc-stuff:bob/provenance
-
-        The default is:
+        The page is stored at the location given by the PROVENANCE_LOCATION
+        environment variable (see `provenance.get_provenance_store`), named
+        by the given key or, by default, by a hash of its content. Returns
+        None if the location is not valid.
+        """
+        store = get_provenance_store()
+        if store is None:
+            logger.error("HTML not saved.")
+            return None
+        if key is None:
+            key = sha256(html.encode('utf-8')).hexdigest()
+        return store.put(key, html)
 
-            file:{this directory}/../../../provenance
+    def _get_evidence_link(self, stmts, ev_counts=None, source_counts=None,
+                           title='Results from the INDRA database'):
+        """Get a link to an evidence page for the statements.
 
-        Which should land in the cwc-integ directory. If the directory does not
-        yet exist, it will be created.
+        The page is only assembled if no page for the same statements and
+        counts has been stored already.
         """
-        # Get the provenance location.
-        from os import environ, mkdir
-
-        loc = environ.get('PROVENANCE_LOCATION')
-        if loc is None:
-            this_dir = path.dirname(path.abspath(__file__))
-            rel = path.join(*([this_dir] + 3*[path.pardir] + ['provenance']))
-            loc = 'file:' + path.abspath(rel)
-        logger.info("Using provenance location: \"%s\"" % loc)
-
-        # Save the file.
-        method = loc.split(':')[0]
-        fname = '%s.html' % uuid.uuid4()
-        if method == 'file':
-            prov_path = loc.split(':')[1]
-            if not path.exists(prov_path):
-                mkdir(prov_path)
-            fpath = path.join(prov_path, fname)
-            with open(fpath, 'w') as f:
-                f.write(html)
-            link = fpath
-        elif method == 's3':
-            bucket = loc.split(':')[1]
-            prefix = loc.split(':')[2]
-
-            # Get a connection to s3.
-            import boto3
-            from botocore import UNSIGNED
-            from botocore.client import Config
-            s3 = boto3.client('s3', config=Config(signature_version=UNSIGNED))
-
-            key = prefix + fname
-            link = 'https://s3.amazonaws.com/%s/%s' % (bucket, key)
-            s3.put_object(Bucket=bucket, Key=key, Body=html.encode('utf-8'),
-                          ContentType='text/html')
-        else:
-            logger.error('Invalid PROVENANCE_LOCATION: "%s". HTML not saved.'
-                         % loc)
-            link = None
-        return link
+        store = get_provenance_store()
+        if store is None:
+            logger.error("HTML not saved.")
+            return None
+        key = make_provenance_key(stmts, ev_counts, source_counts, title)
+        link = store.get_link(key)
+        if link is not None:
+            logger.info("Reusing stored evidence page: %s" % link)
+            return link
+        html = self._make_evidence_html(stmts, ev_counts=ev_counts,
+                                        source_counts=source_counts,
+                                        title=title)
+        return self._stash_evidence_html(html, key)
 
     def say(self, message):
         """Say something to the user."""
@@ -322,9 +616,8 @@ class Bioagent(KQMLModule):
 
         # Build the overall html.
         list_html = '<ul>%s</ul>' % ('\n'.join(lines))
-        html = self._make_evidence_html(stmt_list, ev_counts=ev_counts,
-                                        source_counts=source_counts, **kwargs)
-        link = self._stash_evidence_html(html)
+        link = self._get_evidence_link(stmt_list, ev_counts=ev_counts,
+                                       source_counts=source_counts, **kwargs)
         if link is None:
             link_html = 'I could not generate the full list.'
         elif link.startswith('http'):
@@ -347,6 +640,62 @@ class Bioagent(KQMLModule):
         return msg
 
 
+class _BatchItemMessage(KQMLPerformative):
+    """A request within a BATCH request, which holds its reply content."""
+    def __init__(self, content):
+        super(_BatchItemMessage, self).__init__('request')
+        self.set('content', content)
+        try:
+            self.task = content.head().upper()
+        except Exception:
+            self.task = None
+        self.reply_content = None
+
+
+def _get_cljson_key(entity):
+    """Get a key identifying the cl-json of an Agent or Statement.
+
+    The key of a Statement combines its uuid, which is part of its json, with
+    its shallow hash and the other content of its json that the hash doesn't
+    cover. The hash is the one cached by the Statement, so, as for other uses
+    of the hash, a Statement changed after it was hashed must have its hash
+    refreshed to get a new key. Agents are keyed by their json. Return None
+    for anything else.
+    """
+    if isinstance(entity, Statement):
+        return ('Statement', entity.uuid, entity.get_hash(shallow=True),
+                tuple(ag.name if ag is not None else None
+                      for ag in entity.agent_list()),
+                len(entity.evidence), entity.belief,
+                len(entity.supports), len(entity.supported_by))
+    elif isinstance(entity, Agent):
+        return ('Agent', json.dumps(entity.to_json(), sort_keys=True))
+    return None
+
+
+def _copy_kqml_lists(obj):
+    """Copy the KQMLLists nested in a KQML object, sharing their elements.
+
+    This is much faster than a deep copy, and enough for replies to be built
+    from the copy, since the elements are replaced rather than changed.
+    """
+    if isinstance(obj, KQMLList):
+        return KQMLList([_copy_kqml_lists(elem) for elem in obj.data])
+    return obj
+
+
+def _parse_tasks(tasks):
+    """Get the task names and concurrency limits from a list of tasks."""
+    task_names = []
+    task_limits = {}
+    for task in tasks:
+        if isinstance(task, tuple):
+            task, limit = task
+            task_limits[task] = limit
+        task_names.append(task)
+    return task_names, task_limits
+
+
 def get_img_path(img_name):
     """Get a full path for the given image name.
 
@@ -15,6 +15,7 @@ logging.basicConfig(format='%(levelname)s: %(name)s - %(message)s',
 class BioNLG_Module(Bioagent):
     name = 'BioNLG'
     tasks = ['INDRA-TO-NL']
+    parallel_safe_tasks = tasks
 
     def receive_request(self, msg, content):
         """Handle request messages and respond.
@@ -34,6 +35,8 @@ class BioNLG_Module(Bioagent):
         try:
             if task_str == 'INDRA-TO-NL':
                 reply_content = self.respond_indra_to_nl(content)
+            elif task_str in self.builtin_tasks:
+                reply_content = self._respond_to(task_str, content)
             else:
                 return self.error_reply(msg, 'Unknown task ' + task_str)
         except Exception as e:
@@ -1,26 +1,22 @@
 import logging
-from indra import __path__ as _indra_path
 from indra.databases import uniprot_client
-from indra.util import read_unicode_csv
 from indra.tools import expand_families
 from indra.preassembler.hierarchy_manager import hierarchies
 from indra.preassembler.grounding_mapper import default_grounding_map as gm
+from bioagents.resources.registry import registry
+from bioagents.resources.lexicon import get_lexicon
 
 
 logger = logging.getLogger('BioSense')
-_indra_path = _indra_path[0]
 
 
 class BioSense(object):
     """Python API for biosense agent"""
-    __slots__ = ['_kinase_list', '_tf_list', '_phosphatase_list',
-                 '_fplx_synonyms']
+    __slots__ = ['_lexicon', '_fplx_synonyms']
 
     def __init__(self):
-        self._kinase_list = _read_kinases()
-        self._tf_list = _read_tfs()
-        self._phosphatase_list = _read_phosphatases()
-        self._fplx_synonyms = _make_fplx_synonyms()
+        self._lexicon = get_lexicon()
+        self._fplx_synonyms = registry.get('fplx_synonyms')
 
     def choose_sense_category(self, agent, category):
         """Determine if an agent belongs to a particular category
@@ -51,14 +47,14 @@ class BioSense(object):
         reg_cat = reg_cat.replace('W::', '').replace('w::', '')
         logger.info("Regularized category to \"{}\".".format(reg_cat))
         if reg_cat in ['kinase', 'kinase activity']:
-            output = agent.name in self._kinase_list
+            output = self._lexicon.is_of_type(agent, 'kinase')
         elif reg_cat == 'transcription factor':
-            output = agent.name in self._tf_list
+            output = self._lexicon.is_of_type(agent, 'transcription factor')
         elif reg_cat == 'phosphatase':
-            output = agent.name in self._phosphatase_list
+            output = self._lexicon.is_of_type(agent, 'phosphatase')
         elif reg_cat == 'enzyme':
-            output = (agent.name in self._phosphatase_list or
-                      agent.name in self._kinase_list)
+            output = (self._lexicon.is_of_type(agent, 'phosphatase') or
+                      self._lexicon.is_of_type(agent, 'kinase'))
         else:
             logger.info("Regularized category %s not recognized: options "
                         "are %s." % (reg_cat, ['kinase', 'kinase activity',
@@ -158,29 +154,6 @@ def _get_members(agent):
     return children_agents
 
 
-def _read_phosphatases():
-    p_table = read_unicode_csv(_indra_path +
-                               '/resources/phosphatases.tsv', delimiter='\t')
-    # First column is phosphatase names
-    # Second column is HGNC ids
-    p_names = [row[0] for row in p_table]
-    return p_names
-
-
-def _read_kinases():
-    kinase_table = read_unicode_csv(_indra_path + '/resources/kinases.tsv',
-                                    delimiter='\t')
-    gene_names = [lin[1] for lin in list(kinase_table)[1:]]
-    return gene_names
-
-
-def _read_tfs():
-    tf_table = read_unicode_csv(_indra_path +
-                                '/resources/transcription_factors.csv')
-    gene_names = [lin[1] for lin in list(tf_table)[1:]]
-    return gene_names
-
-
 def _make_fplx_synonyms():
     fplx_synonyms = {}
     for txt, db_refs in gm.items():
@@ -195,6 +168,9 @@ def _make_fplx_synonyms():
     return fplx_synonyms
 
 
+registry.register('fplx_synonyms', _make_fplx_synonyms)
+
+
 class InvalidAgentError(ValueError):
     """raised if agent not recognized"""
     pass
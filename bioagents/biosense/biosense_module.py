@@ -29,6 +29,7 @@ class BioSense_Module(Bioagent):
     tasks = ['CHOOSE-SENSE', 'CHOOSE-SENSE-CATEGORY',
              'CHOOSE-SENSE-IS-MEMBER', 'CHOOSE-SENSE-WHAT-MEMBER',
              'GET-SYNONYMS', 'GET-INDRA-REPRESENTATION']
+    parallel_safe_tasks = tasks
 
     def respond_get_indra_representation(self, content):
         """Return the INDRA CL-JSON corresponding to the given content."""
@@ -0,0 +1,69 @@
+from threading import Lock
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """A thread-safe, size-bounded cache evicting least recently used items.
+
+    Parameters
+    ----------
+    max_size : int
+        The maximum number of items held. If 0, nothing is cached.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def get(self, key, default=None):
+        """Get the value for a key, counting the lookup as a hit or miss."""
+        with self._lock:
+            try:
+                value = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Add a value, evicting the least recently used ones if needed."""
+        if not self.max_size:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+        return
+
+    def pop(self, key, default=None):
+        """Remove a key from the cache, returning its value."""
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+        return
+
+    def get_stats(self):
+        """Get a dict of the size, hits, misses and evictions of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._items), 'max_size': self.max_size,
+                    'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': self.hits / lookups if lookups else None}
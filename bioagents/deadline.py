@@ -0,0 +1,67 @@
+import time
+from threading import local
+from contextlib import contextmanager
+
+_local = local()
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the deadline of the request being handled has passed."""
+    pass
+
+
+def get_deadline():
+    """Get the deadline (as a time stamp) of the request being handled.
+
+    Returns None if the request has no deadline.
+    """
+    return getattr(_local, 'deadline', None)
+
+
+@contextmanager
+def request_deadline(deadline):
+    """Set the deadline of the request handled by this thread.
+
+    Long running code can check the deadline with `time_left`,
+    `deadline_passed` or `check_deadline`. The deadline is a time stamp, as
+    returned by `time.time`, or None for no deadline.
+    """
+    previous = get_deadline()
+    _local.deadline = deadline
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def time_left():
+    """Get the number of seconds left until the deadline, or None."""
+    deadline = get_deadline()
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def deadline_passed():
+    """Return True if the deadline of the request has passed."""
+    left = time_left()
+    return left is not None and left <= 0
+
+
+def check_deadline(where=None):
+    """Raise DeadlineExceeded if the deadline of the request has passed."""
+    if deadline_passed():
+        msg = 'The deadline of the request has passed'
+        if where:
+            msg += ' while %s' % where
+        raise DeadlineExceeded(msg + '.')
+    return
+
+
+def limit_timeout(timeout):
+    """Shorten a timeout (in seconds) so it ends by the deadline."""
+    left = time_left()
+    if left is None:
+        return timeout
+    left = max(left, 0)
+    return left if timeout is None else min(timeout, left)
@@ -0,0 +1,120 @@
+import logging
+from collections import deque, defaultdict
+from threading import Thread, Condition, local
+
+logger = logging.getLogger('Bioagents')
+
+
+class RequestDispatcher(object):
+    """Run request handlers on a bounded pool of worker threads.
+
+    Parameters
+    ----------
+    num_workers : int
+        The number of worker threads in the pool.
+    max_queue_size : int
+        The maximum number of jobs that may be waiting for a worker. When this
+        many jobs are waiting, `submit` refuses new jobs. If 0, the number of
+        waiting jobs is not limited.
+    task_limits : dict or None
+        The maximum number of jobs of a given task that may run at once, keyed
+        by task name. Jobs beyond the limit are held back (and count towards
+        the queue size) until a job of the same task finishes. Tasks not in
+        the dict are only limited by the size of the pool.
+    name : str
+        A name used to label the worker threads.
+    """
+    def __init__(self, num_workers, max_queue_size=0, task_limits=None,
+                 name='Bioagent'):
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self.task_limits = task_limits if task_limits else {}
+        self._cond = Condition()
+        self._ready = deque()
+        self._held = defaultdict(deque)
+        self._active = defaultdict(lambda: 0)
+        self._num_waiting = 0
+        self._stopped = False
+        self._thread_info = local()
+        self._workers = []
+        for idx in range(num_workers):
+            th = Thread(target=self._work, name='%s-worker-%d' % (name, idx))
+            th.daemon = True
+            th.start()
+            self._workers.append(th)
+        return
+
+    def submit(self, task, func, *args):
+        """Queue `func(*args)` to be run as a job of the given task.
+
+        Returns True if the job was accepted and False if the dispatcher is
+        saturated or shut down.
+        """
+        with self._cond:
+            if self._stopped:
+                return False
+            if self.max_queue_size and \
+                    self._num_waiting >= self.max_queue_size:
+                return False
+            self._num_waiting += 1
+            job = (task, func, args)
+            limit = self.task_limits.get(task)
+            if limit and self._active[task] >= limit:
+                self._held[task].append(job)
+            else:
+                self._active[task] += 1
+                self._ready.append(job)
+                self._cond.notify()
+        return True
+
+    def is_worker_thread(self):
+        """Return True if called from one of this dispatcher's workers."""
+        return getattr(self._thread_info, 'is_worker', False)
+
+    def get_queue_depth(self):
+        """Return the number of jobs waiting for a worker."""
+        with self._cond:
+            return self._num_waiting
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs, optionally waiting for queued jobs to finish."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if wait:
+            for th in self._workers:
+                th.join()
+        return
+
+    def _next_job(self):
+        with self._cond:
+            while not self._ready and not self._stopped:
+                self._cond.wait()
+            if not self._ready:
+                return None
+            self._num_waiting -= 1
+            return self._ready.popleft()
+
+    def _finish_job(self, task):
+        with self._cond:
+            self._active[task] -= 1
+            if self._held[task]:
+                self._active[task] += 1
+                self._ready.append(self._held[task].popleft())
+                self._cond.notify()
+        return
+
+    def _work(self):
+        self._thread_info.is_worker = True
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            task, func, args = job
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error('Unhandled error while running %s.' % task)
+                logger.exception(e)
+            finally:
+                self._finish_job(task)
@@ -21,6 +21,8 @@ class DTDA_Module(Bioagent):
     tasks = ['IS-DRUG-TARGET', 'FIND-TARGET-DRUG', 'FIND-DRUG-TARGETS',
              'FIND-DISEASE-TARGETS', 'FIND-TREATMENT', 'GET-ALL-DRUGS',
              'GET-ALL-DISEASES', 'GET-ALL-GENE-TARGETS']
+    parallel_safe_tasks = ['IS-DRUG-TARGET', 'FIND-TARGET-DRUG',
+                           'FIND-DRUG-TARGETS']
 
     def __init__(self, **kwargs):
         # Instantiate a singleton DTDA agent
@@ -0,0 +1,123 @@
+"""Run several bioagents in a single process.
+
+Each agent keeps its own connection to the Facilitator and its own KQML
+identity, but resources loaded through the resource registry (such as the
+kinase, phosphatase and transcription factor tables, and INDRA's hierarchies
+and grounding map) are loaded once and shared by all agents. For example:
+
+    python -m bioagents.host MSA DTDA BioSense --port 6200
+"""
+import sys
+import logging
+import argparse
+import importlib
+from threading import Thread
+
+from bioagents.resources.registry import registry
+
+logger = logging.getLogger('Bioagents')
+
+
+# The agents that can be hosted, with the module and the name of the class
+# that implements each.
+AGENTS = {
+    'BioNLG': ('bioagents.bionlg.bionlg_module', 'BioNLG_Module'),
+    'BioSense': ('bioagents.biosense.biosense_module', 'BioSense_Module'),
+    'DTDA': ('bioagents.dtda.dtda_module', 'DTDA_Module'),
+    'MRA': ('bioagents.mra.mra_module', 'MRA_Module'),
+    'MSA': ('bioagents.msa.msa_module', 'MSA_Module'),
+    'QCA': ('bioagents.qca.qca_module', 'QCA_Module'),
+    'TRA': ('bioagents.tra.tra_module', 'TRA_Module'),
+    }
+
+
+def get_agent_class(agent_name):
+    """Import and return the class implementing the named agent."""
+    try:
+        module_name, class_name = AGENTS[agent_name]
+    except KeyError:
+        raise ValueError('Unknown agent %s, options are %s.'
+                         % (agent_name, ', '.join(sorted(AGENTS))))
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+class AgentHost(object):
+    """Start a set of bioagents in this process, each on its own thread.
+
+    Parameters
+    ----------
+    agent_names : list[str]
+        The names of the agents to start, as keys of AGENTS.
+    preload : bool
+        If True, all registered resources are loaded before any agent is
+        started, instead of when they are first used.
+    agent_kwargs : dict
+        Keyword arguments passed to every agent, for instance the host and
+        port of the Facilitator.
+    """
+    def __init__(self, agent_names, preload=False, **agent_kwargs):
+        # Import all the agents before starting any, so that the resources
+        # they register are known when preloading.
+        self.agent_classes = [get_agent_class(name) for name in agent_names]
+        self.agent_kwargs = agent_kwargs
+        self.preload = preload
+        self._threads = []
+
+    def _run_agent(self, agent_class):
+        try:
+            # The constructor of a bioagent only returns once its dispatcher
+            # has stopped.
+            agent_class(**self.agent_kwargs)
+        except SystemExit:
+            pass
+        except Exception as e:
+            logger.error('%s stopped with an error.' % agent_class.name)
+            logger.exception(e)
+        logger.info('%s has stopped.' % agent_class.name)
+        return
+
+    def start(self):
+        if self.preload:
+            logger.info('Loading resources: %s'
+                        % ', '.join(registry.get_names()))
+            registry.load_all()
+        for agent_class in self.agent_classes:
+            th = Thread(target=self._run_agent, args=(agent_class,),
+                        name=agent_class.name)
+            th.daemon = True
+            th.start()
+            self._threads.append(th)
+        return
+
+    def join(self):
+        """Wait until all agents have stopped."""
+        try:
+            for th in self._threads:
+                while th.is_alive():
+                    th.join(1)
+        except KeyboardInterrupt:
+            logger.info('Interrupted, stopping all agents.')
+        return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Run several bioagents in a single process.')
+    parser.add_argument('agents', nargs='+', choices=sorted(AGENTS),
+                        help='The agents to run.')
+    parser.add_argument('--host', default='localhost',
+                        help='The host of the Facilitator.')
+    parser.add_argument('--port', type=int, default=6200,
+                        help='The port of the Facilitator.')
+    parser.add_argument('--preload', action='store_true',
+                        help='Load all shared resources before starting.')
+    args = parser.parse_args(argv)
+    host = AgentHost(args.agents, preload=args.preload, host=args.host,
+                     port=args.port)
+    host.start()
+    host.join()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,153 @@
+import json
+import time
+import logging
+from bisect import bisect_left
+from threading import Lock, Thread, Event
+from collections import defaultdict
+
+logger = logging.getLogger('Bioagents')
+
+
+# The upper bounds (in seconds) of the latency histogram buckets. The last
+# bucket holds everything slower than the last bound.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                   30.0, 60.0)
+
+
+class _TaskRecord(object):
+    __slots__ = ['count', 'in_flight', 'total_time', 'max_time', 'histogram',
+                 'errors', 'num_replies', 'total_reply_size',
+                 'max_reply_size']
+
+    def __init__(self):
+        self.count = 0
+        self.in_flight = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.errors = defaultdict(lambda: 0)
+        self.num_replies = 0
+        self.total_reply_size = 0
+        self.max_reply_size = 0
+
+    def get_percentile(self, pct):
+        """Get the upper bound of the bucket holding the given percentile."""
+        if not self.count:
+            return None
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for idx, num in enumerate(self.histogram):
+            seen += num
+            if seen >= rank and num:
+                if idx < len(LATENCY_BUCKETS):
+                    return LATENCY_BUCKETS[idx]
+                break
+        return self.max_time
+
+    def to_json(self):
+        return {
+            'count': self.count,
+            'in_flight': self.in_flight,
+            'mean_latency': (self.total_time / self.count if self.count
+                             else None),
+            'max_latency': self.max_time,
+            'p50_latency': self.get_percentile(50),
+            'p95_latency': self.get_percentile(95),
+            'p99_latency': self.get_percentile(99),
+            'latency_histogram': [
+                {'le': LATENCY_BUCKETS[idx]
+                 if idx < len(LATENCY_BUCKETS) else 'inf', 'count': num}
+                for idx, num in enumerate(self.histogram)
+                ],
+            'errors': dict(self.errors),
+            'num_replies': self.num_replies,
+            'mean_reply_size': (self.total_reply_size / self.num_replies
+                                if self.num_replies else None),
+            'max_reply_size': self.max_reply_size,
+            }
+
+
+class TaskStats(object):
+    """Collect per-task statistics on the requests handled by a bioagent.
+
+    For each task this keeps the number of requests handled, the number
+    currently being handled, a histogram of latencies, the number of errors
+    by failure reason and the sizes of the replies.
+    """
+    def __init__(self, agent_name):
+        self.agent_name = agent_name
+        self.start_time = time.time()
+        self._lock = Lock()
+        self._tasks = defaultdict(_TaskRecord)
+
+    def start_task(self, task):
+        """Record the start of a request, returning the start time."""
+        with self._lock:
+            self._tasks[task].in_flight += 1
+        return time.time()
+
+    def finish_task(self, task, start, reply_content=None, error=None):
+        """Record the end of a request that started at the given time.
+
+        A reply with a FAILURE head is counted as an error with the reason of
+        the failure. If the request raised an exception instead, `error`
+        should be the name of the exception.
+        """
+        dt = time.time() - start
+        if error is None and reply_content is not None:
+            try:
+                if reply_content.head().upper() == 'FAILURE':
+                    error = reply_content.gets('reason') or 'UNKNOWN'
+            except Exception:
+                pass
+        with self._lock:
+            rec = self._tasks[task]
+            rec.in_flight -= 1
+            rec.count += 1
+            rec.total_time += dt
+            rec.max_time = max(rec.max_time, dt)
+            rec.histogram[bisect_left(LATENCY_BUCKETS, dt)] += 1
+            if error is not None:
+                rec.errors[error] += 1
+        return dt
+
+    def record_reply(self, task, size):
+        """Record the size (in bytes) of a reply sent for a task."""
+        with self._lock:
+            rec = self._tasks[task]
+            rec.num_replies += 1
+            rec.total_reply_size += size
+            rec.max_reply_size = max(rec.max_reply_size, size)
+        return
+
+    def get_stats(self):
+        """Get a json-able dict of all the statistics."""
+        with self._lock:
+            tasks = {task: rec.to_json() for task, rec in self._tasks.items()}
+        return {'agent': self.agent_name,
+                'uptime': time.time() - self.start_time,
+                'tasks': tasks}
+
+    def dump(self, fname):
+        """Write the statistics as json to the given file."""
+        with open(fname, 'w') as f:
+            json.dump(self.get_stats(), f, indent=1)
+        return
+
+    def start_periodic_dump(self, fname, interval):
+        """Start a thread dumping the statistics every `interval` seconds."""
+        stop_event = Event()
+
+        def dump_until_stopped():
+            while not stop_event.wait(interval):
+                try:
+                    self.dump(fname)
+                except Exception as e:
+                    logger.error('Could not dump statistics to %s.' % fname)
+                    logger.exception(e)
+
+        th = Thread(target=dump_until_stopped,
+                    name='%s-stats-dump' % self.agent_name)
+        th.daemon = True
+        th.start()
+        return stop_event
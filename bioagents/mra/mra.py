@@ -7,13 +7,12 @@ import os
 import copy
 import json
 import logging
-import networkx
 import subprocess
 from datetime import datetime
 
-import kappy
-
 from bioagents import get_img_path
+from bioagents.resources.registry import registry
+from bioagents.deadline import deadline_passed
 from indra.sources import trips
 from indra.statements import Complex, Activation, IncreaseAmount, \
     stmts_from_json
@@ -21,12 +20,6 @@ from indra.preassembler.hierarchy_manager import hierarchies
 from indra.assemblers.pysb import assembler as pysb_assembler
 from indra.assemblers.pysb import PysbAssembler
 from pysb.bng import BngInterfaceError
-from pysb.tools import render_reactions
-
-from pysb.export import export
-from indra.assemblers.pysb.kappa_util import im_json_to_graph, cm_json_to_graph
-from bioagents.mra.sbgn_colorizer import SbgnColorizer
-from bioagents.mra.model_diagnoser import ModelDiagnoser
 logger = logging.getLogger('MRA')
 
 
@@ -301,6 +294,7 @@ class MRA(object):
     def run_diagnoser(self, res, model_stmts, model_exec):
         # Use a model diagnoser to identify explanations given the executable
         # model, the current statements, and the explanation goal
+        from bioagents.mra.model_diagnoser import ModelDiagnoser
         if self.explain:
             md = ModelDiagnoser(model_stmts, model=model_exec,
                                 explain=self.explain)
@@ -408,12 +402,21 @@ def get_ambiguities(tp):
 
 
 def make_diagrams(pysb_model, model_id, current_model, context=None):
+    """Make the diagrams of a model, as many as the deadline allows.
+
+    Diagrams not made because the deadline of the request passed are None.
+    """
+    diagrams = {'reactionnetwork': None, 'contactmap': None,
+                'influencemap': None, 'sbgn': None}
+    if deadline_passed():
+        logger.warning('Deadline passed, not making model diagrams.')
+        return diagrams
     sbgn = make_sbgn(pysb_model, model_id)
     if sbgn is not None:
         sbgn = sbgn.encode('utf-8')
         if context:
             try:
-                cell_line = ccle_map[context]
+                cell_line = get_ccle_map()[context]
             except KeyError:
                 logger.info('Could not find profile info for %s cell line' %
                             context)
@@ -422,6 +425,7 @@ def make_diagrams(pysb_model, model_id, current_model, context=None):
             cell_line = 'A375_SKIN'
         try:
             logger.info('Coloring SBGN to %s cell line.' % cell_line)
+            from bioagents.mra.sbgn_colorizer import SbgnColorizer
             colorizer = SbgnColorizer(sbgn)
             colorizer.set_style_expression_mutation(current_model,
                                                     cell_line=cell_line)
@@ -430,11 +434,17 @@ def make_diagrams(pysb_model, model_id, current_model, context=None):
             logger.error('Could not set SBGN colors')
             logger.error(e)
 
-    rxn = draw_reaction_network(pysb_model, model_id)
-    cm = draw_contact_map(pysb_model, model_id)
-    im = draw_influence_map(pysb_model, model_id)
-    diagrams = {'reactionnetwork': rxn, 'contactmap': cm,
-                'influencemap': im, 'sbgn': sbgn}
+    diagrams['sbgn'] = sbgn
+
+    drawers = [('reactionnetwork', draw_reaction_network),
+               ('contactmap', draw_contact_map),
+               ('influencemap', draw_influence_map)]
+    for diagram_type, draw in drawers:
+        if deadline_passed():
+            logger.warning('Deadline passed, not drawing %s or later '
+                           'diagrams.' % diagram_type)
+            break
+        diagrams[diagram_type] = draw(pysb_model, model_id)
     return diagrams
 
 
@@ -459,6 +469,7 @@ def make_sbgn(pysb_model, model_id):
 
 def draw_influence_map(pysb_model, model_id):
     """Generate a Kappa influence map, draw it and save it as a PNG."""
+    import networkx
     try:
         im = make_influence_map(pysb_model)
         fname = make_pic_name(model_id, 'im') + '.png'
@@ -501,6 +512,7 @@ def make_contact_map(pysb_model):
 
 def draw_reaction_network(pysb_model, model_id):
     """Generate a PySB/BNG reaction network as a PNG file."""
+    from pysb.tools import render_reactions
     try:
         for m in pysb_model.monomers:
             pysb_assembler.set_extended_initial_condition(pysb_model, m, 0)
@@ -535,4 +547,9 @@ def make_ccle_map():
     return ccle_map
 
 
-ccle_map = make_ccle_map()
+registry.register('ccle_map', make_ccle_map)
+
+
+def get_ccle_map():
+    """Return the map of cell line names to CCLE names, loading it once."""
+    return registry.get('ccle_map')
@@ -3,7 +3,7 @@ import sys
 import json
 import random
 import logging
-from threading import Thread
+from threading import Thread, RLock
 
 import pysb.export
 
@@ -43,6 +43,9 @@ class MRA_Module(Bioagent):
     def __init__(self, **kwargs):
         # Instantiate a singleton MRA agent
         self.mra = MRA()
+        # All tasks read or change the shared models, so when requests are
+        # handled by a pool of workers, they are handled one at a time.
+        self._model_lock = RLock()
         super(MRA_Module, self).__init__(**kwargs)
         self.have_explanation = False
 
@@ -67,6 +70,10 @@ class MRA_Module(Bioagent):
         self.reply_with_content(msg, reply_content)
         return
 
+    def _respond_to(self, task, content):
+        with self._model_lock:
+            return super(MRA_Module, self)._respond_to(task, content)
+
     def respond_build_model(self, content):
         """Return response content to build-model request."""
         descr_format = content.gets('format')
@@ -0,0 +1,108 @@
+"""An index of ActiveForm statements by agent and modification site."""
+import os
+import pickle
+import logging
+from collections import defaultdict
+
+from indra.statements import ActiveForm
+
+from bioagents.msa.local_index import get_agent_keys
+
+logger = logging.getLogger('MSA')
+
+
+class ActiveFormIndex(object):
+    """ActiveForm statements indexed by agent grounding and modified site.
+
+    Only ActiveForm statements of one agent with at least one phosphorylation
+    are kept, as the others never match a phosphorylation site. Each is
+    indexed under each grounding of its agent and, for each of its
+    modifications, under (mod type, residue, position, is_active).
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        The statements to index, in order.
+    """
+    def __init__(self, stmts):
+        self.statements = []
+        self._hashes = set()
+        self._by_agent = defaultdict(set)
+        self._by_site = defaultdict(set)
+        self.add(stmts)
+
+    def add(self, stmts):
+        """Index more statements, skipping those already indexed."""
+        for stmt in stmts:
+            if not isinstance(stmt, ActiveForm):
+                continue
+            stmt_hash = stmt.get_hash(shallow=True)
+            if stmt_hash in self._hashes:
+                continue
+            ags = stmt.agent_list()
+            if len(ags) != 1:
+                logger.warning("Got an unexpected statement with 2 agents "
+                               "for ActiveForms: %s" % str(stmt))
+                continue
+            if not any(mc.mod_type == 'phosphorylation'
+                       for mc in stmt.agent.mods):
+                continue
+            idx = len(self.statements)
+            self.statements.append(stmt)
+            self._hashes.add(stmt_hash)
+            for key in get_agent_keys(stmt.agent):
+                self._by_agent[key].add(idx)
+            for mc in stmt.agent.mods:
+                self._by_site[(mc.mod_type, mc.residue, mc.position,
+                               stmt.is_active)].add(idx)
+        return
+
+    def __len__(self):
+        return len(self.statements)
+
+    @classmethod
+    def from_file(cls, fname):
+        """Load an index saved with `save`."""
+        with open(fname, 'rb') as fh:
+            return pickle.load(fh)
+
+    def save(self, fname):
+        dirname = os.path.dirname(fname)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(fname, 'wb') as fh:
+            pickle.dump(self, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def find(self, agent_keys=None, residue=None, position=None, action=None,
+             polarity=None):
+        """Get the statements of some agents activated by a modified site.
+
+        Parameters
+        ----------
+        agent_keys : iterable[str] or None
+            Keys such as 6840@HGNC, one of which the agent of the statements
+            must have. If None, statements of any agent are found.
+        residue, position, action, polarity : str or None
+            The site, modification (e.g. phosphorylation) and polarity
+            (activating or inhibiting) of the statements. If all are None,
+            all statements are found. Otherwise, those not given must be
+            None in the statements, and the statements are inhibiting unless
+            the polarity is activating.
+
+        Returns
+        -------
+        list[indra.statements.ActiveForm]
+            The matching statements, in the order they were indexed.
+        """
+        if all(val is None for val in (residue, position, action, polarity)):
+            matches = set(range(len(self.statements)))
+        else:
+            is_active = (polarity == 'activating')
+            matches = set(self._by_site.get((action, residue, position,
+                                             is_active), set()))
+        if agent_keys is not None:
+            agent_matches = set()
+            for key in agent_keys:
+                agent_matches |= self._by_agent.get(key, set())
+            matches &= agent_matches
+        return [self.statements[idx] for idx in sorted(matches)]
@@ -0,0 +1,133 @@
+"""A compact store for the large lists of statements found by the MSA.
+
+A query about a well studied protein may find tens of thousands of
+statements, each with its evidence. The CompactStatements store keeps, for
+each statement, a small record with its hash, type, agents, group keys and
+evidence count, which is all the summaries of a finder need, and the rest of
+the statement as compressed JSON. Full Statements are only made when they are
+asked for, for instance to be exported, and are not kept by the store.
+"""
+import sys
+import json
+import zlib
+import logging
+
+from indra.statements import stmts_from_json
+
+from bioagents.msa.grouping import get_group_keys
+
+logger = logging.getLogger('MSA')
+
+
+class AgentRecord(object):
+    """The name and grounding of an agent, shared by the records using it."""
+    __slots__ = ('name', 'db_refs')
+
+    def __init__(self, name, db_refs):
+        self.name = name
+        self.db_refs = db_refs
+
+    def __repr__(self):
+        return 'AgentRecord(%s)' % self.name
+
+
+class StatementRecord(object):
+    """The hash, type and agents of a statement, and the statement compressed.
+
+    A record may stand in for its statement where only its hash and agents are
+    used, such as in `StatementFinder.get_other_agents_for_stmt`. It also
+    keeps the keys of the groups of its statement (see `get_group_keys`) and
+    its evidence count, so that the top groups are found from the records.
+    """
+    __slots__ = ('stmt_hash', 'type_name', 'agents', 'group_keys',
+                 'num_evidence', 'data')
+
+    def __init__(self, stmt_hash, type_name, agents, group_keys,
+                 num_evidence, data):
+        self.stmt_hash = stmt_hash
+        self.type_name = type_name
+        self.agents = agents
+        self.group_keys = group_keys
+        self.num_evidence = num_evidence
+        self.data = data
+
+    def get_hash(self, shallow=True, refresh=False):
+        return self.stmt_hash
+
+    def agent_list(self):
+        return list(self.agents)
+
+    def to_json(self, evidence=True):
+        stmt_json = json.loads(zlib.decompress(self.data).decode('utf-8'))
+        if not evidence:
+            stmt_json['evidence'] = []
+            stmt_json.pop('supports', None)
+            stmt_json.pop('supported_by', None)
+        return stmt_json
+
+    def __repr__(self):
+        return '%s(%s)' % (self.type_name,
+                           ', '.join(str(ag) for ag in self.agents))
+
+
+class CompactStatements(object):
+    """A list of statements kept as StatementRecords.
+
+    Indexing or slicing the store makes new Statements from the records, so
+    `store[:]` is a list of all the statements, like for a list of statements.
+    The records themselves are in the `records` attribute.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        The statements to store, in order.
+    """
+    def __init__(self, stmts):
+        self.records = []
+        self._agents = {}
+        for stmt in stmts:
+            agents = tuple(self._get_agent_record(ag)
+                           for ag in stmt.agent_list())
+            data = zlib.compress(json.dumps(stmt.to_json()).encode('utf-8'))
+            self.records.append(
+                StatementRecord(stmt.get_hash(shallow=True),
+                                sys.intern(type(stmt).__name__), agents,
+                                tuple(get_group_keys(stmt)),
+                                len(stmt.evidence), data))
+        # The agents are only interned while the records are made.
+        self._agents = None
+        logger.info('Stored %d statements in %d compressed bytes.'
+                    % (len(self.records), self.get_size()))
+
+    def _get_agent_record(self, agent):
+        if agent is None:
+            return None
+        key = (agent.name, json.dumps(agent.db_refs, sort_keys=True))
+        record = self._agents.get(key)
+        if record is None:
+            record = AgentRecord(agent.name, dict(agent.db_refs))
+            self._agents[key] = record
+        return record
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.materialize(self.records[item])
+        return self.materialize([self.records[item]])[0]
+
+    def materialize(self, records=None, evidence=True):
+        """Make the Statements of some records, by default all of them.
+
+        If evidence is False, the statements are made without their evidence,
+        which is much faster when only their type and agents are needed.
+        """
+        if records is None:
+            records = self.records
+        return stmts_from_json([record.to_json(evidence)
+                                for record in records])
+
+    def get_size(self):
+        """Get the number of bytes of the compressed statements."""
+        return sum(len(record.data) for record in self.records)
@@ -0,0 +1,95 @@
+"""Write the statements found by the MSA to files, one statement at a time.
+
+Each exporter takes an iterable of statements and a file-like object, and
+writes each statement as it comes, so that only one statement needs to be in
+memory at a time when the statements are made one by one, for instance from
+a CompactStatements store.
+"""
+import os
+import json
+import pickle
+import logging
+import tempfile
+
+logger = logging.getLogger('MSA')
+
+
+def make_export_path(suffix, dirname=None, prefix='indrabot_'):
+    """Create a new, empty file to export to and return its path.
+
+    The name of the file is unique, so that exports made at the same time,
+    for instance for different users, don't overwrite each other. By
+    default, the file is made in the current directory.
+    """
+    fd, fname = tempfile.mkstemp(suffix=suffix, prefix=prefix,
+                                 dir=dirname if dirname else os.getcwd())
+    os.close(fd)
+    return fname
+
+
+def get_tsv_line(stmt):
+    """Get the line of a statement with the text and PMID of its evidence."""
+    if not stmt.evidence:
+        logger.warning('Statement %s without evidence' % stmt.uuid)
+        txt = ''
+        pmid = ''
+    else:
+        txt = stmt.evidence[0].text if stmt.evidence[0].text else ''
+        pmid = stmt.evidence[0].pmid if stmt.evidence[0].pmid else ''
+    return '%s\t%s\t%s\n' % (stmt, txt, pmid)
+
+
+def write_tsv(stmts, fh):
+    """Write a line for each statement to a text file, returning the count."""
+    num = 0
+    for stmt in stmts:
+        fh.write(get_tsv_line(stmt))
+        num += 1
+    return num
+
+
+def write_jsonl(stmts, fh):
+    """Write the JSON of each statement on its own line, returning the count.
+
+    Unlike a JSON list, the file can be read one statement at a time, for
+    instance with `read_jsonl`.
+    """
+    num = 0
+    for stmt in stmts:
+        fh.write(json.dumps(stmt.to_json()))
+        fh.write('\n')
+        num += 1
+    return num
+
+
+def read_jsonl(fh):
+    """Yield the statement JSONs of a file written by `write_jsonl`."""
+    for line in fh:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write_pickle(stmts, fh):
+    """Pickle each statement in turn to a binary file, returning the count.
+
+    The file holds a sequence of pickled statements rather than a pickled
+    list, and is read with `read_pickle`.
+    """
+    pickler = pickle.Pickler(fh, protocol=pickle.HIGHEST_PROTOCOL)
+    num = 0
+    for stmt in stmts:
+        pickler.dump(stmt)
+        # Statements are not shared between each other, so there is no need
+        # to remember those already written.
+        pickler.clear_memo()
+        num += 1
+    return num
+
+
+def read_pickle(fh):
+    """Yield the statements of a file written by `write_pickle`."""
+    while True:
+        try:
+            yield pickle.load(fh)
+        except EOFError:
+            return
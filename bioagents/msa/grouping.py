@@ -0,0 +1,94 @@
+"""Group the statements found by the MSA by type and agents for summaries.
+
+The groups are those of `indra.util.statement_presentation.
+group_and_sort_statements`, whose keys can be turned into summary statements
+with `make_stmt_from_sort_key`. Here, only the top groups are sorted, and the
+statements may be the StatementRecords of a CompactStatements store, which
+keep the keys of their statement.
+"""
+import heapq
+from itertools import permutations
+from collections import defaultdict
+
+
+def _name(agent):
+    return 'None' if agent is None else agent.name
+
+
+def get_group_keys(stmt):
+    """Get the keys of the groups of a statement.
+
+    A Complex of two to five distinct agents is in a group for each ordered
+    pair of its agents, and, unless it has two agents, in a group of all its
+    agents. Other statements are in one group.
+    """
+    verb = type(stmt).__name__
+    ags = stmt.agent_list()
+    if verb == 'Complex':
+        names = {_name(ag) for ag in ags}
+        keys = []
+        if 1 < len(names) < 6:
+            keys += [(verb,) + pair for pair in permutations(names, 2)]
+        if len(names) != 2:
+            keys.append((verb,) + tuple(sorted(names)))
+        return keys
+    if verb == 'Conversion':
+        return [(verb, _name(stmt.subj),
+                 tuple(sorted({_name(ag) for ag in stmt.obj_from})),
+                 tuple(sorted({_name(ag) for ag in stmt.obj_to})))]
+    if verb == 'ActiveForm':
+        return [(verb, _name(ags[0]), stmt.activity, stmt.is_active)]
+    if verb == 'HasActivity':
+        return [(verb, _name(ags[0]), stmt.activity, stmt.has_activity)]
+    return [(verb,) + tuple(_name(ag) for ag in ags)]
+
+
+def get_top_groups(stmts, ev_totals, num):
+    """Get the sort keys and verbs of the top groups of statements.
+
+    The groups are the first `num` of `group_and_sort_statements`, in the same
+    order, but only the groups shown are sorted, and the statements within
+    them are not sorted at all.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement or StatementRecord]
+        The statements to group, or their records.
+    ev_totals : dict or None
+        The evidence totals of the statements keyed by hash. The statements
+        without a total count their evidence.
+    num : int
+        The number of groups to get.
+    """
+    stmt_counts = defaultdict(int)
+    arg_counts = defaultdict(int)
+    # Whether all the statements of a key have more than two distinct agents.
+    all_large = {}
+    for stmt in stmts:
+        count = ev_totals.get(stmt.get_hash()) if ev_totals else None
+        if count is None:
+            count = stmt.num_evidence if hasattr(stmt, 'num_evidence') \
+                else len(stmt.evidence)
+        keys = stmt.group_keys if hasattr(stmt, 'group_keys') \
+            else get_group_keys(stmt)
+        for key in keys:
+            stmt_counts[key] += count
+            if key[0] == 'Conversion':
+                for obj in key[2] + key[3]:
+                    arg_counts[(key[1], obj)] += count
+            else:
+                arg_counts[key[1:]] += count
+            if key[0] == 'Complex':
+                is_large = len(set(_name(ag) for ag in stmt.agent_list())) > 2
+                all_large[key] = all_large.get(key, True) and is_large
+
+    def get_rows():
+        for key, sub_count in stmt_counts.items():
+            verb, inps = key[0], key[1:]
+            arg_count = arg_counts[inps]
+            if verb == 'Complex' and sub_count == arg_count \
+                    and len(inps) <= 2 and all_large[key]:
+                continue
+            yield (arg_count, inps, sub_count, verb), verb
+
+    return heapq.nlargest(num, get_rows(), key=lambda row: row[0])
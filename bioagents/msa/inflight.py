@@ -0,0 +1,99 @@
+"""Share statement queries in progress between identical finders."""
+import copy
+import logging
+from threading import Lock
+
+logger = logging.getLogger('MSA')
+
+
+class SharedProcessor(object):
+    """A view of a processor whose query was started by another finder.
+
+    The view waits on, and reads the counts of, the shared processor. Its
+    statements are copies of those of the shared processor, made when first
+    read, so that finders sharing a query can't change each other's results.
+    """
+    def __init__(self, processor):
+        self._processor = processor
+        self._statements = None
+        self._statements_sample = None
+
+    def __getattr__(self, item):
+        return getattr(self._processor, item)
+
+    @property
+    def statements(self):
+        if self._statements is None:
+            if self._processor.is_working():
+                # Like the processor, there are no statements until it is done.
+                return []
+            self._statements = copy.deepcopy(self._processor.statements)
+        return self._statements
+
+    @property
+    def statements_sample(self):
+        if self._statements_sample is None:
+            sample = self._processor.statements_sample
+            if sample is None:
+                return None
+            self._statements_sample = copy.deepcopy(sample)
+        return self._statements_sample
+
+    def get_hash_statements_dict(self):
+        # The statements in this dict are always made afresh.
+        return self._processor.get_hash_statements_dict()
+
+
+class InFlightQueries(object):
+    """A registry of the statement queries in progress, by query key.
+
+    The first finder to make a query starts it, and identical queries made
+    while it is in progress share its processor through a SharedProcessor.
+    Each query counts the finders sharing it, and is removed from the
+    registry once it is done, after which its results come from the cache.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._queries = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def acquire(self, key, start):
+        """Get the processor of a query, starting it with `start` if needed.
+
+        `start` must not block until the query is done. Returns the processor
+        and whether it was started by this call.
+        """
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is not None:
+                entry[1] += 1
+                self.coalesced += 1
+                logger.info('Sharing the query in progress for %s with %d '
+                            'finders.' % (key, entry[1]))
+                return SharedProcessor(entry[0]), False
+            processor = start()
+            self._queries[key] = [processor, 1]
+            self.started += 1
+        return processor, True
+
+    def release(self, key):
+        """Remove a query that is done."""
+        with self._lock:
+            self._queries.pop(key, None)
+        return
+
+    def get_num_sharing(self, key):
+        """Get the number of finders sharing a query, or 0 if not in flight."""
+        with self._lock:
+            entry = self._queries.get(key)
+            return entry[1] if entry is not None else 0
+
+    def get_stats(self):
+        with self._lock:
+            return {'in_flight': len(self._queries), 'started': self.started,
+                    'coalesced': self.coalesced}
+
+
+# The registry shared by the finders in a process.
+in_flight_queries = InFlightQueries()
@@ -0,0 +1,195 @@
+"""A local, in-memory stand in for the statement queries of the INDRA DB."""
+import copy
+import json
+import pickle
+import logging
+from collections import defaultdict, Counter
+
+from indra.statements import stmts_from_json, get_all_descendants, \
+    get_statement_by_name, Complex
+
+from bioagents.settings import STATEMENT_INDEX_FILE
+from bioagents.resources.registry import registry
+from bioagents.msa.statement_cache import StaticProcessor
+
+logger = logging.getLogger('MSA')
+
+
+def load_statements(fname):
+    """Load a list of statements from an INDRA JSON or a pickle file.
+
+    Pickle files may hold a list of statements, or a dict of lists of
+    statements, as dumped by `scripts/make_db_ndex.py`.
+    """
+    if fname.endswith('.json'):
+        with open(fname, 'r') as fh:
+            return stmts_from_json(json.load(fh))
+    with open(fname, 'rb') as fh:
+        stmts = pickle.load(fh)
+    if isinstance(stmts, dict):
+        stmts = [stmt for stmt_list in stmts.values() for stmt in stmt_list]
+    return stmts
+
+
+def get_agent_roles(stmt):
+    """Yield each agent of a statement with its role, as in the INDRA DB.
+
+    The members of a Complex are OTHER. In other statements, the first agent
+    is the SUBJECT, the second is the OBJECT, and any others are OTHER.
+    """
+    for idx, agent in enumerate(stmt.agent_list()):
+        if agent is None:
+            continue
+        if isinstance(stmt, Complex) or idx > 1:
+            role = 'OTHER'
+        else:
+            role = ['SUBJECT', 'OBJECT'][idx]
+        yield agent, role
+
+
+def get_agent_keys(agent):
+    """Get the keys (e.g. MAP2K1@TEXT, 6840@HGNC) by which an agent is found."""
+    keys = {'%s@%s' % (dbi, dbn) for dbn, dbi in agent.db_refs.items()
+            if isinstance(dbi, str)}
+    keys.add('%s@TEXT' % agent.name)
+    return keys
+
+
+class LocalStatementIndex(object):
+    """An index of statements by agent grounding, role and statement type.
+
+    The `query` method takes the arguments of `indra_db_rest.get_statements`
+    and returns a StaticProcessor, so the statement finders of the MSA can
+    run against a local dump of statements instead of the database.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        The statements to index. Statements with the same hash are merged,
+        and their evidence is combined.
+    ev_counts : dict or None
+        The total evidence counts keyed by statement hash (as a string), for
+        statements whose evidence is not all included. By default, the
+        evidence of each statement is counted.
+    source_counts : dict or None
+        Similarly, the evidence counts by source keyed by statement hash.
+    """
+    def __init__(self, stmts, ev_counts=None, source_counts=None):
+        self.statements = []
+        self.ev_counts = []
+        self.source_counts = []
+        self.hashes = []
+        # Map (agent key, role) and statement type to statement indices.
+        self._by_agent = defaultdict(set)
+        self._by_type = defaultdict(set)
+
+        by_hash = {}
+        for stmt in stmts:
+            stmt_hash = stmt.get_hash(shallow=True)
+            if stmt_hash in by_hash:
+                self.statements[by_hash[stmt_hash]].evidence += stmt.evidence
+                continue
+            by_hash[stmt_hash] = len(self.statements)
+            stmt = copy.copy(stmt)
+            stmt.evidence = list(stmt.evidence)
+            self.statements.append(stmt)
+            self.hashes.append(stmt_hash)
+
+        ev_counts = ev_counts or {}
+        source_counts = source_counts or {}
+        for idx, stmt in enumerate(self.statements):
+            stmt_hash = self.hashes[idx]
+            ev_count = ev_counts.get(str(stmt_hash))
+            self.ev_counts.append(ev_count if ev_count is not None
+                                  else len(stmt.evidence))
+            src_counts = source_counts.get(stmt_hash)
+            self.source_counts.append(
+                dict(src_counts) if src_counts is not None
+                else dict(Counter(ev.source_api for ev in stmt.evidence)))
+            self._by_type[type(stmt).__name__].add(idx)
+            for agent, role in get_agent_roles(stmt):
+                for key in get_agent_keys(agent):
+                    self._by_agent[(key, role)].add(idx)
+                    self._by_agent[(key, None)].add(idx)
+        logger.info('Indexed %d statements.' % len(self.statements))
+
+    @classmethod
+    def from_file(cls, fname):
+        return cls(load_statements(fname))
+
+    def _get_type_matches(self, stmt_type, use_exact_type):
+        stmt_class = get_statement_by_name(stmt_type)
+        matches = set(self._by_type.get(stmt_class.__name__, set()))
+        if not use_exact_type:
+            for sub_class in get_all_descendants(stmt_class):
+                matches |= self._by_type.get(sub_class.__name__, set())
+        return matches
+
+    def find(self, subject=None, object=None, agents=None, stmt_type=None,
+             use_exact_type=False):
+        """Get the indices of the statements matching all the constraints."""
+        constraints = []
+        if subject is not None:
+            constraints.append(self._by_agent.get((subject, 'SUBJECT'), set()))
+        if object is not None:
+            constraints.append(self._by_agent.get((object, 'OBJECT'), set()))
+        for agent in agents or []:
+            constraints.append(self._by_agent.get((agent, None), set()))
+        if stmt_type is not None:
+            constraints.append(self._get_type_matches(stmt_type,
+                                                      use_exact_type))
+        if not constraints:
+            raise ValueError('At least one agent or a type must be given.')
+        # Intersect starting from the smallest set.
+        constraints.sort(key=len)
+        matches = set(constraints[0])
+        for other in constraints[1:]:
+            matches &= other
+            if not matches:
+                break
+        return matches
+
+    def query(self, subject=None, object=None, agents=None, stmt_type=None,
+              use_exact_type=False, ev_limit=10, best_first=True,
+              max_stmts=None, **kwargs):
+        """Find statements like `indra_db_rest.get_statements`.
+
+        Arguments that only affect how the database is queried (persist,
+        timeout, tries, simple_response) are ignored.
+        """
+        matches = self.find(subject, object, agents, stmt_type,
+                            use_exact_type)
+        if best_first:
+            matches = sorted(matches, key=lambda idx: (-self.ev_counts[idx],
+                                                       idx))
+        else:
+            matches = sorted(matches)
+        if max_stmts is not None:
+            matches = matches[:max_stmts]
+
+        stmts = []
+        for idx in matches:
+            # Copy the statements, so that the indexed ones keep all their
+            # evidence and can't be changed by the users of the results.
+            stmt = copy.copy(self.statements[idx])
+            stmt.evidence = stmt.evidence[:ev_limit] \
+                if ev_limit is not None else stmt.evidence[:]
+            stmts.append(stmt)
+        ev_counts = {str(self.hashes[idx]): self.ev_counts[idx]
+                     for idx in matches}
+        source_counts = {self.hashes[idx]: dict(self.source_counts[idx])
+                         for idx in matches}
+        return StaticProcessor(stmts, ev_counts, source_counts)
+
+
+if STATEMENT_INDEX_FILE is not None:
+    registry.register('statement_index',
+                      lambda: LocalStatementIndex.from_file(
+                          STATEMENT_INDEX_FILE))
+
+
+def get_statement_index():
+    """Get the index of the STATEMENT_INDEX_FILE, or None if not set."""
+    if STATEMENT_INDEX_FILE is None:
+        return None
+    return registry.get('statement_index')
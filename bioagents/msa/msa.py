@@ -1,22 +1,39 @@
+import io
 import re
+import copy
 import json
 import uuid
 import pickle
+import heapq
 import logging
 
-from collections import defaultdict
+from array import array
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, \
+    TimeoutError as FuturesTimeoutError
 
-from indra.util.statement_presentation import group_and_sort_statements, \
-    make_stmt_from_sort_key, stmt_to_english
-from bioagents.biosense.biosense import _read_kinases, _read_phosphatases, \
-    _read_tfs
+from indra.util.statement_presentation import make_stmt_from_sort_key, \
+    stmt_to_english
+from bioagents.resources.registry import registry
+from bioagents.resources.lexicon import get_lexicon
 from indra import get_config
 from indra.statements import Statement, stmts_to_json, Agent, \
     get_all_descendants
 from indra.sources import indra_db_rest as idbr
+from bioagents.settings import COMMONS_WORKERS, COMPACT_STATEMENTS_MIN
+from bioagents.deadline import DeadlineExceeded, limit_timeout, \
+    request_deadline, get_deadline
+from bioagents.msa.statement_cache import StaticProcessor, make_query_key, \
+    get_statement_cache, store_when_done
+from bioagents.msa.local_index import get_statement_index
+from bioagents.msa.inflight import in_flight_queries
+from bioagents.msa.planner import get_query_planner
+from bioagents.msa.compact import CompactStatements
+from bioagents.msa.grouping import get_top_groups
+from bioagents.msa.active_forms import ActiveFormIndex
+from bioagents.msa.exporters import make_export_path, write_tsv, \
+    write_jsonl, write_pickle
 
-from indra.assemblers.html import HtmlAssembler
-from indra.assemblers.graph import GraphAssembler
 from indra.assemblers.english.assembler import english_join, \
     statement_base_verb, statement_present_verb, statement_passive_verb
 
@@ -55,6 +72,48 @@ verb_map = _build_verb_map()
 DB_REST_URL = get_config('INDRA_DB_REST_URL')
 
 
+def get_processor(index=None, **kwargs):
+    """Get a processor with the statements found by a query.
+
+    The arguments are those of `indra_db_rest.get_statements`. If a
+    LocalStatementIndex is given, or set up by the STATEMENT_INDEX_FILE
+    setting, it is searched instead of the database. Otherwise, if the results
+    of the same query are in the statement cache, they are returned in a
+    StaticProcessor, and if those of a broader query are, they are filtered
+    to answer the query. If the same query is in progress, its processor is
+    shared. If not, the database is queried, and the results are cached when
+    the query is done.
+    """
+    if index is None:
+        index = get_statement_index()
+    if index is not None:
+        return index.query(**kwargs)
+    key = make_query_key(kwargs)
+    cache = get_statement_cache()
+    if cache is not None:
+        processor = cache.get(key)
+        if processor is not None:
+            logger.info('Found cached statements for %s.' % key)
+            return processor
+        processor = get_query_planner(cache).find(kwargs)
+        if processor is not None:
+            return processor
+
+    # The query is started without waiting, so that it is registered before
+    # any identical query comes, and the timeout is then waited for here.
+    timeout = kwargs.pop('timeout', None)
+    processor, started = in_flight_queries.acquire(
+        key, lambda: idbr.get_statements(timeout=0, **kwargs))
+    if started:
+        store_when_done(cache, key, processor,
+                        on_done=in_flight_queries.release)
+    if timeout is None:
+        processor.wait_until_done()
+    elif timeout:
+        processor.wait_until_done(timeout)
+    return processor
+
+
 class EntityError(ValueError):
     pass
 
@@ -159,13 +218,124 @@ class StatementQuery(object):
         return dbi, dbn
 
 
+class AgentFilter(object):
+    """Select the statements in which another agent has one of some groundings.
+
+    The groundings are indexed by name space once, so that each agent of each
+    statement is checked with one look up per name space, regardless of the
+    number of groundings.
+
+    Parameters
+    ----------
+    groundings : list[tuple]
+        The (db id, db name) pairs of the agents to filter to, as returned by
+        `StatementQuery.get_agent_grounding`.
+    query_entities : list[tuple]
+        The (db id, db name) pairs of the query entities, whose agents are not
+        considered as the other agents of statements.
+    """
+    def __init__(self, groundings, query_entities):
+        self.query_entities = query_entities
+        self.ids_by_ns = defaultdict(set)
+        for dbi, dbn in groundings:
+            self.ids_by_ns[dbn].add(dbi)
+
+    def agent_matches(self, agent):
+        for dbn, ids in self.ids_by_ns.items():
+            dbi = agent.db_refs.get(dbn)
+            if isinstance(dbi, str) and dbi in ids:
+                return True
+        return False
+
+    def filter(self, stmts, get_other_agents):
+        """Return the statements whose other agents match, in order."""
+        return [stmt for stmt in stmts
+                if any(agent is not None and self.agent_matches(agent)
+                       for agent in get_other_agents(stmt,
+                                                     self.query_entities))]
+
+
+class StatementMetadata(object):
+    """A table of what the summaries of a finder need about its statements.
+
+    The table is built in a single pass over the statements, and holds the
+    hash, type, evidence total and source counts of each statement, in the
+    order of the statements, along with the grounding of their agents.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement or StatementRecord]
+        The statements found by a finder, or their records if they are kept
+        in a CompactStatements store.
+    processor : IndraDBRestProcessor or StaticProcessor or None
+        The processor providing the evidence and source counts.
+    query : StatementQuery
+        The query whose name spaces are used to ground the agents.
+    """
+    def __init__(self, stmts, processor, query):
+        self.statements = stmts
+        self.hashes = array('q')
+        self.type_ids = array('H')
+        self.type_names = []
+        # Unknown evidence totals are stored as -1.
+        self.ev_totals = array('q')
+        self.source_counts = []
+        self.agent_groundings = {}
+        type_ids = {}
+        for stmt in stmts:
+            self.hashes.append(stmt.get_hash())
+            stmt_type = getattr(stmt, 'type_name', type(stmt).__name__).lower()
+            if stmt_type not in type_ids:
+                type_ids[stmt_type] = len(self.type_names)
+                self.type_names.append(stmt_type)
+            self.type_ids.append(type_ids[stmt_type])
+            ev_total = processor.get_ev_count(stmt) \
+                if processor is not None else None
+            self.ev_totals.append(-1 if ev_total is None else ev_total)
+            self.source_counts.append(processor.get_source_count(stmt)
+                                      if processor is not None else None)
+            for agent in stmt.agent_list():
+                if agent is None or id(agent) in self.agent_groundings:
+                    continue
+                try:
+                    self.agent_groundings[id(agent)] = \
+                        query.get_agent_grounding(agent)
+                except EntityError:
+                    pass
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def get_ev_total(self, idx):
+        """Get the evidence total of a statement, or 0 if it is unknown."""
+        return max(self.ev_totals[idx], 0)
+
+    def get_ev_totals(self):
+        return {stmt_hash: (ev_total if ev_total >= 0 else None)
+                for stmt_hash, ev_total in zip(self.hashes, self.ev_totals)}
+
+    def get_source_counts(self):
+        return dict(zip(self.hashes, self.source_counts))
+
+    def get_type_ev_totals(self):
+        """Get the total evidence of each (lower case) statement type."""
+        totals = [0] * len(self.type_names)
+        for idx, type_id in enumerate(self.type_ids):
+            totals[type_id] += self.get_ev_total(idx)
+        return dict(zip(self.type_names, totals))
+
+
 class StatementFinder(object):
     def __init__(self, *args, **kwargs):
         self._block_default = kwargs.pop('block_default', True)
+        self._index = kwargs.pop('index', None)
         self.query = self._regularize_input(*args, **kwargs)
         self._processor = self._make_processor()
         self._statements = None
+        # The full statements made from the records of compacted statements.
+        self._metadata = None
         self._sample = []
+        self._partial = False
         return
 
     def _regularize_input(self, *args, **kwargs):
@@ -177,20 +347,29 @@ class StatementFinder(object):
 
         This method makes use of the `query` attribute.
         """
-        if not self.query.verb:
-            processor = \
-                idbr.get_statements(subject=self.query.subj_key,
-                                    object=self.query.obj_key,
-                                    agents=self.query.agent_keys,
-                                    **self.query.settings)
-        else:
-            processor = \
-                idbr.get_statements(subject=self.query.subj_key,
-                                    object=self.query.obj_key,
-                                    agents=self.query.agent_keys,
-                                    stmt_type=self.query.stmt_type,
-                                    **self.query.settings)
-        return processor
+        return get_processor(index=self._index, **self._get_query_kwargs())
+
+    def _get_query_kwargs(self):
+        """Get the arguments of `indra_db_rest.get_statements` for the query."""
+        kwargs = dict(subject=self.query.subj_key, object=self.query.obj_key,
+                      agents=self.query.agent_keys)
+        if self.query.verb:
+            kwargs['stmt_type'] = self.query.stmt_type
+        kwargs.update(self.query.settings)
+        return kwargs
+
+    @classmethod
+    def make_query_kwargs(cls, *args, **kwargs):
+        """Get the query arguments of a finder without running the query.
+
+        The arguments are those the finder would use given the same inputs,
+        so that the results of a query can be found before they are needed.
+        """
+        finder = cls.__new__(cls)
+        kwargs.pop('block_default', None)
+        kwargs.pop('index', None)
+        finder.query = finder._regularize_input(*args, **kwargs)
+        return finder._get_query_kwargs()
 
     def _filter_stmts(self, stmts):
         """This is an internal function that is applied to filter statements.
@@ -207,36 +386,24 @@ class StatementFinder(object):
         if not self.query.filter_agents:
             return stmts
 
-        filtered_stmts = []
         logger.info('Starting agent filter with %d statements' % len(stmts))
-        for stmt in stmts:
-
-            # Look for any of the agents we are filtering to
-            for filter_agent in self.query.filter_agents:
-
-                # Get the prefered grounding
-                dbi, dbn = self.query.get_agent_grounding(filter_agent)
-
-                # Look for a match in any of the statements' agents.
-                for agent in self.get_other_agents_for_stmt(stmt,
-                                        list(self.query.entities.values())):
-                    if agent is None:
-                        continue
-
-                    if agent.db_refs.get(dbn) == dbi:
-                        filtered_stmts.append(stmt)
-                        break  # found one.
-                else:
-                    continue  # keep looking
-                break  # found one.
-
+        agent_filter = AgentFilter(
+            [self.query.get_agent_grounding(filter_agent)
+             for filter_agent in self.query.filter_agents],
+            list(self.query.entities.values()))
+        filtered_stmts = agent_filter.filter(stmts,
+                                             self.get_other_agents_for_stmt)
         logger.info('Finished agent filter with %d statements' %
                     len(filtered_stmts))
 
         return filtered_stmts
 
     def get_statements(self, block=None, timeout=10):
-        """Get the full list of statements if available."""
+        """Get the full list of statements if available.
+
+        When blocking, this waits at most until the deadline of the request
+        being handled, if there is one.
+        """
         if self._statements is not None:
             return self._statements[:]
 
@@ -246,17 +413,108 @@ class StatementFinder(object):
 
         if self._processor.is_working():
             if block:
-                self._processor.wait_until_done(timeout)
+                self._processor.wait_until_done(limit_timeout(timeout))
                 if self._processor.is_working():
                     return None
             else:
                 return None
 
-        self._statements = self._filter_stmts(self._processor.statements[:])
-        self._statements = self._filter_stmts_for_agents(self._statements)
+        stmts = self._filter_stmts(self._processor.statements[:])
+        stmts = self._filter_stmts_for_agents(stmts)
+        if COMPACT_STATEMENTS_MIN is not None \
+                and len(stmts) >= COMPACT_STATEMENTS_MIN:
+            # Only the records of many statements are kept, and the processor
+            # is replaced by one with only the counts, so that the full
+            # statements are freed once the caller is done with them. They
+            # are made again from the records each time they are asked for.
+            self._statements = CompactStatements(stmts)
+            processor = self._processor
+            self._processor = StaticProcessor(
+                [], processor.get_ev_counts(), processor.get_source_counts(),
+                statements_sample=processor.statements_sample or [])
+            return stmts
+        self._statements = stmts
 
         return self._statements[:]
 
+    def get_first_statements(self, num, block=None):
+        """Get the first num statements, or None if they are not available.
+
+        Unlike slicing the result of `get_statements`, this doesn't make all
+        the statements if they are kept in a CompactStatements store.
+        """
+        if self._statements is None and self.get_statements(block) is None:
+            return None
+        return self._statements[:num]
+
+    def _get_records(self):
+        """Get the list of statements, or of their records if compacted."""
+        if isinstance(self._statements, CompactStatements):
+            return self._statements.records
+        return self._statements
+
+    def is_complete(self):
+        """Return True if all the statements of the query have been found."""
+        if self._partial:
+            return False
+        return self._statements is not None or self._processor is None \
+            or not self._processor.is_working()
+
+    def get_partial_statements(self):
+        """Get the statements found so far, without waiting for the rest.
+
+        Pages of results are added as they arrive, so the statements are a
+        growing subset of those returned by `get_statements` once complete.
+        """
+        if self.is_complete():
+            return self.get_statements()
+        stmts = None
+        # Pages may arrive while the statements are read, in which case we
+        # try again.
+        for _ in range(3):
+            try:
+                stmts = list(self._processor.get_hash_statements_dict()
+                             .values())
+                break
+            except RuntimeError:
+                continue
+        if stmts is None:
+            stmts = self._processor.statements_sample[:] \
+                if self._processor.statements_sample else []
+        stmts = self._filter_stmts(stmts)
+        return self._filter_stmts_for_agents(stmts)
+
+    def get_partial_finder(self):
+        """Get a snapshot of this finder with the statements found so far.
+
+        All the summaries of the snapshot, such as `summarize` and `describe`,
+        are computed on the statements found so far, and its `is_complete`
+        returns False. If the statements are complete, this finder is
+        returned.
+        """
+        if self.is_complete():
+            return self
+        snapshot = copy.copy(self)
+        snapshot._statements = self.get_partial_statements()
+        snapshot._metadata = None
+        snapshot._sample = []
+        snapshot._partial = True
+        return snapshot
+
+    def get_metadata(self, block=None):
+        """Get the StatementMetadata of the statements, or None if not ready.
+
+        The table is built once, when the statements are first available, and
+        is used by all the summaries of the statements.
+        """
+        if self._metadata is None \
+                or self._metadata.statements is not self._get_records():
+            if self.get_statements(block) is None:
+                return None
+            self._metadata = StatementMetadata(self._get_records(),
+                                               self._processor, self.query)
+        return self._metadata
+
     def get_fixed_agents(self):
         """Get a dict of the agents that were used as inputs, keyed by role."""
         raw_dict = {'subject': [self.query.subj], 'object': [self.query.obj],
@@ -268,7 +526,8 @@ class StatementFinder(object):
                 ret_dict[role] = new_list
         return ret_dict
 
-    def get_other_agents(self, entities=None, other_role=None, block=None):
+    def get_other_agents(self, entities=None, other_role=None, block=None,
+                         limit=None):
         """Find all the resulting agents besides the one given.
 
         It is assumed that the given entity was one of the inputs.
@@ -288,6 +547,9 @@ class StatementFinder(object):
             If True, wait for the processor to finish, else return None if it
             is not done. If None, the default set in the class instantiation
             is used.
+        limit : int or None
+            If given, only the `limit` most frequent agents are returned,
+            which avoids sorting all the others.
         """
         # Check to make sure role is valid.
         if other_role not in ['subject', 'object', None]:
@@ -303,16 +565,17 @@ class StatementFinder(object):
         # Build up a dict of groundings, counting how often they occur.
         counts = defaultdict(lambda: 0)
         oa_dict = defaultdict(list)
-        ev_totals = self.get_ev_totals()
-        stmts = self.get_statements(block)
-        if not stmts:
+        metadata = self.get_metadata(block)
+        if not metadata:
             return None
-        for stmt in stmts:
+        for idx, stmt in enumerate(metadata.statements):
             other_agents = self.get_other_agents_for_stmt(stmt, query_entities,
                                                           other_role)
             for ag in other_agents:
-                gr = self.query.get_agent_grounding(ag)
-                counts[gr] += ev_totals.get(stmt.get_hash(), 0)
+                gr = metadata.agent_groundings.get(id(ag))
+                if gr is None:
+                    gr = self.query.get_agent_grounding(ag)
+                counts[gr] += metadata.get_ev_total(idx)
                 oa_dict[gr].append(ag)
 
         def get_aggregate_agent(agents, dbi, dbn):
@@ -323,8 +586,12 @@ class StatementFinder(object):
         # We add t itself as a second element to the tuple to make sure the
         # sort is deterministic, and take -counts so that we don't need to
         # reverse the sort.
-        sorted_groundings = \
-            list(sorted(counts.keys(), key=lambda t: (-counts[t], t)))
+        if limit is None:
+            sorted_groundings = \
+                list(sorted(counts.keys(), key=lambda t: (-counts[t], t)))
+        else:
+            sorted_groundings = heapq.nsmallest(
+                limit, counts.keys(), key=lambda t: (-counts[t], t))
         other_agents = [get_aggregate_agent(oa_dict[gr], *gr) for gr in
                         sorted_groundings]
         return other_agents
@@ -380,14 +647,12 @@ class StatementFinder(object):
         """Get a dictionary of evidence total counts from the processor."""
         # Getting statements applies any filters, so the counts are consistent
         # with those filters.
-        stmts = self.get_statements(block=False)
-        return {stmt.get_hash(): self._processor.get_ev_count(stmt)
-                for stmt in stmts}
+        metadata = self.get_metadata(block=False)
+        return metadata.get_ev_totals() if metadata is not None else {}
 
     def get_source_counts(self):
-        stmts = self.get_statements(block=False)
-        return {stmt.get_hash(): self._processor.get_source_count(stmt)
-                for stmt in stmts}
+        metadata = self.get_metadata(block=False)
+        return metadata.get_source_counts() if metadata is not None else {}
 
     def get_sample(self):
         """Get the sample of statements retrieved by the first query."""
@@ -409,7 +674,7 @@ class StatementFinder(object):
             If True, when no results were found, a sentence is generated
             saying so, otherwise an empty string is returned.
         """
-        num_stmts = len(self.get_statements())
+        num_stmts = len(self.get_metadata())
         if num_stmts > limit:
             msg = 'Here are the top %d statements I found:\n' % limit
             msg += self.get_summary_stmts_html(num=limit) + '\n'
@@ -427,33 +692,35 @@ class StatementFinder(object):
         msg += self.get_html() + '\n'
         return msg
 
-    def get_stmt_types(self):
-        """Return the sorted set of types found in the body of statements."""
-        stmts = self.get_statements()
-        evs = self.get_ev_totals()
+    def get_stmt_types(self, limit=None):
+        """Return the sorted set of types found in the body of statements.
+
+        If a limit is given, only the `limit` types with the most evidence are
+        returned.
+        """
         # We count the evidence for each type of statement
-        counts = {}
-        for stmt in stmts:
-            stmt_type = stmt.__class__.__name__.lower()
-            ev = evs.get(stmt.get_hash(), 0)
-            if stmt_type in counts:
-                counts[stmt_type] += ev
-            else:
-                counts[stmt_type] = ev
+        counts = self.get_metadata().get_type_ev_totals()
         # We finally sort by decreasing evidence count
-        sorted_stmt_types = [k for k, v in sorted(counts.items(),
-                                                  key=lambda x: x[1],
-                                                  reverse=True)]
+        if limit is None:
+            sorted_items = sorted(counts.items(), key=lambda x: x[1],
+                                  reverse=True)
+        else:
+            sorted_items = heapq.nlargest(limit, counts.items(),
+                                          key=lambda x: x[1])
+        sorted_stmt_types = [k for k, v in sorted_items]
         return sorted_stmt_types
 
     def get_summary_stmts(self, num=5):
         """Return the top summarized statements for the query."""
-        stmts = self.get_statements()
-        # Group statements by participants and type, aggregating evidence
-        sorted_groups = group_and_sort_statements(stmts, self.get_ev_totals())
+        metadata = self.get_metadata()
+        # Group statements by participants and type, aggregating evidence. If
+        # the statements are compacted, their records are grouped, so that
+        # no statement is made.
+        top_groups = get_top_groups(metadata.statements,
+                                    metadata.get_ev_totals(), num)
         # Create synthetic summary statements in a list
         summary_stmts = []
-        for key, verb, stmts in sorted_groups[:num]:
+        for key, verb in top_groups:
             summary_stmts.append(make_stmt_from_sort_key(key, verb))
         return summary_stmts
 
@@ -473,6 +740,7 @@ class StatementFinder(object):
         """Get html for these statements."""
         logger.info('Generating HTML')
         import boto3
+        from indra.assemblers.html import HtmlAssembler
         ev_totals = self.get_ev_totals()
         source_counts = self.get_source_counts()
         html_assembler = HtmlAssembler(self.get_statements(),
@@ -489,31 +757,63 @@ class StatementFinder(object):
                       ContentType='text/html')
         return link
 
+    def iter_statements(self, chunk_size=1000):
+        """Yield the statements one by one, for instance to export them.
+
+        If the statements are kept in a CompactStatements store, they are
+        made chunk_size at a time, so that they are never all in memory.
+        """
+        if isinstance(self._statements, CompactStatements):
+            for start in range(0, len(self._statements), chunk_size):
+                for stmt in self._statements[start:start + chunk_size]:
+                    yield stmt
+            return
+        for stmt in self.get_statements():
+            yield stmt
+
     def get_tsv(self):
         """Get a string of the tsv for these statements."""
-        msg = ''
-        for stmt in self.get_statements():
-            if not stmt.evidence:
-                logger.warning('Statement %s without evidence' % stmt.uuid)
-                txt = ''
-                pmid = ''
-            else:
-                txt = stmt.evidence[0].text if stmt.evidence[0].text else ''
-                pmid = stmt.evidence[0].pmid if stmt.evidence[0].pmid else ''
-            line = '%s\t%s\t%s\n' % (stmt, txt, pmid)
-            msg += line
-        return msg
+        fh = io.StringIO()
+        write_tsv(self.iter_statements(), fh)
+        return fh.getvalue()
+
+    def get_tsv_file(self):
+        """Write the tsv of the statements to a new file, return its name."""
+        fname = make_export_path('.tsv')
+        with open(fname, 'w') as fh:
+            write_tsv(self.iter_statements(), fh)
+        return fname
+
+    def get_jsonl(self):
+        """Write the statements to a new JSON Lines file, return its name."""
+        fname = make_export_path('.jsonl')
+        with open(fname, 'w') as fh:
+            write_jsonl(self.iter_statements(), fh)
+        return fname
 
     def get_pickle(self):
         """Generate a pickle file, and return the file name."""
-        fname = 'indrabot.pkl'
+        fname = make_export_path('.pkl')
         with open(fname, 'wb') as fh:
             pickle.dump(self.get_statements(), fh)
         return fname
 
+    def get_pickle_stream(self):
+        """Pickle the statements one by one to a new file, return its name.
+
+        Unlike `get_pickle`, the statements are not all in memory at once if
+        they are kept compact. Read the file with
+        `bioagents.msa.exporters.read_pickle`.
+        """
+        fname = make_export_path('.pkl')
+        with open(fname, 'wb') as fh:
+            write_pickle(self.iter_statements(), fh)
+        return fname
+
     def get_pdf_graph(self):
         """Save a graph made with GraphAssembler as pdf, return file name."""
-        fname = 'indrabot.pdf'
+        from indra.assemblers.graph import GraphAssembler
+        fname = make_export_path('.pdf')
         ga = GraphAssembler(self.get_statements())
         ga.make_model()
         ga.save_pdf(fname)
@@ -526,6 +826,7 @@ class StatementFinder(object):
 
     def filter_other_agent_type(self, stmts, ent_type, other_role=None):
         query_entities = set(self.query.entities.values())
+        entity_type_filter = get_entity_type_filter()
         stmts_out = []
         for stmt in stmts:
             other_agents = \
@@ -544,14 +845,15 @@ class Neighborhood(StatementFinder):
     def _regularize_input(self, entity, **params):
         return StatementQuery(None, None, [entity], None, None, params)
 
-    def summarize(self):
+    def summarize(self, limit=None):
         summary = {'query_agent': self.query.agents[0],
                    'other_agents':
-                       self.get_other_agents()}
+                       self.get_other_agents(limit=limit)}
         return summary
 
     def describe(self, max_names=20, include_negative=True):
-        summary = self.summarize()
+        # One more name than shown tells if there are more.
+        summary = self.summarize(limit=max_names + 1)
         desc = ('Overall, I found that %s interacts with%s ' %
                 (summary['query_agent'].name,
                  ', for instance,' if len(summary['other_agents']) > max_names
@@ -581,7 +883,7 @@ class Activeforms(StatementFinder):
     def summarize(self):
         # Note that the generic form of grouped ActiveForm statements is
         # degenerate so we just choose the first few actual statements here
-        summary = {'summary_stmts': self.get_statements()[:5]}
+        summary = {'summary_stmts': self.get_first_statements(5)}
         return summary
 
 
@@ -591,43 +893,23 @@ class PhosActiveforms(Activeforms):
         spec_key_list = ['residue', 'position', 'action', 'polarity']
         self.specs = {k: kwargs.pop(k, None) for k in spec_key_list}
 
+        # The statements found are indexed by site as they come, so that those
+        # matching the specs are looked up rather than checked one by one.
+        self._active_forms = ActiveFormIndex([])
+
         # Continue with normal init.
         super(PhosActiveforms, self).__init__(*args, **kwargs)
         self._statements = None
         self._sample = []
         return
 
-    def _matching(self, stmt):
-        if all(val is None for val in self.specs.values()):
-            return True
-
-        if stmt.is_active is not (self.specs['polarity'] == 'activating'):
-            return False
-        matching_residues = any([
-            m.residue == self.specs['residue']
-            and m.position == self.specs['position']
-            and m.mod_type == self.specs['action']
-            for m in stmt.agent.mods])
-        return matching_residues
-
     def _filter_stmts(self, stmts):
-        ret_stmts = []
-        for stmt in stmts:
-            ags = stmt.agent_list()
-            if len(ags) != 1:
-                logger.warning("Got an unexpected statement with 2 agents "
-                               "from query for ActiveForms: %s" % str(stmt))
-                continue
-
-            # TODO: this implementation is a bit weird and could probably be
-            # simplified/improved.
-            ag = ags[0]
-            for mc in ag.mods:
-                if mc.mod_type == 'phosphorylation' and self._matching(stmt):
-                    ret_stmts.append(stmt)
-                    break
-
-        return ret_stmts
+        # The statements are those found so far, so only the new ones need
+        # to be indexed. Only the given statements are kept, in their order.
+        self._active_forms.add(stmts)
+        matches = {s.get_hash(shallow=True)
+                   for s in self._active_forms.find(**self.specs)}
+        return [s for s in stmts if s.get_hash(shallow=True) in matches]
 
 
 class BinaryDirected(StatementFinder):
@@ -699,7 +981,7 @@ class FromSource(StatementFinder):
     def _regularize_input(self, source, verb=None, ent_type=None, **params):
         return StatementQuery(source, None, [], verb, ent_type, params)
 
-    def summarize(self):
+    def summarize(self, limit=None):
         if self.query.stmt_type:
             stmt_type = statement_base_verb(self.query.stmt_type.lower())
         else:
@@ -707,11 +989,12 @@ class FromSource(StatementFinder):
         summary = {'stmt_type': stmt_type,
                    'query_subj': self.query.subj,
                    'other_agents': self.get_other_agents([self.query.subj],
-                                                         other_role='object')}
+                                                         other_role='object',
+                                                         limit=limit)}
         return summary
 
     def describe(self, limit=10, include_negative=True):
-        summary = self.summarize()
+        summary = self.summarize(limit=limit + 1)
         if summary['stmt_type'] is None:
             verb_wrap = ' can affect '
             ps = super(FromSource, self).describe(limit=limit,
@@ -752,7 +1035,7 @@ class ToTarget(StatementFinder):
     def _regularize_input(self, target, verb=None, ent_type=None, **params):
         return StatementQuery(None, target, [], verb, ent_type, params)
 
-    def summarize(self):
+    def summarize(self, limit=None):
         if self.query.stmt_type:
             stmt_type = statement_base_verb(self.query.stmt_type.lower())
         else:
@@ -761,12 +1044,13 @@ class ToTarget(StatementFinder):
             'stmt_type': stmt_type,
             'query_obj': self.query.obj,
             'other_agents': self.get_other_agents([self.query.obj],
-                                                  other_role='subject')
+                                                  other_role='subject',
+                                                  limit=limit)
         }
         return summary
 
     def describe(self, limit=5, include_negative=True):
-        summary = self.summarize()
+        summary = self.summarize(limit=limit + 1)
         if summary['stmt_type'] is None:
             verb_wrap = ' can affect '
             ps = super(ToTarget, self).describe(limit=limit,
@@ -809,15 +1093,16 @@ class ComplexOneSide(StatementFinder):
         return StatementQuery(None, None, [entity], 'Complex', ent_type,
                               params)
 
-    def summarize(self):
+    def summarize(self, limit=None):
         summary = {'query_agent': self.query.agents[0],
                    'other_agents':
-                       self.get_other_agents([self.query.agents[0]]),
+                       self.get_other_agents([self.query.agents[0]],
+                                             limit=limit),
                    'stmt_type': 'complex'}
         return summary
 
     def describe(self, max_names=20, include_negative=True):
-        summary = self.summarize()
+        summary = self.summarize(limit=max_names)
         desc = "Overall, I found that %s can be in a complex with " % \
                summary['query_agent'].name
 
@@ -875,6 +1160,12 @@ class _Commons(StatementFinder):
         out of common neighbors after only a few queries. This implementation
         takes advantage of that fact, thus preventing hangs in essentially
         trivial cases with large N.
+
+        The queries for the entities are made at the same time, and the
+        neighbors they find are intersected as they arrive. As soon as there
+        is nothing left in common, the remaining queries are abandoned.
+        Entities grounded to genes are queried before families, since their
+        neighborhoods are smaller and shrink the common set faster.
         """
         # Prep the settings with some defaults.
         kwargs = self.query.settings.copy()
@@ -885,55 +1176,83 @@ class _Commons(StatementFinder):
         if 'persist' not in kwargs.keys():
             kwargs['persist'] = False
 
-        # Run multiple queries, building up a single processor and a dict of
-        # agents held in common.
+        entities = [(idx, ag, ag_key) for idx, (ag, ag_key)
+                    in enumerate(zip(self.query.agents, self.query.agent_keys))
+                    if ag_key is not None]
+        if not entities:
+            return None
+        entities.sort(key=lambda entity: (not entity[2].endswith('@HGNC'),
+                                          entity[0]))
+
+        # Run the queries, building up a dict of the agents found for each
+        # entity, and the set of those found for all entities so far.
+        results = {}
+        in_common = None
+        executor = ThreadPoolExecutor(min(COMMONS_WORKERS, len(entities)))
+        deadline = get_deadline()
+        futures = {}
+        for idx, ag, ag_key in entities:
+            entity_kwargs = kwargs.copy()
+            entity_kwargs[self._role.lower()] = ag_key
+            futures[executor.submit(self._query_entity, entity_kwargs,
+                                    deadline)] = (idx, ag)
+        try:
+            for future in as_completed(futures, timeout=limit_timeout(None)):
+                idx, ag = futures[future]
+                processor = future.result()
+                found = OrderedDict()
+                for other_ag, stmt in self._iter_stmts(processor.statements):
+                    if other_ag is None \
+                            or 'HGNC' not in other_ag.db_refs.keys():
+                        continue
+                    found.setdefault(other_ag.name, []).append(stmt)
+                results[idx] = (ag, processor, found)
+                in_common = set(found) if in_common is None \
+                    else in_common & set(found)
+
+                # If there's nothing left in common, it won't get better.
+                if not in_common:
+                    logger.info('Nothing in common after %d of %d queries.'
+                                % (len(results), len(entities)))
+                    break
+        except FuturesTimeoutError:
+            raise DeadlineExceeded('The deadline of the request has passed '
+                                   'while finding common neighbors.')
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+        # Combine the results in the order of the entities.
+        order = sorted(results.keys())
+        first_found = results[order[0]][2]
+        self.commons = {other_id: {} for other_id in first_found
+                        if other_id in in_common}
         processor = None
-        for ag, ag_key in zip(self.query.agents, self.query.agent_keys):
-            if ag_key is None:
-                continue
-
-            # Make another query.
-            kwargs[self._role.lower()] = ag_key
-            new_processor = idbr.get_statements(**kwargs)
-            new_processor.wait_until_done()
-
-            # Look for new agents.
-            for other_ag, stmt in self._iter_stmts(new_processor.statements):
-                if other_ag is None or 'HGNC' not in other_ag.db_refs.keys():
-                    continue
-                other_id = other_ag.name
-
-                # If this is the first pass, init the dict.
-                if processor is None and other_id not in self.commons.keys():
-                    self.commons[other_id] = {ag.name: [stmt]}
-                # Otherwise we can only add to the sub-dicts and their lists.
-                elif other_id in self.commons.keys():
-                    if ag.name not in self.commons[other_id].keys():
-                        self.commons[other_id][ag.name] = []
-                    self.commons[other_id][ag.name].append(stmt)
-
-            # If this isn't the first time around, remove all entries that
-            # didn't find match this time around.
+        for idx in order:
+            ag, new_processor, found = results[idx]
+            for other_id, data in self.commons.items():
+                data.setdefault(ag.name, []).extend(found[other_id])
             if processor is None:
-                processor = new_processor
+                # Copy the results, so cached and fresh ones can be merged.
+                processor = StaticProcessor.from_processor(new_processor)
             else:
-                self.commons = {other_id: data
-                                for other_id, data in self.commons.items()
-                                if ag.name in data.keys()}
                 processor.merge_results(new_processor)
+        return processor
 
-            # If there's nothing left in common, it won't get better.
-            if not self.commons:
-                break
-
+    def _query_entity(self, kwargs, deadline):
+        """Get the processor of one query, on a worker thread."""
+        with request_deadline(deadline):
+            processor = get_processor(index=self._index, **kwargs)
+            processor.wait_until_done(limit_timeout(None))
         return processor
 
     def get_statements(self, block=None, timeout=10):
         if self._statements is None:
-            self._statements = [s for data in self.commons.values()
-                                for s_list in data.values()
-                                for s in s_list]
-        self._statements = self._filter_stmts_for_agents(self._statements)
+            stmts = [s for data in self.commons.values()
+                     for s_list in data.values()
+                     for s in s_list]
+            self._statements = self._filter_stmts_for_agents(stmts)
         return self._statements
 
     def get_common_entities(self):
@@ -1073,26 +1392,29 @@ class MSA(object):
 
 class EntityTypeFilter(object):
     def __init__(self):
-        self.tfs = _read_tfs()
-        self.phosphatases = _read_phosphatases()
-        self.kinases = _read_kinases()
+        self.lexicon = get_lexicon()
 
     def is_ent_type(self, agent, ent_type):
         if ent_type in ('gene', 'protein'):
             return set(agent.db_refs.keys()) & {'UP', 'HGNC', 'FPLX'}
         elif ent_type in ('transcription factor', 'TF'):
-            return agent.name in self.tfs
+            return self.lexicon.is_of_type(agent, 'transcription factor')
         elif ent_type == 'kinase':
-            return agent.name in self.kinases
+            return self.lexicon.is_of_type(agent, 'kinase')
         elif ent_type == 'phosphatase':
-            return agent.name in self.phosphatases
+            return self.lexicon.is_of_type(agent, 'phosphatase')
         elif ent_type == 'enzyme':
-            return (agent.name in self.phosphatases or
-                    agent.name in self.kinases)
+            return (self.lexicon.is_of_type(agent, 'phosphatase') or
+                    self.lexicon.is_of_type(agent, 'kinase'))
         # By default we just return True here, implying not filtering
         # out the agent
         else:
             return True
 
 
-entity_type_filter = EntityTypeFilter()
+registry.register('entity_type_filter', EntityTypeFilter)
+
+
+def get_entity_type_filter():
+    """Return the EntityTypeFilter, reading its resources on first use."""
+    return registry.get('entity_type_filter')
@@ -1,7 +1,5 @@
-import os
 import sys
 import re
-import pickle
 import logging
 from datetime import datetime
 from threading import Thread
@@ -13,11 +11,16 @@ logger = logging.getLogger('MSA-module')
 from kqml import KQMLPerformative, KQMLList
 
 from indra import has_config
-from indra.assemblers.sbgn import SBGNAssembler
-from indra.tools import assemble_corpus as ac
 
 from bioagents.msa.msa import MSA, EntityError
+from bioagents.msa.statement_cache import get_statement_cache
+from bioagents.msa.prefetch import make_prefetcher
+from bioagents.msa.inflight import in_flight_queries
+from bioagents.msa.planner import get_query_planner
+from bioagents.msa.paper_models import PaperModels
 from bioagents import Bioagent
+from bioagents.settings import EARLY_ANSWER_WAIT, PROVENANCE_WAIT, \
+    PREFETCH_WORKERS, PREASSEMBLY_PROCESSES
 
 if has_config('INDRA_DB_REST_URL') and has_config('INDRA_DB_REST_API_KEY'):
     from indra.sources.indra_db_rest import IndraDBRestAPIError, \
@@ -29,20 +32,6 @@ else:
     CAN_CHECK_STATEMENTS = False
 
 
-def _read_signor_afs():
-    path = os.path.dirname(os.path.abspath(__file__)) + \
-            '/../resources/signor_active_forms.pkl'
-    with open(path, 'rb') as pkl_file:
-        stmts = pickle.load(pkl_file)
-    if isinstance(stmts, dict):
-        signor_afs = []
-        for _, stmt_list in stmts.items():
-            signor_afs += stmt_list
-    else:
-        signor_afs = stmts
-    return signor_afs
-
-
 DUMP_LIMIT = 100
 
 
@@ -55,13 +44,38 @@ class MSA_Module(Bioagent):
     tasks = ['PHOSPHORYLATION-ACTIVATING', 'FIND-RELATIONS-FROM-LITERATURE',
              'GET-PAPER-MODEL', 'CONFIRM-RELATION-FROM-LITERATURE',
              'GET-COMMON']
-    signor_afs = _read_signor_afs()
 
     def __init__(self, *args, **kwargs):
         self.msa = MSA()
+        # Queries are only prefetched in the background when not testing.
+        prefetch_workers = kwargs.pop('prefetch_workers', PREFETCH_WORKERS)
+        self.prefetcher = make_prefetcher(prefetch_workers) \
+            if not kwargs.get('testing') else None
+        # Large papers are assembled in worker processes.
+        preassembly_processes = kwargs.pop('preassembly_processes',
+                                           PREASSEMBLY_PROCESSES)
+        self.paper_models = PaperModels(num_processes=preassembly_processes)
         super(MSA_Module, self).__init__(*args, **kwargs)
         return
 
+    def _prefetch(self, agents):
+        """Prefetch the likely next queries about the agents mentioned."""
+        if self.prefetcher is not None and CAN_CHECK_STATEMENTS:
+            self.prefetcher.prefetch(agents)
+        return
+
+    def get_agent_stats(self):
+        stats = super(MSA_Module, self).get_agent_stats()
+        cache = get_statement_cache()
+        if cache is not None:
+            stats['statement_cache'] = cache.get_stats()
+            stats['query_planner'] = get_query_planner(cache).get_stats()
+        if self.prefetcher is not None:
+            stats['prefetch'] = self.prefetcher.get_stats()
+        stats['statement_queries'] = in_flight_queries.get_stats()
+        stats['paper_models'] = self.paper_models.get_stats()
+        return stats
+
     def respond_get_common(self, content):
         """Find the common up/down streams of a protein."""
         # TODO: This entire function could be part of the MSA.
@@ -95,6 +109,7 @@ class MSA_Module(Bioagent):
             finder = self.msa.find_mechanisms(method, *agents)
         except EntityError as e:
             return self.make_failure("MISSING_TARGET", e.args[0])
+        self._prefetch(agents)
 
         # Get post statements to provenance.
         if len(agents) > 2:
@@ -145,6 +160,7 @@ class MSA_Module(Bioagent):
                                                 position=position,
                                                 action=action,
                                                 polarity=polarity)
+        self._prefetch([agent])
         stmts = finder.get_statements()
         self.say(finder.describe(include_negative=False))
 
@@ -216,14 +232,25 @@ class MSA_Module(Bioagent):
                                         'finding statements that match')
         except MSALookupError as mle:
             return self.make_failure(mle.args[0])
+        self._prefetch([subj, obj])
 
-        stmts = finder.get_statements(timeout=15)
+        stmts = finder.get_statements(timeout=EARLY_ANSWER_WAIT)
         if stmts is None:
+            # Answer with what was found so far. The provenance is refined
+            # once all the statements are found.
+            partial = finder.get_partial_finder()
+            stmts = partial.get_statements()
+            agents = partial.get_other_agents() if stmts else None
+            desc = partial.describe(include_negative=False) if stmts \
+                else None
+            if desc:
+                self.say(desc + ' I am still looking for more.')
             # Calling this success may be a bit ambitious.
             resp = KQMLPerformative('SUCCESS')
             resp.set('status', 'WORKING')
-            resp.set('entities-found', 'nil')
-            resp.set('num-relations-found', '0')
+            resp.set('entities-found',
+                     self.make_cljson(agents) if agents else 'nil')
+            resp.set('num-relations-found', str(len(stmts)))
             resp.set('dump-limit', str(DUMP_LIMIT))
             return resp
 
@@ -249,6 +276,7 @@ class MSA_Module(Bioagent):
                 'confirming that some statements match')
         except MSALookupError as mle:
             return self.make_failure(mle.args[0])
+        self._prefetch([subj, obj])
         stmts = finder.get_statements(timeout=20)
         if stmts is None:
             # TODO: Handle this more gracefully, if possible.
@@ -283,13 +311,10 @@ class MSA_Module(Bioagent):
             resp = KQMLPerformative('SUCCESS')
             resp.set('relations-found', 0)
             return resp
-        stmts = ac.map_grounding(stmts)
-        stmts = ac.map_sequence(stmts)
-        unique_stmts = ac.run_preassembly(stmts, return_toplevel=True)
-        diagrams = _make_diagrams(stmts)
+        num_unique, diagrams = self.paper_models.get_model(pmid, stmts)
         self.send_display_model(diagrams)
         resp = KQMLPerformative('SUCCESS')
-        resp.set('relations-found', len(unique_stmts))
+        resp.set('relations-found', num_unique)
         resp.set('dump-limit', str(DUMP_LIMIT))
         return resp
 
@@ -309,8 +334,23 @@ class MSA_Module(Bioagent):
 
     def _send_display_stmts(self, finder, nl_question):
         try:
+            # Show the statements found so far, if the query isn't done.
+            if not finder.is_complete():
+                partial = finder.get_partial_finder()
+                stmts = partial.get_statements()
+                if stmts:
+                    logger.info('Sending display of %d statements found so '
+                                'far.' % len(stmts))
+                    self.send_provenance_for_stmts(
+                        stmts, nl_question + ' (partial results)',
+                        ev_counts=partial.get_ev_totals(),
+                        source_counts=partial.get_source_counts())
             logger.debug("Waiting for statements to finish...")
-            stmts = finder.get_statements(block=True)
+            stmts = finder.get_statements(block=True, timeout=PROVENANCE_WAIT)
+            if stmts is None:
+                logger.warning('Statements not done after %s seconds, not '
+                               'refining the provenance.' % PROVENANCE_WAIT)
+                return
             start_time = datetime.now()
             logger.info('Sending display statements.')
             self.send_provenance_for_stmts(stmts, nl_question,
@@ -324,21 +364,6 @@ class MSA_Module(Bioagent):
             raise
 
 
-def _make_sbgn(stmts):
-    sa = SBGNAssembler()
-    sa.add_statements(stmts)
-    sa.make_model()
-    sbgn_str = sa.print_model()
-    logger.info(sbgn_str)
-    return sbgn_str
-
-
-def _make_diagrams(stmts):
-    sbgn = _make_sbgn(stmts)
-    diagrams = {'sbgn': sbgn.decode('utf-8')}
-    return diagrams
-
-
 def _get_agent_if_present(content, key):
     obj_clj = content.get(key)
     if obj_clj is None:
@@ -0,0 +1,145 @@
+"""Assemble and cache the models of the statements from a paper.
+
+Assembling the statements of a paper (grounding and sequence mapping,
+preassembly and the SBGN diagram) is slow for papers with many statements,
+and the same papers tend to be asked about repeatedly. The PaperModels keep
+the assembled models of recent papers, keyed by PMID and the hashes of the
+statements found, and assemble the models of large papers in worker
+processes so that they don't hold up the other requests of the agent.
+"""
+import logging
+from threading import Lock
+from concurrent.futures import ProcessPoolExecutor, \
+    TimeoutError as FuturesTimeoutError
+
+from indra.assemblers.sbgn import SBGNAssembler
+from indra.tools import assemble_corpus as ac
+
+from bioagents.cache import LRUCache
+from bioagents.deadline import DeadlineExceeded, limit_timeout
+from bioagents.settings import PAPER_MODEL_CACHE_SIZE, \
+    PREASSEMBLY_PROCESSES, PREASSEMBLY_PROCESS_MIN
+
+logger = logging.getLogger('MSA')
+
+
+def _make_sbgn(stmts):
+    sa = SBGNAssembler()
+    sa.add_statements(stmts)
+    sa.make_model()
+    sbgn_str = sa.print_model()
+    logger.info(sbgn_str)
+    return sbgn_str
+
+
+def _make_diagrams(stmts):
+    sbgn = _make_sbgn(stmts)
+    diagrams = {'sbgn': sbgn.decode('utf-8')}
+    return diagrams
+
+
+def assemble_paper_model(stmts):
+    """Assemble the statements of a paper.
+
+    This runs in worker processes, so it must stay a module level function.
+
+    Returns
+    -------
+    num_unique : int
+        The number of unique statements after preassembly.
+    diagrams : dict
+        The diagrams of the statements, keyed by type.
+    """
+    stmts = ac.map_grounding(stmts)
+    stmts = ac.map_sequence(stmts)
+    unique_stmts = ac.run_preassembly(stmts, return_toplevel=True)
+    return len(unique_stmts), _make_diagrams(stmts)
+
+
+def get_paper_model_key(pmid, stmts):
+    """Get the key of the model of the statements found for a paper."""
+    return pmid, tuple(sorted(stmt.get_hash(shallow=True) for stmt in stmts))
+
+
+class PaperModels(object):
+    """The assembled models of papers, cached and built in worker processes.
+
+    Parameters
+    ----------
+    cache_size : int
+        The number of models kept. If 0, nothing is cached.
+    num_processes : int
+        The number of worker processes assembling the models of papers with
+        at least `min_stmts` statements. If 0, all models are assembled in
+        the thread handling the request.
+    min_stmts : int
+        The number of statements from which a model is assembled in a worker
+        process.
+    """
+    def __init__(self, cache_size=PAPER_MODEL_CACHE_SIZE,
+                 num_processes=PREASSEMBLY_PROCESSES,
+                 min_stmts=PREASSEMBLY_PROCESS_MIN):
+        self.cache = LRUCache(cache_size)
+        self.num_processes = num_processes
+        self.min_stmts = min_stmts
+        self._pool = None
+        self._lock = Lock()
+        self.assembled = 0
+        self.assembled_in_process = 0
+
+    def _get_pool(self):
+        # The processes are only started once a large paper comes.
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.num_processes)
+            return self._pool
+
+    def get_model(self, pmid, stmts):
+        """Get the number of unique statements and diagrams of a paper.
+
+        When the model is assembled in a worker process, this waits at most
+        until the deadline of the request, after which DeadlineExceeded is
+        raised. The model is still cached once assembled, so that the paper
+        is answered right away when asked about again.
+        """
+        key = get_paper_model_key(pmid, stmts)
+        model = self.cache.get(key)
+        if model is not None:
+            logger.info('Found the assembled model of PMID %s.' % pmid)
+            return model
+        with self._lock:
+            self.assembled += 1
+        if not self.num_processes or len(stmts) < self.min_stmts:
+            model = assemble_paper_model(stmts)
+            self.cache.put(key, model)
+            return model
+
+        logger.info('Assembling the model of the %d statements of PMID %s in '
+                    'a worker process.' % (len(stmts), pmid))
+        with self._lock:
+            self.assembled_in_process += 1
+        future = self._get_pool().submit(assemble_paper_model, stmts)
+        future.add_done_callback(lambda f: self._store(key, f))
+        try:
+            return future.result(limit_timeout(None))
+        except FuturesTimeoutError:
+            raise DeadlineExceeded('The deadline of the request has passed '
+                                   'while assembling the model of PMID %s.'
+                                   % pmid)
+
+    def _store(self, key, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.cache.put(key, future.result())
+
+    def get_stats(self):
+        with self._lock:
+            return {'cache': self.cache.get_stats(),
+                    'assembled': self.assembled,
+                    'assembled_in_process': self.assembled_in_process}
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
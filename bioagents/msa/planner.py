@@ -0,0 +1,194 @@
+"""Answer statement queries from the cached results of broader queries.
+
+Many queries ask for a subset of what another asks for. The statements from
+a subject X are among those about X in any role, the statements of one type
+are among those of any type, and the statements from X to Y are among those
+from X. If the complete results of such a broader query are cached, the
+QueryPlanner answers the narrower query by filtering them locally.
+
+Queries that don't persist only get the first page of their results from the
+database, so their results are known to be complete only when they are
+shorter than a page.
+"""
+import json
+import logging
+from threading import Lock
+from collections import Counter
+
+from bioagents.cache import LRUCache
+from bioagents.settings import PLANNER_INDEX_CACHE_SIZE
+from bioagents.msa.local_index import LocalStatementIndex
+from bioagents.msa.statement_cache import normalize_query_kwargs, \
+    QUERY_DEFAULTS
+
+logger = logging.getLogger('MSA')
+
+
+_CONSTRAINTS = ('subject', 'object', 'agents', 'stmt_type', 'use_exact_type')
+
+# The number of statements in a page of results of the database.
+DB_PAGE_SIZE = 1000
+
+
+def get_superset_constraints(constraints):
+    """Yield the agent and type constraints of broader queries, with names.
+
+    The constraints are normalized query arguments, as returned by
+    `normalize_query_kwargs`. The broadest queries come last.
+    """
+    subj = constraints.get('subject')
+    obj = constraints.get('object')
+    agents = constraints.get('agents', [])
+    stmt_type = constraints.get('stmt_type')
+
+    agent_options = []
+    if subj and obj:
+        agent_options += [('subject', {'subject': subj}),
+                          ('object', {'object': obj}),
+                          ('agents', {'agents': sorted([subj, obj])})]
+    if subj:
+        agent_options.append(('neighborhood', {'agents': [subj]}))
+    if obj:
+        agent_options.append(('neighborhood', {'agents': [obj]}))
+    if len(agents) > 1:
+        agent_options += [('neighborhood', {'agents': [agent]})
+                          for agent in agents]
+    agent_constraints = {key: constraints[key]
+                         for key in ('subject', 'object', 'agents')
+                         if key in constraints}
+
+    if stmt_type:
+        yield 'any_type', agent_constraints
+    for name, option in agent_options:
+        if stmt_type:
+            yield name, dict(option, stmt_type=stmt_type)
+        yield name, option
+
+
+def _ev_limit_covers(superset_limit, limit):
+    """Return True if evidence limited to superset_limit includes limit."""
+    if superset_limit is None:
+        return True
+    return limit is not None and superset_limit >= limit
+
+
+class QueryPlanner(object):
+    """Find the results of a query by filtering cached broader results.
+
+    Only broader queries whose results are complete are used, with at least
+    as much evidence per statement as asked for. The results are complete if
+    the query persists and has no limit on the number of statements, or if it
+    doesn't persist but found fewer statements than a page of the database.
+
+    The indexes of the results of the broader queries used most recently are
+    kept, and reused as long as those results are unchanged in the cache.
+
+    Parameters
+    ----------
+    cache : StatementCache
+        The cache in which the results of broader queries are looked up.
+    index_cache_size : int
+        The number of indexes of broader results kept.
+    """
+    def __init__(self, cache, index_cache_size=PLANNER_INDEX_CACHE_SIZE):
+        self.cache = cache
+        self.indexes = LRUCache(index_cache_size)
+        self._lock = Lock()
+        self.lookups = 0
+        self.served = 0
+        self.served_by = Counter()
+
+    def _get_superset_keys(self, normalized):
+        """Yield the keys of broader queries, with the kind of each.
+
+        With each key comes the number of statements below which its results
+        are complete, or None if they are always complete.
+        """
+        settings = {k: v for k, v in normalized.items()
+                    if k not in _CONSTRAINTS}
+        ev_limit = settings.get('ev_limit', QUERY_DEFAULTS['ev_limit'])
+        # The broader query either has the same settings, except it is
+        # complete, or the default settings.
+        superset_settings = [{k: v for k, v in settings.items()
+                              if k not in ('persist', 'max_stmts')}, {}]
+        for name, constraints in get_superset_constraints(normalized):
+            seen = set()
+            for options in superset_settings:
+                superset_limit = options.get('ev_limit',
+                                             QUERY_DEFAULTS['ev_limit'])
+                if not _ev_limit_covers(superset_limit, ev_limit):
+                    continue
+                for persist, page_size in [(True, None),
+                                           (False, DB_PAGE_SIZE)]:
+                    key = json.dumps(normalize_query_kwargs(
+                        dict(options, persist=persist, **constraints)),
+                        sort_keys=True)
+                    if key not in seen:
+                        seen.add(key)
+                        yield name, key, page_size
+
+    def find(self, query_kwargs):
+        """Get a StaticProcessor with the results of a query, or None."""
+        normalized = normalize_query_kwargs(query_kwargs)
+        if normalized.get('simple_response'):
+            return None
+        with self._lock:
+            self.lookups += 1
+        for name, key, page_size in self._get_superset_keys(normalized):
+            index = self._get_index(key)
+            if index is None:
+                continue
+            if page_size is not None and len(index.statements) >= page_size:
+                # There may be more pages of results.
+                continue
+            args = {k: v for k, v in query_kwargs.items()
+                    if k not in ('timeout', 'tries')}
+            processor = index.query(**args)
+            with self._lock:
+                self.served += 1
+                self.served_by[name] += 1
+            logger.info('Answered %s from the cached results of %s.'
+                        % (json.dumps(normalized, sort_keys=True), key))
+            return processor
+        return None
+
+    def _get_index(self, key):
+        """Get the index of the cached results of a query, or None."""
+        entry = self.indexes.get(key)
+        if entry is not None:
+            created, index = entry
+            # The results may have been replaced or expired since indexed.
+            if self.cache.get_created(key) == created:
+                return index
+            self.indexes.pop(key)
+        entry = self.cache.get_entry(key)
+        if entry is None:
+            return None
+        created, superset = entry
+        index = LocalStatementIndex(superset.statements,
+                                    superset.get_ev_counts(),
+                                    superset.get_source_counts())
+        self.indexes.put(key, (created, index))
+        return index
+
+    def get_stats(self):
+        """Get a dict of the number of queries served from broader ones."""
+        with self._lock:
+            return {'lookups': self.lookups, 'served': self.served,
+                    'served_by': dict(self.served_by),
+                    'served_rate': self.served / self.lookups
+                    if self.lookups else None,
+                    'indexes': self.indexes.get_stats()}
+
+
+_planner = None
+_planner_lock = Lock()
+
+
+def get_query_planner(cache):
+    """Get the QueryPlanner of the process, using the given cache."""
+    global _planner
+    with _planner_lock:
+        if _planner is None or _planner.cache is not cache:
+            _planner = QueryPlanner(cache)
+    return _planner
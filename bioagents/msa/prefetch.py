@@ -0,0 +1,153 @@
+"""Query the statements about entities before anyone asks for them.
+
+Once an entity comes up in a dialogue, the next question is often about its
+neighborhood, upstreams or downstreams. The Prefetcher runs these queries in
+the background, on a few threads, and stores their results in the statement
+cache, from which the MSA answers the questions when they come.
+"""
+import logging
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+from indra.sources import indra_db_rest as idbr
+
+from bioagents.settings import PREFETCH_WORKERS, PREFETCH_QUEUE_LIMIT, \
+    STATEMENT_INDEX_FILE
+from bioagents.msa.msa import Neighborhood, FromSource, ToTarget, \
+    EntityError
+from bioagents.msa.statement_cache import make_query_key, get_statement_cache
+from bioagents.msa.inflight import in_flight_queries
+
+logger = logging.getLogger('MSA')
+
+
+# The finders whose queries are prefetched for each entity, with the settings
+# the MSA module uses for them.
+PREFETCH_QUERIES = [(Neighborhood, {'ev_limit': 3, 'persist': False}),
+                    (FromSource, {'ev_limit': 3, 'persist': False}),
+                    (ToTarget, {'ev_limit': 3, 'persist': False})]
+
+
+class Prefetcher(object):
+    """Run likely statement queries in the background, into the cache.
+
+    Queries whose results are cached, or which are already being prefetched,
+    are skipped. At most `num_workers` queries run at a time, and at most
+    `max_queue_size` wait, beyond which new queries are dropped, so that
+    prefetching never competes much with the queries being asked.
+
+    Parameters
+    ----------
+    cache : StatementCache
+        The cache in which the results are stored.
+    num_workers : int
+        The number of threads running the queries.
+    max_queue_size : int
+        The maximum number of queries waiting for a thread.
+    queries : list[tuple]
+        Pairs of a StatementFinder class and the settings of its query, for
+        the queries to run for each entity.
+    """
+    def __init__(self, cache, num_workers=PREFETCH_WORKERS,
+                 max_queue_size=PREFETCH_QUEUE_LIMIT, queries=None):
+        self.cache = cache
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self.queries = queries if queries is not None else PREFETCH_QUERIES
+        self._executor = ThreadPoolExecutor(num_workers)
+        self._lock = Lock()
+        self._in_flight = set()
+        self.requested = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+
+    def prefetch(self, agents):
+        """Start the queries for a list of agents that were mentioned.
+
+        Returns the number of queries that were started.
+        """
+        started = 0
+        for agent in agents:
+            if agent is None:
+                continue
+            for finder_class, settings in self.queries:
+                try:
+                    kwargs = finder_class.make_query_kwargs(agent,
+                                                            **settings)
+                except EntityError:
+                    continue
+                if self._submit(make_query_key(kwargs), kwargs):
+                    started += 1
+        return started
+
+    def _submit(self, key, kwargs):
+        with self._lock:
+            self.requested += 1
+            if key in self._in_flight or self.cache.contains(key) \
+                    or in_flight_queries.get_num_sharing(key):
+                self.skipped += 1
+                return False
+            if len(self._in_flight) >= self.num_workers + self.max_queue_size:
+                self.dropped += 1
+                return False
+            self._in_flight.add(key)
+        self._executor.submit(self._run, key, kwargs)
+        return True
+
+    def _run(self, key, kwargs):
+        started = False
+        try:
+            # The query is registered as in progress, so that the same query
+            # asked in the meantime shares it.
+            processor, started = in_flight_queries.acquire(
+                key, lambda: idbr.get_statements(timeout=0, **kwargs))
+            if started:
+                processor.wait_until_done()
+                if processor.statements:
+                    self.cache.put(key, processor, prefetched=True)
+            with self._lock:
+                if started:
+                    self.completed += 1
+                else:
+                    self.skipped += 1
+        except Exception as e:
+            logger.warning('Failed to prefetch %s: %s' % (key, e))
+            with self._lock:
+                self.failed += 1
+        finally:
+            if started:
+                in_flight_queries.release(key)
+            with self._lock:
+                self._in_flight.discard(key)
+        return
+
+    def get_stats(self):
+        """Get a dict of the number of queries prefetched and later used."""
+        with self._lock:
+            stats = {'requested': self.requested, 'skipped': self.skipped,
+                     'dropped': self.dropped, 'completed': self.completed,
+                     'failed': self.failed, 'in_flight': len(self._in_flight)}
+        stats['hits'] = self.cache.prefetch_hits
+        stats['hit_rate'] = stats['hits'] / self.completed \
+            if self.completed else None
+        return stats
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        return
+
+
+def make_prefetcher(num_workers=PREFETCH_WORKERS):
+    """Get a Prefetcher, or None if there is no need or way to prefetch.
+
+    Nothing is prefetched if the statements are searched in a local index,
+    or if the statement cache is disabled.
+    """
+    if not num_workers or STATEMENT_INDEX_FILE is not None:
+        return None
+    cache = get_statement_cache()
+    if cache is None:
+        return None
+    return Prefetcher(cache, num_workers)
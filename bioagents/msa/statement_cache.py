@@ -0,0 +1,357 @@
+"""A persistent cache of the results of INDRA DB REST statement queries."""
+import json
+import time
+import zlib
+import sqlite3
+import logging
+from os import path, makedirs
+from threading import Lock, Thread
+
+from indra.statements import stmts_from_json, stmts_to_json
+from bioagents.settings import STATEMENT_CACHE_FILE, STATEMENT_CACHE_TTL, \
+    STATEMENT_CACHE_MAX_SIZE
+
+logger = logging.getLogger('MSA')
+
+
+class StaticProcessor(object):
+    """Stand in for an IndraDBRestProcessor whose results are already known.
+
+    This has the same interface as the processors returned by
+    `indra.sources.indra_db_rest.get_statements`, but is never working.
+
+    Parameters
+    ----------
+    statements : list[indra.statements.Statement]
+        The statements found by the query.
+    ev_counts : dict
+        The total evidence counts keyed by statement hash, as a string.
+    source_counts : dict
+        The evidence counts by source keyed by statement hash, as an int.
+    statements_sample : list[indra.statements.Statement] or None
+        The sample of statements, by default all the statements.
+    """
+    def __init__(self, statements, ev_counts=None, source_counts=None,
+                 statements_sample=None):
+        self.statements = statements
+        self.statements_sample = statements_sample \
+            if statements_sample is not None else statements[:]
+        self._ev_counts = {str(k): v for k, v in ev_counts.items()} \
+            if ev_counts else {}
+        self._source_counts = {int(k): v for k, v in source_counts.items()} \
+            if source_counts else {}
+
+    @classmethod
+    def from_processor(cls, processor):
+        """Copy the results of a processor that is done."""
+        return cls(processor.statements[:], processor.get_ev_counts(),
+                   processor.get_source_counts())
+
+    def is_working(self):
+        return False
+
+    def wait_until_done(self, timeout=None):
+        return True
+
+    def get_ev_count(self, stmt):
+        return self.get_ev_count_by_hash(stmt.get_hash(shallow=True))
+
+    def get_ev_count_by_hash(self, stmt_hash):
+        return self._ev_counts.get(str(stmt_hash))
+
+    def get_source_count(self, stmt):
+        return self.get_source_count_by_hash(stmt.get_hash(shallow=True))
+
+    def get_source_count_by_hash(self, stmt_hash):
+        return self._source_counts.get(int(stmt_hash))
+
+    def get_ev_counts(self):
+        return self._ev_counts.copy()
+
+    def get_source_counts(self):
+        return {k: v.copy() for k, v in self._source_counts.items()}
+
+    def get_hash_statements_dict(self):
+        return {stmt.get_hash(shallow=True): stmt for stmt in self.statements}
+
+    def merge_results(self, other_processor):
+        """Merge the results of another processor of either kind."""
+        known = {stmt.get_hash(shallow=True) for stmt in self.statements}
+        for stmt in other_processor.statements:
+            if stmt.get_hash(shallow=True) not in known:
+                self.statements.append(stmt)
+        if other_processor.statements_sample:
+            self.statements_sample.extend(other_processor.statements_sample)
+        self._ev_counts.update({str(k): v for k, v in
+                                other_processor.get_ev_counts().items()})
+        self._source_counts.update({int(k): v for k, v in
+                                    other_processor.get_source_counts().items()
+                                    })
+        return
+
+    def to_json(self):
+        return {'statements': stmts_to_json(self.statements),
+                'ev_counts': self._ev_counts,
+                'source_counts': {str(k): v for k, v
+                                  in self._source_counts.items()}}
+
+    @classmethod
+    def from_json(cls, json_dict):
+        return cls(stmts_from_json(json_dict['statements']),
+                   json_dict['ev_counts'], json_dict['source_counts'])
+
+
+# The default values of the arguments of indra_db_rest.get_statements that
+# affect the results.
+QUERY_DEFAULTS = {'use_exact_type': False, 'persist': True, 'ev_limit': 10,
+                  'best_first': True, 'simple_response': False,
+                  'max_stmts': None}
+
+
+def normalize_query_kwargs(query_kwargs):
+    """Get the arguments of a statement query that affect its results.
+
+    Arguments with their default value are left out, and the agents are
+    sorted, so that the same queries have the same arguments. Arguments
+    that only affect how the query is made (timeout, tries) are ignored.
+    """
+    normalized = {}
+    for arg, value in query_kwargs.items():
+        if arg in ('timeout', 'tries'):
+            continue
+        if arg in QUERY_DEFAULTS:
+            if value == QUERY_DEFAULTS[arg]:
+                continue
+        elif value is None:
+            continue
+        if arg == 'agents':
+            if not value:
+                continue
+            value = sorted(value)
+        normalized[arg] = value
+    return normalized
+
+
+def make_query_key(query_kwargs):
+    """Get a key identifying a statement query by its arguments."""
+    return json.dumps(normalize_query_kwargs(query_kwargs), sort_keys=True)
+
+
+class StatementCache(object):
+    """A cache of statement query results in an sqlite database.
+
+    Entries expire `ttl` seconds after they were stored, and when the
+    entries take up more than `max_size` bytes (compressed), the least
+    recently used ones are removed.
+
+    Parameters
+    ----------
+    fname : str
+        The file of the database, which is created if needed.
+    ttl : float or None
+        The number of seconds an entry is valid. If None, entries don't
+        expire.
+    max_size : int or None
+        The maximum total size of the entries in bytes. If None, the size is
+        not limited.
+    """
+    def __init__(self, fname, ttl=None, max_size=None):
+        self.fname = fname
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.puts = 0
+        self.prefetch_hits = 0
+        # The keys of entries stored by prefetching that were not used yet.
+        self._prefetched = set()
+        self._lock = Lock()
+        dirname = path.dirname(path.abspath(fname))
+        if not path.exists(dirname):
+            makedirs(dirname)
+        self._conn = sqlite3.connect(fname, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS entries '
+                               '(key TEXT PRIMARY KEY, created REAL, '
+                               'last_used REAL, size INTEGER, data BLOB)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS last_used_idx '
+                               'ON entries (last_used)')
+
+    def get(self, key):
+        """Get a StaticProcessor with the cached results, or None."""
+        entry = self.get_entry(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[1]
+
+    def get_entry(self, key):
+        """Get the time the results were stored and the results, or None.
+
+        Unlike `get`, this is not counted as a hit or miss, so that entries
+        can be looked up without changing the hit rate.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT created, data FROM entries WHERE key = ?', (key,)
+                ).fetchone()
+            if row is None:
+                return None
+            created, data = row
+            if self.ttl is not None and now - created > self.ttl:
+                with self._conn:
+                    self._conn.execute('DELETE FROM entries WHERE key = ?',
+                                       (key,))
+                self._prefetched.discard(key)
+                self.expirations += 1
+                return None
+            with self._conn:
+                self._conn.execute('UPDATE entries SET last_used = ? '
+                                   'WHERE key = ?', (now, key))
+            if key in self._prefetched:
+                self._prefetched.discard(key)
+                self.prefetch_hits += 1
+        json_dict = json.loads(zlib.decompress(data).decode('utf-8'))
+        return created, StaticProcessor.from_json(json_dict)
+
+    def get_created(self, key):
+        """Get the time the valid results for a key were stored, or None.
+
+        Unlike `get`, this does not count as a use of the entry.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT created FROM entries WHERE key = ?', (key,)
+                ).fetchone()
+        if row is None \
+                or (self.ttl is not None and time.time() - row[0] > self.ttl):
+            return None
+        return row[0]
+
+    def contains(self, key):
+        """Return True if there are valid results for the key.
+
+        Unlike `get`, this does not count as a use of the entry.
+        """
+        return self.get_created(key) is not None
+
+    def put(self, key, processor, prefetched=False):
+        """Store the results of a processor that is done.
+
+        If `prefetched`, the results were stored before anyone asked for them,
+        and the first use of the entry is counted as a prefetch hit.
+        """
+        if not isinstance(processor, StaticProcessor):
+            processor = StaticProcessor.from_processor(processor)
+        data = zlib.compress(json.dumps(processor.to_json()).encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute('INSERT OR REPLACE INTO entries '
+                                   '(key, created, last_used, size, data) '
+                                   'VALUES (?, ?, ?, ?, ?)',
+                                   (key, now, now, len(data),
+                                    sqlite3.Binary(data)))
+            self.puts += 1
+            if prefetched:
+                self._prefetched.add(key)
+            else:
+                self._prefetched.discard(key)
+            self._evict()
+        return
+
+    def _evict(self):
+        if self.max_size is None:
+            return
+        total_size = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total_size <= self.max_size:
+            return
+        to_remove = []
+        for key, size in self._conn.execute(
+                'SELECT key, size FROM entries ORDER BY last_used'):
+            if total_size <= self.max_size:
+                break
+            to_remove.append((key,))
+            self._prefetched.discard(key)
+            total_size -= size
+        with self._conn:
+            self._conn.executemany('DELETE FROM entries WHERE key = ?',
+                                   to_remove)
+        self.evictions += len(to_remove)
+        logger.info('Evicted %d entries from the statement cache.'
+                    % len(to_remove))
+        return
+
+    def clear(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM entries')
+        return
+
+    def get_stats(self):
+        """Get a dict of the size, hits, misses and evictions of the cache."""
+        with self._lock:
+            num_entries, size = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+                ).fetchone()
+            lookups = self.hits + self.misses
+            return {'entries': num_entries, 'size': size,
+                    'max_size': self.max_size, 'hits': self.hits,
+                    'misses': self.misses, 'expirations': self.expirations,
+                    'evictions': self.evictions, 'puts': self.puts,
+                    'prefetch_hits': self.prefetch_hits,
+                    'hit_rate': self.hits / lookups if lookups else None}
+
+
+_cache = None
+_cache_lock = Lock()
+
+
+def get_statement_cache():
+    """Get the StatementCache set up by the settings, or None if disabled."""
+    global _cache
+    if STATEMENT_CACHE_FILE is None:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = StatementCache(STATEMENT_CACHE_FILE,
+                                        STATEMENT_CACHE_TTL,
+                                        STATEMENT_CACHE_MAX_SIZE)
+            except sqlite3.Error as e:
+                logger.error('Could not open the statement cache: %s' % e)
+                return None
+    return _cache
+
+
+def store_when_done(cache, key, processor, on_done=None):
+    """Store the results of a processor in the cache once it is done.
+
+    Results are only stored if the query finished and found something, so
+    that failed or partial queries are not cached. If given, `on_done` is
+    called with the key once the processor is done, whether or not the
+    results were stored. The cache may be None, in which case nothing is
+    stored.
+    """
+    def store():
+        try:
+            processor.wait_until_done()
+            if cache is None or processor.is_working() \
+                    or not processor.statements:
+                return
+            cache.put(key, processor)
+        except sqlite3.Error as e:
+            logger.error('Could not cache the statements: %s' % e)
+        finally:
+            if on_done is not None:
+                on_done(key)
+    th = Thread(target=store, name='statement-cache-store')
+    th.daemon = True
+    th.start()
+    return th
@@ -0,0 +1,409 @@
+import re
+import json
+import time
+import uuid
+import atexit
+import logging
+from os import path, environ, makedirs, remove, replace, scandir, utime
+from hashlib import sha256
+from collections import deque
+from threading import Thread, Condition, Lock
+
+from bioagents.settings import PROVENANCE_MAX_SIZE, PROVENANCE_MAX_AGE, \
+    PROVENANCE_SHUTDOWN_TIMEOUT
+
+logger = logging.getLogger('Bioagents')
+
+
+class ProvenancePublisher(object):
+    """Assemble, store and send provenance reports on background threads.
+
+    Reports are queued with a key describing their content. A report whose
+    key matches one already waiting in the queue is dropped, since the same
+    report is about to be sent anyway. When the queue is full, the report is
+    published on the calling thread instead, so no report is lost.
+
+    When the process exits, queued reports are finished for at most
+    PROVENANCE_SHUTDOWN_TIMEOUT seconds, after which those left are dropped.
+
+    Parameters
+    ----------
+    num_workers : int
+        The number of worker threads.
+    max_queue_size : int
+        The maximum number of reports waiting for a worker. If 0, the number
+        is not limited.
+    name : str
+        A name used to label the worker threads.
+    """
+    def __init__(self, num_workers, max_queue_size=0, name='Bioagent'):
+        self.max_queue_size = max_queue_size
+        self._cond = Condition()
+        self._jobs = deque()
+        self._waiting_keys = set()
+        self._num_running = 0
+        self._stopped = False
+        self.num_published = 0
+        self.num_coalesced = 0
+        self.num_inline = 0
+        self._workers = []
+        for idx in range(num_workers):
+            th = Thread(target=self._work,
+                        name='%s-provenance-%d' % (name, idx))
+            th.daemon = True
+            th.start()
+            self._workers.append(th)
+        atexit.register(self._shutdown_at_exit)
+        return
+
+    def publish(self, key, func, *args, **kwargs):
+        """Queue `func(*args, **kwargs)`, which publishes a report.
+
+        Returns False if a report with the same key was already waiting, and
+        True otherwise.
+        """
+        with self._cond:
+            if key is not None and key in self._waiting_keys:
+                self.num_coalesced += 1
+                logger.info("Provenance report is already queued, skipping.")
+                return False
+            run_inline = self._stopped or (
+                self.max_queue_size and len(self._jobs) >= self.max_queue_size
+                )
+            if not run_inline:
+                self._jobs.append((key, func, args, kwargs))
+                if key is not None:
+                    self._waiting_keys.add(key)
+                self._cond.notify()
+                return True
+            self.num_inline += 1
+        logger.warning("Provenance queue is full, publishing in this thread.")
+        self._run(func, args, kwargs)
+        return True
+
+    def get_queue_depth(self):
+        """Return the number of reports waiting for a worker."""
+        with self._cond:
+            return len(self._jobs)
+
+    def get_stats(self):
+        with self._cond:
+            return {'queue_depth': len(self._jobs),
+                    'running': self._num_running,
+                    'published': self.num_published,
+                    'coalesced': self.num_coalesced,
+                    'published_inline': self.num_inline}
+
+    def shutdown(self, wait=True, timeout=None):
+        """Stop accepting reports and finish the ones already queued.
+
+        If waiting, this waits at most `timeout` seconds in total, or until
+        all the reports are sent if the timeout is None. Returns the number of
+        reports that are still queued or being sent.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            num_left = len(self._jobs) + self._num_running
+        if wait:
+            if num_left:
+                logger.info("Waiting for %d provenance reports to be sent."
+                            % num_left)
+            end = time.time() + timeout if timeout is not None else None
+            for th in self._workers:
+                th.join(max(end - time.time(), 0) if end is not None
+                         else None)
+        with self._cond:
+            return len(self._jobs) + self._num_running
+
+    def drop_queued(self):
+        """Remove the reports waiting for a worker, returning their number."""
+        with self._cond:
+            num_dropped = len(self._jobs)
+            self._jobs.clear()
+            self._waiting_keys.clear()
+        return num_dropped
+
+    def _shutdown_at_exit(self):
+        # A stuck upload must not keep the process from exiting.
+        num_left = self.shutdown(timeout=PROVENANCE_SHUTDOWN_TIMEOUT)
+        if num_left:
+            num_dropped = self.drop_queued()
+            logger.warning("Exiting with %d provenance reports not sent, of "
+                           "which %d queued were dropped."
+                           % (num_left, num_dropped))
+        return
+
+    def _run(self, func, args, kwargs):
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            logger.error("Failed to publish provenance.")
+            logger.exception(e)
+        with self._cond:
+            self.num_published += 1
+        return
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._stopped:
+                    self._cond.wait()
+                if not self._jobs:
+                    return
+                key, func, args, kwargs = self._jobs.popleft()
+                self._waiting_keys.discard(key)
+                self._num_running += 1
+            try:
+                self._run(func, args, kwargs)
+            finally:
+                with self._cond:
+                    self._num_running -= 1
+
+
+def make_provenance_key(stmts, ev_counts=None, source_counts=None, title=''):
+    """Get a key identifying the evidence page made for a set of Statements.
+
+    The key is a hash of the full hashes of the Statements (which cover their
+    evidence), the evidence and source counts given for them, and the title
+    of the page, so pages with the same key have the same content.
+    """
+    ev_counts = ev_counts if ev_counts else {}
+    source_counts = source_counts if source_counts else {}
+    entries = []
+    for stmt in stmts:
+        sh = stmt.get_hash(shallow=True)
+        srcs = source_counts.get(sh)
+        entries.append([stmt.get_hash(shallow=False), ev_counts.get(sh),
+                        sorted(srcs.items()) if srcs else None])
+    entries.sort(key=lambda entry: entry[0])
+    data = json.dumps([title, entries])
+    return sha256(data.encode('utf-8')).hexdigest()
+
+
+# The names of the pages written by make_provenance_key keys.
+_PAGE_NAME = re.compile(r'^[0-9a-f]{64}\.html$')
+
+
+class FileProvenanceStore(object):
+    """Store evidence pages as html files in a local directory.
+
+    Pages are named by their key, so a page is written once no matter how
+    often it is asked for. Old pages are evicted: pages not used for more
+    than `max_age` seconds are removed, and if the directory still holds more
+    than `max_size` bytes of pages, the least recently used ones are removed.
+    Either limit may be None. Only pages named by a key of
+    `make_provenance_key` are evicted, so that other files in the directory
+    are left alone.
+    """
+    def __init__(self, dirname, max_size=None, max_age=None,
+                 eviction_interval=60):
+        self.dirname = dirname
+        self.max_size = max_size
+        self.max_age = max_age
+        self.eviction_interval = eviction_interval
+        self._last_eviction = None
+        self._lock = Lock()
+        if not path.exists(dirname):
+            makedirs(dirname)
+
+    def _get_path(self, key):
+        return path.join(self.dirname, '%s.html' % key)
+
+    def get_link(self, key):
+        """Get the link to the page with the given key, or None if absent."""
+        fpath = self._get_path(key)
+        try:
+            # Mark the page as used so that it is evicted last.
+            utime(fpath)
+        except OSError:
+            return None
+        return fpath
+
+    def put(self, key, html):
+        """Store the page with the given key, returning a link to it."""
+        fpath = self._get_path(key)
+        tmp_path = '%s.%s.tmp' % (fpath, uuid.uuid4())
+        with open(tmp_path, 'w') as f:
+            f.write(html)
+        replace(tmp_path, fpath)
+        self.evict()
+        return fpath
+
+    def evict(self, force=False):
+        """Remove pages beyond the age and size limits.
+
+        Unless `force` is given, this is done at most once every
+        `eviction_interval` seconds.
+        """
+        if self.max_size is None and self.max_age is None:
+            return 0
+        now = time.time()
+        with self._lock:
+            if not force and self._last_eviction is not None \
+                    and now - self._last_eviction < self.eviction_interval:
+                return 0
+            self._last_eviction = now
+        pages = []
+        for entry in scandir(self.dirname):
+            if not _PAGE_NAME.match(entry.name) or not entry.is_file():
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            pages.append((st.st_mtime, st.st_size, entry.path))
+        pages.sort()
+        total_size = sum(size for _, size, _ in pages)
+        num_removed = 0
+        for mtime, size, fpath in pages:
+            too_old = self.max_age is not None and now - mtime > self.max_age
+            too_big = self.max_size is not None and total_size > self.max_size
+            if not too_old and not too_big:
+                break
+            try:
+                remove(fpath)
+            except OSError:
+                continue
+            total_size -= size
+            num_removed += 1
+        if num_removed:
+            logger.info("Evicted %d provenance pages from %s."
+                        % (num_removed, self.dirname))
+        return num_removed
+
+
+class LocalS3Client(object):
+    """Stand in for a boto3 s3 client with a local directory.
+
+    Objects are stored at {root}/{bucket}/{key}. Only the methods used by
+    S3ProvenanceStore are provided.
+    """
+    def __init__(self, root):
+        self.root = root
+
+    def _get_path(self, bucket, key):
+        return path.join(self.root, bucket, *key.split('/'))
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        fpath = self._get_path(Bucket, Key)
+        dirname = path.dirname(fpath)
+        if not path.exists(dirname):
+            makedirs(dirname)
+        with open(fpath, 'wb') as f:
+            f.write(Body)
+        return {}
+
+    def head_object(self, Bucket, Key):
+        fpath = self._get_path(Bucket, Key)
+        if not path.exists(fpath):
+            raise KeyError(Key)
+        return {'ContentLength': path.getsize(fpath)}
+
+    def get_link(self, bucket, key):
+        return self._get_path(bucket, key)
+
+
+class S3ProvenanceStore(object):
+    """Store evidence pages on s3, named by their key.
+
+    If no client is given, an unsigned boto3 client is used.
+    """
+    def __init__(self, bucket, prefix, client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        if client is None:
+            import boto3
+            from botocore import UNSIGNED
+            from botocore.client import Config
+            client = boto3.client('s3',
+                                  config=Config(signature_version=UNSIGNED))
+        self.client = client
+        self._known_keys = set()
+
+    def _get_link(self, s3_key):
+        if hasattr(self.client, 'get_link'):
+            return self.client.get_link(self.bucket, s3_key)
+        return 'https://s3.amazonaws.com/%s/%s' % (self.bucket, s3_key)
+
+    def get_link(self, key):
+        """Get the link to the page with the given key, or None if absent."""
+        s3_key = '%s%s.html' % (self.prefix, key)
+        if s3_key not in self._known_keys:
+            try:
+                self.client.head_object(Bucket=self.bucket, Key=s3_key)
+            except Exception:
+                return None
+            self._known_keys.add(s3_key)
+        return self._get_link(s3_key)
+
+    def put(self, key, html):
+        """Store the page with the given key, returning a link to it."""
+        s3_key = '%s%s.html' % (self.prefix, key)
+        self.client.put_object(Bucket=self.bucket, Key=s3_key,
+                               Body=html.encode('utf-8'),
+                               ContentType='text/html')
+        self._known_keys.add(s3_key)
+        return self._get_link(s3_key)
+
+
+_stores = {}
+_stores_lock = Lock()
+
+
+def get_provenance_store(loc=None):
+    """Get the store of evidence pages for a provenance location.
+
+    The location is given by the PROVENANCE_LOCATION environment variable if
+    not given here. The location should be divided by colons, the first
+    division indicating whether the pages are stored locally or on s3, being
+    either "file" or "s3" respectively.
+
+    If the pages will be stored locally, the next and last division should be
+    a path (absolute would be best) to the location where html files will be
+    stored. For example:
+
+        file:/home/myname/projects/cwc-integ/provenance
+
+    If the pages will be stored on s3, the next division should be the
+    bucket, and the last division should be a prefix to a "directory" where
+    the html files will be stored. For example:
+
+        s3:cwc-stuff:bob/provenance
+
+    If the PROVENANCE_S3_LOCAL_DIR environment variable is set, the s3 store
+    writes to that directory instead of s3.
+
+    The default is:
+
+        file:{this directory}/../../../provenance
+
+    Which should land in the cwc-integ directory. If the directory does not
+    yet exist, it will be created.
+
+    Returns None if the location is not valid.
+    """
+    if loc is None:
+        loc = environ.get('PROVENANCE_LOCATION')
+    if loc is None:
+        this_dir = path.dirname(path.abspath(__file__))
+        rel = path.join(*([this_dir] + 3*[path.pardir] + ['provenance']))
+        loc = 'file:' + path.abspath(rel)
+    s3_local_dir = environ.get('PROVENANCE_S3_LOCAL_DIR')
+    with _stores_lock:
+        store = _stores.get((loc, s3_local_dir))
+        if store is not None:
+            return store
+        logger.info("Using provenance location: \"%s\"" % loc)
+        parts = loc.split(':')
+        if parts[0] == 'file':
+            store = FileProvenanceStore(parts[1], PROVENANCE_MAX_SIZE,
+                                        PROVENANCE_MAX_AGE)
+        elif parts[0] == 's3':
+            client = LocalS3Client(s3_local_dir) if s3_local_dir else None
+            store = S3ProvenanceStore(parts[1], parts[2], client)
+        else:
+            logger.error('Invalid PROVENANCE_LOCATION: "%s".' % loc)
+            return None
+        _stores[(loc, s3_local_dir)] = store
+    return store
@@ -0,0 +1,469 @@
+"""Record KQML traffic of bioagents and replay it to measure load.
+
+Recording is turned on with the TRAFFIC_RECORD_DIR setting (or the
+`record_dir` keyword argument of a bioagent). Each agent then writes the
+requests it receives and the replies it sends to {name}_kqml.jsonl, and the
+HTTP requests made by the process (to the INDRA DB REST API, cBioPortal, the
+NDEx path service and so on) with their responses to {name}_http.jsonl.
+
+The recorded requests can then be replayed against an agent with
+`ReplayRunner`, or with scripts/replay_traffic.py, while the recorded HTTP
+responses are served by an `HttpStandIn` instead of the real services.
+"""
+import json
+import time
+import base64
+import logging
+from os import path, makedirs
+from threading import Lock, Thread
+from collections import defaultdict
+
+from kqml import KQMLPerformative
+
+logger = logging.getLogger('Bioagents')
+
+
+class TrafficRecorder(object):
+    """Write the requests received and replies sent by an agent to a file."""
+    def __init__(self, fname):
+        self.fname = fname
+        self._lock = Lock()
+        self._next_id = 0
+
+    def _write(self, record):
+        line = json.dumps(record)
+        with self._lock:
+            with open(self.fname, 'a') as fh:
+                fh.write(line + '\n')
+
+    def record_request(self, msg, task):
+        """Record a request, marking the message so its reply is matched."""
+        with self._lock:
+            record_id = self._next_id
+            self._next_id += 1
+        msg.record_id = record_id
+        msg.record_time = time.time()
+        self._write({'type': 'request', 'id': record_id, 'task': task,
+                     'time': msg.record_time, 'message': msg.to_string()})
+        return
+
+    def record_reply(self, msg, reply_content):
+        """Record the reply to a request recorded earlier."""
+        record_id = getattr(msg, 'record_id', None)
+        if record_id is None:
+            return
+        now = time.time()
+        self._write({'type': 'reply', 'id': record_id, 'time': now,
+                     'latency': now - msg.record_time,
+                     'content': reply_content.to_string()})
+        return
+
+
+def load_traffic(fname):
+    """Load recorded requests, with the recorded reply content of each.
+
+    Returns a list of dicts with the task, the time, the message (as a
+    string) and the reply content (as a string, or None if there was no
+    recorded reply) of each request, in the order they were received.
+    """
+    requests = {}
+    replies = {}
+    with open(fname, 'r') as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record['type'] == 'request':
+                requests[record['id']] = record
+            elif record['type'] == 'reply':
+                replies[record['id']] = record
+    traffic = []
+    for record_id, record in sorted(requests.items()):
+        reply = replies.get(record_id)
+        traffic.append({'task': record['task'], 'time': record['time'],
+                        'message': record['message'],
+                        'reply': reply['content'] if reply else None})
+    return traffic
+
+
+def _get_http_key(method, url, params=None, data=None, json_data=None):
+    """Get a string identifying an HTTP request by its method, url and body."""
+    from requests.models import PreparedRequest
+    req = PreparedRequest()
+    req.prepare_url(url, params)
+    # The API key is not part of the query, and should not be recorded.
+    base_url, _, query = req.url.partition('?')
+    query_items = sorted(item for item in query.split('&')
+                         if item and not item.startswith('api_key='))
+    if json_data is not None:
+        body = json.dumps(json_data, sort_keys=True)
+    elif isinstance(data, dict):
+        body = json.dumps(data, sort_keys=True)
+    elif isinstance(data, bytes):
+        body = data.decode('utf-8', errors='replace')
+    else:
+        body = data
+    return json.dumps([method.upper(), base_url, query_items, body])
+
+
+class HttpStandIn(object):
+    """Record HTTP responses to a file, or serve recorded ones instead.
+
+    All requests made through the `requests` package (and therefore by the
+    INDRA DB REST client, the cBioPortal client and the NDEx clients) pass
+    through the stand-in once it is installed.
+
+    Parameters
+    ----------
+    fname : str
+        The file of recorded responses.
+    mode : str
+        Either 'record', to make the requests and record their responses, or
+        'replay', to serve the recorded responses without making any
+        request. When replaying, a request without a recorded response fails
+        with a ConnectionError.
+    delay : float
+        When replaying, the number of seconds to wait before serving each
+        response, to stand in for the latency of the real services.
+    """
+    def __init__(self, fname, mode='replay', delay=0):
+        assert mode in ('record', 'replay')
+        self.fname = fname
+        self.mode = mode
+        self.delay = delay
+        self.responses = {}
+        self.num_served = 0
+        self.num_missing = 0
+        self._lock = Lock()
+        self._original_request = None
+        if mode == 'replay':
+            self._load()
+
+    def _load(self):
+        with open(self.fname, 'r') as fh:
+            for line in fh:
+                if line.strip():
+                    record = json.loads(line)
+                    self.responses[record['key']] = record
+        logger.info('Loaded %d recorded HTTP responses from %s.'
+                    % (len(self.responses), self.fname))
+
+    def install(self):
+        """Route all requests made with `requests` through the stand-in."""
+        from requests.sessions import Session
+        if self._original_request is not None:
+            return
+        self._original_request = Session.request
+        stand_in = self
+
+        def request(session, method, url, params=None, data=None, *args,
+                    **kwargs):
+            key = _get_http_key(method, url, params, data,
+                                kwargs.get('json'))
+            if stand_in.mode == 'replay':
+                return stand_in._serve(key)
+            resp = stand_in._original_request(session, method, url, params,
+                                              data, *args, **kwargs)
+            stand_in._record(key, resp)
+            return resp
+
+        Session.request = request
+        return
+
+    def uninstall(self):
+        from requests.sessions import Session
+        if self._original_request is not None:
+            Session.request = self._original_request
+            self._original_request = None
+        return
+
+    def _record(self, key, resp):
+        record = {'key': key, 'url': resp.url, 'status': resp.status_code,
+                  'headers': {k: v for k, v in resp.headers.items()
+                              if k.lower() not in ('content-encoding',
+                                                   'transfer-encoding',
+                                                   'content-length')},
+                  'content': base64.b64encode(resp.content).decode('ascii')}
+        line = json.dumps(record)
+        with self._lock:
+            self.responses[key] = record
+            with open(self.fname, 'a') as fh:
+                fh.write(line + '\n')
+        return
+
+    def _serve(self, key):
+        from requests.models import Response
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+        from requests.exceptions import ConnectionError
+        record = self.responses.get(key)
+        if record is None:
+            with self._lock:
+                self.num_missing += 1
+            raise ConnectionError('No recorded response for %s' % key)
+        if self.delay:
+            time.sleep(self.delay)
+        resp = Response()
+        resp.status_code = record['status']
+        resp.headers = CaseInsensitiveDict(record['headers'])
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.url = record['url']
+        resp._content = base64.b64decode(record['content'])
+        with self._lock:
+            self.num_served += 1
+        return resp
+
+
+_http_recorder = None
+
+
+def start_recording(agent, record_dir):
+    """Record the KQML and HTTP traffic of an agent to the given directory.
+
+    HTTP traffic is recorded for the whole process, so when several agents
+    run in one process, it is all recorded in the file of the first one.
+
+    Returns the recorder of KQML traffic.
+    """
+    global _http_recorder
+    if not path.exists(record_dir):
+        makedirs(record_dir)
+    fname_base = path.join(record_dir, agent.name.replace(' ', '_'))
+    if _http_recorder is None:
+        _http_recorder = HttpStandIn(fname_base + '_http.jsonl',
+                                     mode='record')
+        _http_recorder.install()
+    return TrafficRecorder(fname_base + '_kqml.jsonl')
+
+
+def stop_recording_http():
+    """Stop recording the HTTP traffic of this process."""
+    global _http_recorder
+    if _http_recorder is not None:
+        _http_recorder.uninstall()
+        _http_recorder = None
+    return
+
+
+def _get_rss():
+    """Get the resident memory of this process in bytes, if possible."""
+    try:
+        with open('/proc/self/statm', 'r') as fh:
+            pages = int(fh.read().split()[1])
+        from resource import getpagesize
+        return pages * getpagesize()
+    except Exception:
+        pass
+    try:
+        # This is the peak, not the current size, and is in kilobytes on
+        # Linux, but in bytes on MacOS.
+        from resource import getrusage, RUSAGE_SELF
+        return getrusage(RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return None
+
+
+def get_percentile(sorted_values, pct):
+    """Get a percentile of a sorted list by the nearest-rank method."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100.0 * len(sorted_values))), 1)
+    return sorted_values[rank - 1]
+
+
+class _CountingSink(object):
+    """Stand in for the output stream of an agent, counting bytes written."""
+    def __init__(self):
+        self.num_bytes = 0
+
+    def write(self, data):
+        self.num_bytes += len(data)
+
+    def flush(self):
+        pass
+
+
+class ReplayRunner(object):
+    """Replay recorded requests against an agent and measure its responses.
+
+    The agent is created in testing mode, so it does not connect to the
+    Facilitator, and requests are passed to its `receive_request` method by
+    a number of client threads, as they would be by its dispatcher.
+
+    Parameters
+    ----------
+    agent : bioagents.Bioagent
+        The agent to replay requests to, created with testing=True.
+    traffic : list[dict]
+        The requests to replay, as returned by `load_traffic`.
+    concurrency : int
+        The number of requests that may be outstanding at the same time.
+    rate : float or None
+        The number of requests started per second. If None, each client
+        starts a new request as soon as its last one is answered.
+    repeat : int
+        The number of times the traffic is replayed.
+    timeout : float
+        The number of seconds to wait for each reply.
+    """
+    def __init__(self, agent, traffic, concurrency=1, rate=None, repeat=1,
+                 timeout=300):
+        self.agent = agent
+        self.traffic = traffic
+        self.concurrency = concurrency
+        self.rate = rate
+        self.repeat = repeat
+        self.timeout = timeout
+        self._lock = Lock()
+        self._pending = {}
+        self._results = []
+        self._sink = _CountingSink()
+        self._hook_agent()
+
+    def _hook_agent(self):
+        agent = self.agent
+        agent.out = self._sink
+        original_reply = agent.reply_with_content
+
+        def reply_with_content(msg, reply_content):
+            with self._lock:
+                pending = self._pending.pop(id(msg), None)
+            if pending is not None:
+                pending['end'] = time.time()
+                pending['reply'] = reply_content
+                pending['done'].set()
+            return original_reply(msg, reply_content)
+
+        agent.reply_with_content = reply_with_content
+
+    def _send(self, item):
+        from threading import Event
+        msg = KQMLPerformative.from_string(item['message'])
+        content = msg.get('content')
+        pending = {'task': item['task'], 'done': Event(), 'reply': None,
+                   'start': time.time(), 'end': None}
+        with self._lock:
+            self._pending[id(msg)] = pending
+        try:
+            self.agent.receive_request(msg, content)
+        except Exception as e:
+            logger.error('Request for %s raised an error.' % item['task'])
+            logger.exception(e)
+        if not pending['done'].wait(self.timeout):
+            with self._lock:
+                self._pending.pop(id(msg), None)
+        reply = pending['reply']
+        result = {'task': item['task'],
+                  'latency': (pending['end'] - pending['start'])
+                  if pending['end'] else None,
+                  'head': reply.head().upper() if reply is not None else None,
+                  'reason': None, 'matches_recording': None}
+        if result['head'] == 'FAILURE':
+            result['reason'] = reply.gets('reason')
+        if item.get('reply') and reply is not None:
+            recorded_head = item['reply'].split(None, 1)[0].strip('()')
+            result['matches_recording'] = \
+                recorded_head.upper() == result['head']
+        with self._lock:
+            self._results.append(result)
+        return
+
+    def run(self):
+        """Replay the traffic, returning a report of the measurements."""
+        items = [item for _ in range(self.repeat) for item in self.traffic]
+        rss_start = _get_rss()
+        start = time.time()
+        next_idx = [0]
+        idx_lock = Lock()
+        rss_peak = [rss_start]
+
+        def client():
+            while True:
+                with idx_lock:
+                    idx = next_idx[0]
+                    if idx >= len(items):
+                        return
+                    next_idx[0] += 1
+                if self.rate:
+                    wait = start + idx / float(self.rate) - time.time()
+                    if wait > 0:
+                        time.sleep(wait)
+                self._send(items[idx])
+                rss = _get_rss()
+                with idx_lock:
+                    if rss is not None and (rss_peak[0] is None
+                                            or rss > rss_peak[0]):
+                        rss_peak[0] = rss
+
+        clients = [Thread(target=client) for _ in range(self.concurrency)]
+        for th in clients:
+            th.start()
+        for th in clients:
+            th.join()
+        elapsed = time.time() - start
+        rss_end = _get_rss()
+        return self._make_report(elapsed, rss_start, rss_end, rss_peak[0])
+
+    def _make_report(self, elapsed, rss_start, rss_end, rss_peak):
+        by_task = defaultdict(list)
+        for result in self._results:
+            by_task[result['task']].append(result)
+        tasks = {}
+        for task, results in sorted(by_task.items()):
+            latencies = sorted(r['latency'] for r in results
+                               if r['latency'] is not None)
+            errors = defaultdict(lambda: 0)
+            for r in results:
+                if r['head'] is None:
+                    errors['NO_REPLY'] += 1
+                elif r['reason'] is not None:
+                    errors[r['reason']] += 1
+            tasks[task] = {
+                'count': len(results),
+                'p50_latency': get_percentile(latencies, 50),
+                'p95_latency': get_percentile(latencies, 95),
+                'p99_latency': get_percentile(latencies, 99),
+                'max_latency': latencies[-1] if latencies else None,
+                'errors': dict(errors),
+                'mismatched_replies': sum(1 for r in results
+                                          if r['matches_recording'] is False)
+                }
+        num_done = sum(1 for r in self._results if r['head'] is not None)
+        return {'agent': self.agent.name,
+                'requests': len(self._results),
+                'replies': num_done,
+                'elapsed': elapsed,
+                'throughput': num_done / elapsed if elapsed else None,
+                'concurrency': self.concurrency,
+                'rate': self.rate,
+                'reply_bytes': self._sink.num_bytes,
+                'rss_start': rss_start,
+                'rss_end': rss_end,
+                'rss_peak': rss_peak,
+                'rss_growth': (rss_end - rss_start)
+                if rss_start is not None and rss_end is not None else None,
+                'tasks': tasks}
+
+
+def print_report(report):
+    """Print a report returned by `ReplayRunner.run` as a table."""
+    def fmt(value):
+        return '%8.3f' % value if value is not None else '%8s' % '-'
+
+    print('Agent: %s' % report['agent'])
+    print('Replies: %d of %d requests in %.1fs (%.2f per second)'
+          % (report['replies'], report['requests'], report['elapsed'],
+             report['throughput'] or 0))
+    if report['rss_growth'] is not None:
+        print('Memory: %.1f MB at start, %.1f MB at end, %.1f MB growth'
+              % (report['rss_start'] / 1e6, report['rss_end'] / 1e6,
+                 report['rss_growth'] / 1e6))
+    print('%-35s %6s %8s %8s %8s %8s  %s'
+          % ('Task', 'Count', 'p50', 'p95', 'p99', 'max', 'Errors'))
+    for task, stats in report['tasks'].items():
+        errors = ', '.join('%s: %d' % item
+                           for item in sorted(stats['errors'].items()))
+        print('%-35s %6d %s %s %s %s  %s'
+              % (task, stats['count'], fmt(stats['p50_latency']),
+                 fmt(stats['p95_latency']), fmt(stats['p99_latency']),
+                 fmt(stats['max_latency']), errors))
@@ -0,0 +1,146 @@
+"""A lexicon of the genes that are kinases, phosphatases or TFs.
+
+The lexicon is compiled from the tables of kinases, phosphatases and
+transcription factors distributed with INDRA into frozen sets of gene names
+and HGNC ids for each entity type, and saved as JSON in LEXICON_FILE if it is
+set. It is loaded once per process through the resource registry, and used by both
+BioSense and the MSA to check the types of entities.
+"""
+import os
+import json
+import logging
+
+from indra import __path__ as _indra_path
+from indra.util import read_unicode_csv
+from indra.databases import hgnc_client
+
+from bioagents.settings import LEXICON_FILE
+from bioagents.resources.registry import registry
+
+logger = logging.getLogger('Bioagents')
+
+_indra_path = _indra_path[0]
+
+_table_files = {
+    'kinase': os.path.join(_indra_path, 'resources', 'kinases.tsv'),
+    'phosphatase': os.path.join(_indra_path, 'resources', 'phosphatases.tsv'),
+    'transcription factor': os.path.join(_indra_path, 'resources',
+                                         'transcription_factors.csv'),
+}
+
+
+def _read_phosphatases():
+    p_table = read_unicode_csv(_table_files['phosphatase'], delimiter='\t')
+    # First column is phosphatase names
+    # Second column is HGNC ids
+    return [(row[0], row[1]) for row in p_table]
+
+
+def _read_kinases():
+    kinase_table = read_unicode_csv(_table_files['kinase'], delimiter='\t')
+    gene_names = [lin[1] for lin in list(kinase_table)[1:]]
+    return [(name, hgnc_client.get_hgnc_id(name)) for name in gene_names]
+
+
+def _read_tfs():
+    tf_table = read_unicode_csv(_table_files['transcription factor'])
+    gene_names = [lin[1] for lin in list(tf_table)[1:]]
+    return [(name, hgnc_client.get_hgnc_id(name)) for name in gene_names]
+
+
+class Lexicon(object):
+    """The gene names and HGNC ids of each entity type, as frozen sets.
+
+    Parameters
+    ----------
+    entries : dict
+        Lists of (name, HGNC id or None) pairs, keyed by entity type.
+    """
+    __slots__ = ['_names', '_hgnc_ids']
+
+    def __init__(self, entries):
+        self._names = {}
+        self._hgnc_ids = {}
+        for ent_type, pairs in entries.items():
+            self._names[ent_type] = frozenset(name for name, _ in pairs)
+            self._hgnc_ids[ent_type] = frozenset(hgnc_id for _, hgnc_id
+                                                 in pairs if hgnc_id)
+
+    @classmethod
+    def build(cls):
+        """Compile the lexicon from the tables distributed with INDRA."""
+        return cls({'kinase': _read_kinases(),
+                    'phosphatase': _read_phosphatases(),
+                    'transcription factor': _read_tfs()})
+
+    def to_json(self):
+        return {ent_type: {'names': sorted(names),
+                           'hgnc_ids': sorted(self._hgnc_ids[ent_type])}
+                for ent_type, names in self._names.items()}
+
+    @classmethod
+    def from_json(cls, json_dict):
+        lexicon = cls({})
+        for ent_type, entries in json_dict.items():
+            lexicon._names[ent_type] = frozenset(entries['names'])
+            lexicon._hgnc_ids[ent_type] = frozenset(entries['hgnc_ids'])
+        return lexicon
+
+    def save(self, fname):
+        dirname = os.path.dirname(fname)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(fname, 'w') as fh:
+            json.dump(self.to_json(), fh)
+
+    @classmethod
+    def load(cls, fname):
+        with open(fname, 'r') as fh:
+            return cls.from_json(json.load(fh))
+
+    def get_names(self, ent_type):
+        """Get the frozen set of the gene names of an entity type."""
+        return self._names.get(ent_type, frozenset())
+
+    def is_of_type(self, agent, ent_type):
+        """Return True if the agent has a name or HGNC id of ent_type."""
+        if agent.name in self._names.get(ent_type, ()):
+            return True
+        hgnc_id = agent.db_refs.get('HGNC')
+        return hgnc_id is not None \
+            and hgnc_id in self._hgnc_ids.get(ent_type, ())
+
+
+def _is_up_to_date(fname):
+    """Return True if a saved lexicon is newer than the tables it is from."""
+    if not os.path.exists(fname):
+        return False
+    mtime = os.path.getmtime(fname)
+    return all(os.path.getmtime(table) <= mtime
+               for table in _table_files.values() if os.path.exists(table))
+
+
+def load_lexicon():
+    """Load the saved lexicon, compiling and saving it if it is out of date."""
+    if LEXICON_FILE is not None and _is_up_to_date(LEXICON_FILE):
+        try:
+            return Lexicon.load(LEXICON_FILE)
+        except Exception as e:
+            logger.warning('Could not load the lexicon from %s, compiling it '
+                           'again: %s' % (LEXICON_FILE, e))
+    lexicon = Lexicon.build()
+    if LEXICON_FILE is not None:
+        try:
+            lexicon.save(LEXICON_FILE)
+        except Exception as e:
+            logger.warning('Could not save the lexicon to %s: %s'
+                           % (LEXICON_FILE, e))
+    return lexicon
+
+
+registry.register('lexicon', load_lexicon)
+
+
+def get_lexicon():
+    """Return the Lexicon, loading or compiling it on first use."""
+    return registry.get('lexicon')
@@ -0,0 +1,76 @@
+import time
+import logging
+from threading import Lock
+
+logger = logging.getLogger('Bioagents')
+
+
+class ResourceRegistry(object):
+    """Load shared resources once per process, on first use.
+
+    Modules register a loader for each resource they need under a name, and
+    get the resource by that name. Each loader is called at most once, so
+    agents running in the same process share a single copy of each resource.
+    Resources must therefore not be modified by the code using them.
+    """
+    def __init__(self):
+        self._loaders = {}
+        self._resources = {}
+        self._load_times = {}
+        self._locks = {}
+        self._lock = Lock()
+
+    def register(self, name, loader):
+        """Register a function taking no arguments that loads a resource."""
+        with self._lock:
+            if name in self._loaders and self._loaders[name] is not loader:
+                logger.warning('Replacing the loader of resource %s.' % name)
+                self._resources.pop(name, None)
+            self._loaders[name] = loader
+            self._locks.setdefault(name, Lock())
+        return
+
+    def get(self, name):
+        """Get a resource, loading it if it has not been loaded yet."""
+        try:
+            return self._resources[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._loaders:
+                raise KeyError('No resource named %s is registered.' % name)
+            loader = self._loaders[name]
+            lock = self._locks[name]
+        # Loading happens under a lock for this resource only, so that other
+        # resources can be loaded at the same time.
+        with lock:
+            if name not in self._resources:
+                start = time.time()
+                self._resources[name] = loader()
+                self._load_times[name] = time.time() - start
+                logger.info('Loaded resource %s in %.2fs.'
+                            % (name, self._load_times[name]))
+        return self._resources[name]
+
+    def is_loaded(self, name):
+        return name in self._resources
+
+    def get_names(self):
+        """Return the names of all registered resources."""
+        with self._lock:
+            return sorted(self._loaders.keys())
+
+    def load_all(self):
+        """Load all registered resources."""
+        for name in self.get_names():
+            self.get(name)
+        return
+
+    def get_stats(self):
+        """Get a dict of the time taken to load each loaded resource."""
+        return {'loaded': sorted(self._resources.keys()),
+                'load_times': dict(self._load_times)}
+
+
+# The registry shared by all agents in a process.
+registry = ResourceRegistry()
@@ -1,11 +1,25 @@
 import os
 from indra.preassembler.hierarchy_manager import HierarchyManager
+from bioagents.resources.registry import registry
 
-# Make a TRIPS ontology
 _fname = os.path.join(os.path.dirname(__file__), 'trips_ontology.rdf')
-trips_ontology = HierarchyManager(_fname, uri_as_name=False, build_closure=True)
-trips_ontology.relations_prefix = 'http://trips.ihmc.us/relations/'
-trips_ontology.initialize()
+
+
+def _make_trips_ontology():
+    trips_ontology = HierarchyManager(_fname, uri_as_name=False,
+                                      build_closure=True)
+    trips_ontology.relations_prefix = 'http://trips.ihmc.us/relations/'
+    trips_ontology.initialize()
+    return trips_ontology
+
+
+registry.register('trips_ontology', _make_trips_ontology)
+
+
+def get_trips_ontology():
+    """Return the TRIPS ontology, building its closure on first use."""
+    return registry.get('trips_ontology')
+
 
 def trips_isa(concept1, concept2):
     # Preprocess to make this more general
@@ -13,6 +27,6 @@ def trips_isa(concept1, concept2):
     concept2 = concept2.lower().replace('ont::', '')
     if concept1 == concept2:
         return True
-    isa = trips_ontology.isa('http://trips.ihmc.us/concepts/', concept1,
-                             'http://trips.ihmc.us/concepts/', concept2)
+    isa = get_trips_ontology().isa('http://trips.ihmc.us/concepts/', concept1,
+                                   'http://trips.ihmc.us/concepts/', concept2)
     return isa
@@ -1,4 +1,17 @@
-__all__ = ['IMAGE_DIR', 'TIMESTAMP_PICS']
+__all__ = ['IMAGE_DIR', 'TIMESTAMP_PICS', 'REQUEST_WORKERS',
+           'REQUEST_QUEUE_LIMIT', 'TASK_DEADLINES', 'STATS_FILE',
+           'STATS_DUMP_INTERVAL',
+           'CLJSON_CACHE_SIZE', 'PROVENANCE_WORKERS', 'PROVENANCE_QUEUE_LIMIT',
+           'PROVENANCE_MAX_SIZE', 'PROVENANCE_MAX_AGE',
+           'PROVENANCE_SHUTDOWN_TIMEOUT', 'BATCH_WORKERS',
+           'BATCH_MAX_SIZE', 'TRAFFIC_RECORD_DIR', 'STATEMENT_CACHE_FILE',
+           'STATEMENT_CACHE_TTL', 'STATEMENT_CACHE_MAX_SIZE',
+           'PLANNER_INDEX_CACHE_SIZE', 'STATEMENT_INDEX_FILE',
+           'COMMONS_WORKERS', 'EARLY_ANSWER_WAIT',
+           'PROVENANCE_WAIT', 'PREFETCH_WORKERS', 'PREFETCH_QUEUE_LIMIT',
+           'COMPACT_STATEMENTS_MIN',
+           'PAPER_MODEL_CACHE_SIZE', 'PREASSEMBLY_PROCESSES',
+           'PREASSEMBLY_PROCESS_MIN', 'LEXICON_FILE']
 
 from os import path, mkdir
 
@@ -13,3 +26,148 @@ if not path.exists(IMAGE_DIR):
 # Choose whether images are given a timestamp. This can cause a buildup of
 # images over time, however it guarantees overall uniqueness over a single run.
 TIMESTAMP_PICS = False
+
+# Choose the number of worker threads a bioagent uses to respond to requests.
+# If 0, each request is handled on the thread that reads KQML messages, so a
+# slow request blocks all others until it is done.
+REQUEST_WORKERS = 0
+
+# Choose the maximum number of requests that may wait for a worker thread. Any
+# further requests are answered immediately with a FAILURE. If 0, the number of
+# waiting requests is not limited. Has no effect if REQUEST_WORKERS is 0.
+REQUEST_QUEUE_LIMIT = 20
+
+# Choose default deadlines (in seconds) for the requests of some tasks, keyed
+# by the name of the agent and then by the task, for instance
+# {'TRA': {'SATISFIES-PATTERN': 300}, 'MRA': {'BUILD-MODEL': 120}}. A deadline
+# given in a request takes precedence. By default, requests have no deadline.
+TASK_DEADLINES = {}
+
+# Choose a file to which each bioagent periodically writes the statistics it
+# collects on the requests it handles (as returned by GET-AGENT-STATS). The
+# name of the agent is substituted for {name}. If None, nothing is written.
+STATS_FILE = None
+
+# Choose how often (in seconds) the statistics are written to STATS_FILE.
+STATS_DUMP_INTERVAL = 60
+
+# Choose the number of Agents and Statements whose CL-JSON representation is
+# cached (in each direction). If 0, nothing is cached.
+CLJSON_CACHE_SIZE = 5000
+
+# Choose the number of threads a bioagent uses to assemble, store and send
+# provenance reports in the background. If 0, reports are sent before the reply
+# to the request they support.
+PROVENANCE_WORKERS = 1
+
+# Choose the maximum number of provenance reports that may wait for a thread.
+# Further reports are sent before the reply to the request. If 0, the number of
+# waiting reports is not limited.
+PROVENANCE_QUEUE_LIMIT = 10
+
+# Choose the maximum number of seconds a bioagent waits, when exiting, for
+# its queued provenance reports to be sent. The reports still queued are then
+# dropped. If None, the bioagent waits until all reports are sent.
+PROVENANCE_SHUTDOWN_TIMEOUT = 10
+
+# Choose the maximum total size (in bytes) of the evidence pages kept in a
+# local provenance directory. The least recently used pages are removed
+# beyond this size, for instance 500 * 1024**2. If None, the size is not
+# limited.
+PROVENANCE_MAX_SIZE = None
+
+# Choose the number of seconds after which an evidence page that has not been
+# used is removed from a local provenance directory, for instance
+# 30 * 24 * 3600. If None, pages are kept regardless of their age.
+PROVENANCE_MAX_AGE = None
+
+# Choose the number of threads used to handle the requests in a BATCH request
+# at the same time, for tasks the agent declares safe to handle in parallel.
+BATCH_WORKERS = 4
+
+# Choose the maximum number of requests in a BATCH request.
+BATCH_MAX_SIZE = 100
+
+# Choose a directory in which each bioagent records the KQML requests it
+# receives, its replies, and the HTTP responses it gets from other services,
+# so that they can be replayed for load testing (see bioagents.replay). If
+# None, nothing is recorded.
+TRAFFIC_RECORD_DIR = None
+
+# Choose the sqlite file in which the MSA caches the statements, evidence counts
+# and source counts found by its queries to the INDRA DB REST API, so repeated
+# questions are answered without querying it again, for instance
+# path.join(path.expanduser('~'), '.bioagents', 'statement_cache.db'). If None,
+# nothing is cached.
+STATEMENT_CACHE_FILE = None
+
+# Choose the number of seconds after which a cached query result is no longer
+# used, so that new content in the database is picked up. If None, cached
+# results are used regardless of their age.
+STATEMENT_CACHE_TTL = 24 * 3600
+
+# Choose the maximum total size (in bytes, compressed) of the cached query
+# results. The least recently used results are removed beyond this size. If
+# None, the size is not limited.
+STATEMENT_CACHE_MAX_SIZE = 1024**3
+
+# Choose the number of cached query results the MSA keeps indexed in memory to
+# answer narrower queries from. If 0, the results are indexed again for each
+# query they answer.
+PLANNER_INDEX_CACHE_SIZE = 10
+
+# Choose a local dump of statements (INDRA JSON or pickle) which the MSA
+# searches instead of querying the INDRA DB REST API. The statements are
+# indexed in memory when first needed. If None, the database is queried.
+STATEMENT_INDEX_FILE = None
+
+# Choose the number of queries the MSA makes at the same time when looking
+# for the common upstreams or downstreams of a list of genes.
+COMMONS_WORKERS = 4
+
+# Choose the number of seconds the MSA waits for all the statements about a
+# relation before answering with those found so far. The provenance is sent
+# again once all the statements are found.
+EARLY_ANSWER_WAIT = 15
+
+# Choose the maximum number of seconds the MSA waits for all the statements
+# about a relation before sending their provenance, after it answered with
+# those found so far. If None, it waits until all the statements are found.
+PROVENANCE_WAIT = None
+
+# Choose the number of threads the MSA uses to query, in the background, the
+# neighborhood, upstreams and downstreams of the entities it is asked about,
+# so that the likely next questions are answered from the statement cache. If
+# 0, nothing is prefetched. Has no effect if STATEMENT_CACHE_FILE is None.
+PREFETCH_WORKERS = 0
+
+# Choose the maximum number of prefetch queries that may wait for a thread.
+# Further prefetch queries are dropped.
+PREFETCH_QUEUE_LIMIT = 20
+
+# Choose the number of statements from which the MSA keeps the statements it
+# found as compact records, with each statement compressed, and only makes
+# full statements when they are asked for, for instance 2000. If None,
+# statements are always kept as they are.
+COMPACT_STATEMENTS_MIN = None
+
+# Choose the number of papers whose assembled models (as returned for
+# GET-PAPER-MODEL) the MSA keeps, keyed by PMID and the statements found for
+# the paper. If 0, models are assembled for each request.
+PAPER_MODEL_CACHE_SIZE = 100
+
+# Choose the number of processes the MSA uses to assemble the models of large
+# papers, so that their preassembly doesn't hold up other requests. If 0,
+# models are assembled in the thread handling the request.
+PREASSEMBLY_PROCESSES = 2
+
+# Choose the number of statements from which the model of a paper is
+# assembled in a separate process.
+PREASSEMBLY_PROCESS_MIN = 200
+
+# Choose the file in which the lexicon of kinases, phosphatases and
+# transcription factors, compiled from the tables distributed with INDRA, is
+# saved, so that it is not compiled again at each start, for instance
+# path.join(path.expanduser('~'), '.bioagents', 'lexicon.json'). If None, the
+# lexicon is compiled each time it is loaded.
+LEXICON_FILE = None
@@ -1,6 +1,9 @@
+from time import sleep
 from indra.statements import Agent, Phosphorylation, ModCondition, BoundCondition
 from bioagents.tests.integration import _IntegrationTest
 from bioagents import Bioagent, BioagentException
+from bioagents.deadline import check_deadline
+from bioagents.settings import TASK_DEADLINES
 from kqml import KQMLList, KQMLPerformative
 
 
@@ -45,6 +48,102 @@ class TestErrorHandling(_IntegrationTest):
              % output.get('reason'))
 
 
+class TestBatch(_IntegrationTest):
+    def __init__(self, *args):
+        class FindMe(BioagentException):
+            pass
+
+        class TestAgent(Bioagent):
+            name = 'test'
+            tasks = ['TEST', 'FAIL']
+            parallel_safe_tasks = ['TEST']
+
+            def receive_request(self, msg, content):
+                try:
+                    Bioagent.receive_request(self, msg, content)
+                    return
+                except FindMe:
+                    reply_content = self.make_failure('FOUND-IT')
+                    self.reply_with_content(msg, reply_content)
+                    return
+
+            def respond_test(self, content):
+                msg = KQMLList('SUCCESS')
+                msg.sets('echo', content.gets('value'))
+                return msg
+
+            def respond_fail(self, content):
+                raise FindMe()
+
+        super().__init__(TestAgent)
+
+    def create_message(self):
+        requests = KQMLList()
+        for value in ['a', 'b']:
+            sub_content = KQMLList('TEST')
+            sub_content.sets('value', value)
+            requests.append(sub_content)
+        requests.append(KQMLList('FAIL'))
+        requests.append(KQMLList('NOT-A-TASK'))
+        content = KQMLList('BATCH')
+        content.set('requests', requests)
+        msg = KQMLPerformative('REQUEST')
+        msg.set('content', content)
+        return msg, content
+
+    def check_response_to_message(self, output):
+        assert output.head() == 'SUCCESS', output
+        results = output.get('results')
+        assert len(results) == 4, results
+        assert results[0].gets('echo') == 'a'
+        assert results[1].gets('echo') == 'b'
+        assert results[2].head() == 'FAILURE'
+        assert results[2].gets('reason') == 'FOUND-IT'
+        assert results[3].gets('reason') == 'UNKNOWN_TASK'
+
+
+class TestDeadline(_IntegrationTest):
+    def __init__(self, *args):
+        class TestAgent(Bioagent):
+            name = 'test'
+            tasks = ['TEST']
+            task_deadlines = {'TEST': 0.05}
+
+            def respond_test(self, content):
+                sleep(0.1)
+                check_deadline()
+                return KQMLList('SUCCESS')
+
+        super().__init__(TestAgent)
+
+    def create_message(self):
+        content = KQMLList('TEST')
+        msg = KQMLPerformative('REQUEST')
+        msg.set('content', content)
+        return msg, content
+
+    def check_response_to_message(self, output):
+        assert output.head() == 'FAILURE', output
+        assert output.gets('reason') == 'TIMEOUT', output
+
+
+def test_task_deadline_settings():
+    class TestAgent(Bioagent):
+        name = 'test'
+        tasks = ['TEST', 'OTHER']
+        task_deadlines = {'TEST': 5}
+
+    assert TestAgent(testing=True).task_deadlines == {'TEST': 5}
+    TASK_DEADLINES['test'] = {'OTHER': 10}
+    try:
+        agent = TestAgent(testing=True)
+    finally:
+        del TASK_DEADLINES['test']
+    assert agent.task_deadlines == {'TEST': 5, 'OTHER': 10}
+    # The defaults of the class are left as they were.
+    assert TestAgent.task_deadlines == {'TEST': 5}
+
+
 def test_family_resolve_failure():
     ag = Agent('AKT', db_refs={'FPLX': 'AKT'})
     msg = Bioagent.make_resolve_family_failure(ag)
@@ -77,3 +176,41 @@ def test_cljson_stmt():
     cj = Bioagent.make_cljson(stmt)
     stmt2 = Bioagent.get_statement(cj)
     assert stmt.equals(stmt2)
+
+
+def test_cljson_cache():
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    map2k1 = Agent('MAP2K1', db_refs={'HGNC': '6840'})
+    stmt = Phosphorylation(braf, map2k1)
+    hits = Bioagent.to_cljson_cache.hits
+    cj = Bioagent.make_cljson(stmt)
+    cj2 = Bioagent.make_cljson(stmt)
+    assert cj2.to_string() == cj.to_string()
+    assert Bioagent.to_cljson_cache.hits == hits + 1
+
+    # Changing the cl-json of a reply doesn't change the cached cl-json.
+    cj2.set('type', 'changed')
+    assert Bioagent.make_cljson(stmt).to_string() == cj.to_string()
+
+    # A changed Statement, once rehashed, must not get the cl-json of its
+    # old self.
+    stmt.residue = 'S'
+    stmt.get_hash(refresh=True)
+    cj3 = Bioagent.make_cljson(stmt)
+    assert cj3 is not cj
+    assert Bioagent.get_statement(cj3).residue == 'S'
+
+    # Decoding the same cl-json twice gives equal, but separate, objects.
+    stmt2 = Bioagent.get_statement(cj3)
+    stmt3 = Bioagent.get_statement(cj3)
+    assert stmt2 is not stmt3
+    assert stmt2.equals(stmt3)
+
+
+def test_cljson_cache_list():
+    agents = [Agent('BRAF', db_refs={'HGNC': '1097'}),
+              Agent('MAP2K1', db_refs={'HGNC': '6840'})]
+    cj = Bioagent.make_cljson(agents)
+    assert len(cj) == 2
+    agents2 = Bioagent.get_agent(cj)
+    assert [ag.name for ag in agents2] == ['BRAF', 'MAP2K1']
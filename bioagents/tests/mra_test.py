@@ -1,4 +1,5 @@
 import json
+import time
 import unittest
 import xml.etree.ElementTree as ET
 from kqml.kqml_list import KQMLList
@@ -9,6 +10,7 @@ from bioagents.tests.integration import _IntegrationTest, _FailureTest
 from bioagents.mra.mra import MRA, make_influence_map, make_contact_map
 from bioagents.mra.mra_module import MRA_Module, ekb_from_agent, get_target, \
     _get_matching_stmts, CAN_CHECK_STATEMENTS, InvalidModelDescriptionError
+from bioagents.deadline import request_deadline
 from nose.plugins.skip import SkipTest
 from nose.plugins.attrib import attr
 
@@ -168,6 +170,36 @@ def test_respond_build_model_from_json():
     assert(reply.get('model-id') == '1')
 
 
+def test_respond_build_model_past_deadline():
+    mm = MRA_Module(testing=True)
+    told = []
+    mm.tell = told.append
+    st = sts.Phosphorylation(sts.Agent('MEK'), sts.Agent('ERK'))
+    msg = KQMLList('BUILD-MODEL')
+    msg.sets('description', json.dumps(sts.stmts_to_json([st])))
+    msg.sets('format', 'indra_json')
+    # No diagrams are made once the deadline has passed, but the model is
+    # still returned.
+    with request_deadline(time.time() - 1):
+        reply = mm.respond_build_model(msg)
+    assert(reply.get('model'))
+    assert(reply.get('diagram') is None)
+    assert(not [content for content in told
+                if content.head() in ('display-sbgn', 'display-image')])
+
+
+def test_send_display_model_skips_missing():
+    mm = MRA_Module(testing=True)
+    told = []
+    mm.tell = told.append
+    mm.send_display_model({'reactionnetwork': '/tmp/rxn.png',
+                           'contactmap': None, 'influencemap': None,
+                           'sbgn': None})
+    assert(len(told) == 1)
+    assert(told[0].head() == 'display-image')
+    assert(told[0].gets('path') == '/tmp/rxn.png')
+
+
 def test_respond_expand_model_from_json():
     mm = MRA_Module(testing=True)
     st = stmts_json_from_text('MEK phosphorylates ERK')
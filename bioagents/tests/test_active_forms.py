@@ -0,0 +1,74 @@
+import os
+import tempfile
+from indra.statements import Agent, ActiveForm, ModCondition
+from bioagents.msa.active_forms import ActiveFormIndex
+
+
+def _active_form(name, hgnc_id, residue, position, is_active=True):
+    agent = Agent(name, db_refs={'HGNC': hgnc_id},
+                  mods=[ModCondition('phosphorylation', residue, position)])
+    return ActiveForm(agent, 'kinase', is_active)
+
+
+def _make_index():
+    stmts = [_active_form('MAP2K1', '6840', 'S', '218'),
+             _active_form('MAP2K1', '6840', 'S', '222'),
+             _active_form('MAP2K1', '6840', 'S', '218', is_active=False),
+             _active_form('MAPK1', '6871', 'T', '185'),
+             ActiveForm(Agent('MAPK1', db_refs={'HGNC': '6871'}), 'kinase',
+                        True)]
+    return ActiveFormIndex(stmts)
+
+
+def test_find_by_site():
+    index = _make_index()
+    # Statements without a phosphorylation are not indexed.
+    assert len(index) == 4
+    stmts = index.find(['6840@HGNC'], 'S', '218', 'phosphorylation',
+                       'activating')
+    assert len(stmts) == 1 and stmts[0].is_active
+    stmts = index.find(['6840@HGNC'], 'S', '218', 'phosphorylation',
+                       'inhibiting')
+    assert len(stmts) == 1 and not stmts[0].is_active
+    assert not index.find(['6871@HGNC'], 'S', '218', 'phosphorylation',
+                          'activating')
+    assert len(index.find(['6840@HGNC'])) == 3
+    assert len(index.find(residue='T', position='185',
+                          action='phosphorylation', polarity='activating')) \
+        == 1
+
+
+def test_add():
+    index = ActiveFormIndex([_active_form('MAP2K1', '6840', 'S', '218')])
+    # Statements already indexed are skipped.
+    index.add([_active_form('MAP2K1', '6840', 'S', '218'),
+               _active_form('MAP2K1', '6840', 'S', '222')])
+    assert len(index) == 2
+    assert len(index.find(['6840@HGNC'], 'S', '222', 'phosphorylation',
+                          'activating')) == 1
+
+
+def test_save_and_load():
+    index = _make_index()
+    fname = os.path.join(tempfile.mkdtemp(), 'afs.pkl')
+    index.save(fname)
+    loaded = ActiveFormIndex.from_file(fname)
+    assert len(loaded) == len(index)
+    assert len(loaded.find(['MAPK1@TEXT'], 'T', '185', 'phosphorylation',
+                           'activating')) == 1
+
+
+def test_phos_activeforms_keeps_given_statements():
+    from bioagents.msa.msa import PhosActiveforms
+    from bioagents.msa.local_index import LocalStatementIndex
+    mek1 = _active_form('MAP2K1', '6840', 'S', '218')
+    mek2 = _active_form('MAP2K2', '6842', 'S', '218')
+    finder = PhosActiveforms(Agent('MAP2K1', db_refs={'HGNC': '6840'}),
+                             index=LocalStatementIndex([mek1, mek2]),
+                             residue='S', position='218',
+                             action='phosphorylation', polarity='activating')
+    # Statements indexed for earlier pages are not kept for later ones, and
+    # those given are kept in their order.
+    assert finder._filter_stmts([mek1]) == [mek1]
+    assert finder._filter_stmts([mek2]) == [mek2]
+    assert finder._filter_stmts([mek2, mek1]) == [mek2, mek1]
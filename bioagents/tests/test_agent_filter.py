@@ -0,0 +1,11 @@
+from bioagents.msa.msa import Neighborhood
+from bioagents.tests.util import make_local_index, braf, mek, erk
+
+
+def test_agent_filter():
+    index = make_local_index()
+    finder = Neighborhood(mek, index=index, filter_agents=[braf, erk])
+    stmts = finder.get_statements()
+    assert len(stmts) == 2, stmts
+    assert {type(s).__name__ for s in stmts} == {'Phosphorylation',
+                                                'Activation'}
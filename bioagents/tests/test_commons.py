@@ -0,0 +1,13 @@
+from indra.statements import Activation, Phosphorylation
+from bioagents.msa.local_index import LocalStatementIndex
+from bioagents.msa.msa import CommonUpstreams
+from bioagents.tests.util import braf, kras, mek, erk
+
+
+def test_common_upstreams():
+    stmts = [Activation(braf, mek), Activation(kras, mek),
+             Activation(braf, erk), Phosphorylation(mek, erk)]
+    finder = CommonUpstreams(mek, erk, index=LocalStatementIndex(stmts))
+    assert finder.get_common_entities() == ['BRAF'], finder.commons
+    assert set(finder.commons['BRAF'].keys()) == {'MAP2K1', 'MAPK1'}
+    assert len(finder.get_statements()) == 2
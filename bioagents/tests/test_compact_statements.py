@@ -0,0 +1,28 @@
+from bioagents.msa.msa import Neighborhood
+from bioagents.tests.util import make_local_index, mek
+
+
+def test_compact_statements():
+    from bioagents.msa import msa
+    default = msa.COMPACT_STATEMENTS_MIN
+    msa.COMPACT_STATEMENTS_MIN = 1
+    try:
+        finder = Neighborhood(mek, index=make_local_index())
+        stmts = finder.get_statements()
+        assert len(stmts) == 3
+        assert isinstance(finder._statements, msa.CompactStatements)
+        assert len(finder.get_first_statements(2)) == 2
+        # The statements are made again from the records, and not kept.
+        again = finder.get_statements()
+        assert [s.uuid for s in again] == [s.uuid for s in stmts]
+        assert len(again[0].evidence) == len(stmts[0].evidence)
+        assert all(a is not b for a, b in zip(again, stmts))
+        third = finder.get_statements()
+        assert all(a is not b for a, b in zip(third, again))
+        assert sorted(finder.get_ev_totals().values()) == [1, 1, 3]
+        assert finder.get_stmt_types() == ['phosphorylation', 'activation']
+        assert [ag.name for ag in finder.get_other_agents()] == \
+            ['MAPK1', 'BRAF', 'KRAS']
+        assert len(finder.get_summary_stmts()) == 3
+    finally:
+        msa.COMPACT_STATEMENTS_MIN = default
@@ -0,0 +1,31 @@
+import time
+from bioagents.deadline import DeadlineExceeded, request_deadline, \
+    get_deadline, time_left, deadline_passed, check_deadline, limit_timeout
+
+
+def test_no_deadline():
+    assert get_deadline() is None
+    assert time_left() is None
+    assert not deadline_passed()
+    check_deadline()
+    assert limit_timeout(10) == 10
+
+
+def test_deadline():
+    with request_deadline(time.time() + 5):
+        assert 0 < time_left() <= 5
+        assert not deadline_passed()
+        assert limit_timeout(10) <= 5
+        assert limit_timeout(1) == 1
+    assert get_deadline() is None
+
+
+def test_passed_deadline():
+    with request_deadline(time.time() - 1):
+        assert deadline_passed()
+        assert limit_timeout(10) == 0
+        try:
+            check_deadline('testing')
+            assert False, 'Expected DeadlineExceeded.'
+        except DeadlineExceeded as e:
+            assert 'testing' in str(e)
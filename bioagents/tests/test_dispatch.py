@@ -0,0 +1,62 @@
+from time import sleep
+from threading import Event, Lock
+from bioagents.dispatch import RequestDispatcher
+
+
+def test_jobs_run_on_workers():
+    dispatcher = RequestDispatcher(2)
+    done = []
+    for idx in range(5):
+        assert dispatcher.submit('TEST', done.append, idx)
+    dispatcher.shutdown()
+    assert sorted(done) == list(range(5)), done
+
+
+def test_queue_limit():
+    dispatcher = RequestDispatcher(1, max_queue_size=1)
+    release = Event()
+    started = Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    assert dispatcher.submit('TEST', block)
+    started.wait(5)
+    # The worker is busy, so one job may wait and the next one is refused.
+    assert dispatcher.submit('TEST', block)
+    assert not dispatcher.submit('TEST', block)
+    assert dispatcher.get_queue_depth() == 1
+    release.set()
+    dispatcher.shutdown()
+
+
+def test_task_limits():
+    dispatcher = RequestDispatcher(4, task_limits={'SLOW': 1})
+    lock = Lock()
+    running = []
+    max_running = []
+
+    def job():
+        with lock:
+            running.append(1)
+            max_running.append(len(running))
+        sleep(0.05)
+        with lock:
+            running.pop()
+
+    for _ in range(4):
+        assert dispatcher.submit('SLOW', job)
+    dispatcher.shutdown()
+    assert len(max_running) == 4
+    assert max(max_running) == 1, max_running
+
+
+def test_is_worker_thread():
+    dispatcher = RequestDispatcher(1)
+    res = []
+    dispatcher.submit('TEST', lambda: res.append(
+        dispatcher.is_worker_thread()))
+    dispatcher.shutdown()
+    assert res == [True]
+    assert not dispatcher.is_worker_thread()
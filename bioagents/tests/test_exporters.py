@@ -0,0 +1,63 @@
+import io
+import os
+from indra.statements import Agent, Phosphorylation, Activation, Evidence, \
+    stmts_from_json
+from bioagents.msa.exporters import make_export_path, write_tsv, \
+    write_jsonl, read_jsonl, write_pickle, read_pickle
+
+stmts = [Phosphorylation(Agent('MAP2K1'), Agent('MAPK1'),
+                         evidence=[Evidence(source_api='reach', pmid='1234',
+                                            text='MEK phosphorylates ERK.')]),
+         Activation(Agent('BRAF'), Agent('MAP2K1'))]
+
+
+def test_tsv():
+    fh = io.StringIO()
+    assert write_tsv(iter(stmts), fh) == 2
+    lines = fh.getvalue().splitlines()
+    assert lines[0].split('\t')[1:] == ['MEK phosphorylates ERK.', '1234']
+    assert lines[1].split('\t')[1:] == ['', '']
+
+
+def test_jsonl_round_trip():
+    fh = io.StringIO()
+    assert write_jsonl(iter(stmts), fh) == 2
+    fh.seek(0)
+    loaded = stmts_from_json(list(read_jsonl(fh)))
+    assert [s.get_hash() for s in loaded] == [s.get_hash() for s in stmts]
+
+
+def test_pickle_round_trip():
+    fh = io.BytesIO()
+    assert write_pickle(iter(stmts), fh) == 2
+    fh.seek(0)
+    loaded = list(read_pickle(fh))
+    assert [s.get_hash() for s in loaded] == [s.get_hash() for s in stmts]
+
+
+def test_export_paths_are_unique():
+    fnames = [make_export_path('.pkl') for _ in range(5)]
+    try:
+        assert len(set(fnames)) == 5
+        assert all(fname.endswith('.pkl') for fname in fnames)
+    finally:
+        for fname in fnames:
+            os.remove(fname)
+
+
+def test_finder_pickles():
+    import pickle
+    from bioagents.msa.msa import Neighborhood
+    from bioagents.tests.util import make_local_index, mek
+    finder = Neighborhood(mek, index=make_local_index())
+    hashes = [s.get_hash() for s in finder.get_statements()]
+    fnames = [finder.get_pickle(), finder.get_pickle_stream()]
+    try:
+        # get_pickle pickles the list of statements.
+        with open(fnames[0], 'rb') as fh:
+            assert [s.get_hash() for s in pickle.load(fh)] == hashes
+        with open(fnames[1], 'rb') as fh:
+            assert [s.get_hash() for s in read_pickle(fh)] == hashes
+    finally:
+        for fname in fnames:
+            os.remove(fname)
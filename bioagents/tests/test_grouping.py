@@ -0,0 +1,41 @@
+from indra.statements import Agent, Phosphorylation, Activation, Complex, \
+    ActiveForm, Evidence
+from indra.util.statement_presentation import group_and_sort_statements
+from bioagents.msa.compact import CompactStatements
+from bioagents.msa.grouping import get_group_keys, get_top_groups
+from bioagents.tests.util import braf, kras, mek, erk
+
+
+def _make_statements():
+    ev = [Evidence(source_api='reach')]
+    return [Phosphorylation(mek, erk, evidence=ev * 3),
+            Activation(braf, mek, evidence=ev),
+            Activation(kras, mek, evidence=ev * 2),
+            Complex([braf, kras], evidence=ev),
+            Complex([braf, kras, mek], evidence=ev * 2),
+            ActiveForm(Agent('MAPK1', db_refs={'HGNC': '6871'}), 'kinase',
+                       True, evidence=ev)]
+
+
+def test_group_keys():
+    keys = get_group_keys(Complex([braf, kras, mek]))
+    assert len(keys) == 7, keys
+    assert ('Complex', 'BRAF', 'KRAS', 'MAP2K1') in keys
+    assert ('Complex', 'KRAS', 'BRAF') in keys
+    # A Complex of two agents is only in the groups of its ordered pairs.
+    assert set(get_group_keys(Complex([braf, kras]))) == \
+        {('Complex', 'BRAF', 'KRAS'), ('Complex', 'KRAS', 'BRAF')}
+    assert get_group_keys(Activation(braf, mek)) == \
+        [('Activation', 'BRAF', 'MAP2K1')]
+
+
+def test_top_groups():
+    stmts = _make_statements()
+    ev_totals = {stmts[0].get_hash(): 10}
+    expected = [(key, verb) for key, verb, _ in
+                group_and_sort_statements(stmts, ev_totals)]
+    assert get_top_groups(stmts, ev_totals, 3) == expected[:3]
+    assert get_top_groups(stmts, ev_totals, len(expected) + 1) == expected
+    # The records of compacted statements give the same groups.
+    records = CompactStatements(stmts).records
+    assert get_top_groups(records, ev_totals, 3) == expected[:3]
@@ -0,0 +1,46 @@
+from indra.statements import Agent, Phosphorylation
+from bioagents.msa.inflight import InFlightQueries, SharedProcessor
+from bioagents.msa.statement_cache import StaticProcessor
+
+
+def _make_processor():
+    stmt = Phosphorylation(Agent('MAP2K1', db_refs={'HGNC': '6840'}),
+                           Agent('MAPK1', db_refs={'HGNC': '6871'}))
+    stmt_hash = stmt.get_hash(shallow=True)
+    return StaticProcessor([stmt], {str(stmt_hash): 2},
+                           {stmt_hash: {'reach': 2}})
+
+
+def test_identical_queries_are_shared():
+    queries = InFlightQueries()
+    started = []
+
+    def start():
+        started.append(1)
+        return _make_processor()
+
+    processor, is_new = queries.acquire('query', start)
+    assert is_new
+    shared, is_new = queries.acquire('query', start)
+    assert not is_new
+    assert isinstance(shared, SharedProcessor)
+    assert len(started) == 1
+    assert queries.get_num_sharing('query') == 2
+    assert queries.get_stats()['coalesced'] == 1
+
+    queries.release('query')
+    assert queries.get_num_sharing('query') == 0
+    _, is_new = queries.acquire('query', start)
+    assert is_new
+    assert len(started) == 2
+
+
+def test_shared_statements_are_copies():
+    processor = _make_processor()
+    shared = SharedProcessor(processor)
+    assert not shared.is_working()
+    stmt = shared.statements[0]
+    assert stmt is not processor.statements[0]
+    assert stmt.equals(processor.statements[0])
+    assert shared.statements[0] is stmt
+    assert shared.get_ev_count(stmt) == 2
@@ -0,0 +1,31 @@
+import os
+import tempfile
+from indra.statements import Agent
+from bioagents.resources.lexicon import Lexicon
+
+
+def _make_lexicon():
+    return Lexicon({'kinase': [('BRAF', '1097'), ('MAP2K1', '6840')],
+                    'phosphatase': [('PTEN', '9588')],
+                    'transcription factor': [('TP53', None)]})
+
+
+def test_membership():
+    lexicon = _make_lexicon()
+    assert lexicon.is_of_type(Agent('BRAF'), 'kinase')
+    assert not lexicon.is_of_type(Agent('BRAF'), 'phosphatase')
+    # Agents are also found by their HGNC id.
+    assert lexicon.is_of_type(Agent('MEK1', db_refs={'HGNC': '6840'}),
+                              'kinase')
+    assert lexicon.is_of_type(Agent('TP53'), 'transcription factor')
+    assert not lexicon.is_of_type(Agent('TP53'), 'unknown type')
+    assert lexicon.get_names('kinase') == frozenset(['BRAF', 'MAP2K1'])
+
+
+def test_save_and_load():
+    lexicon = _make_lexicon()
+    fname = os.path.join(tempfile.mkdtemp(), 'lexicon.json')
+    lexicon.save(fname)
+    loaded = Lexicon.load(fname)
+    assert loaded.to_json() == lexicon.to_json()
+    assert loaded.is_of_type(Agent('PTEN'), 'phosphatase')
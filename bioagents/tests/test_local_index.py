@@ -0,0 +1,65 @@
+from indra.statements import Phosphorylation
+from bioagents.msa.msa import Neighborhood, BinaryDirected, FromSource, \
+    CommonUpstreams
+from bioagents.tests.util import make_local_index, braf, mek, erk
+
+
+def test_duplicates_are_merged():
+    index = make_local_index()
+    assert len(index.statements) == 4
+    proc = index.query(subject='6840@HGNC', stmt_type='Phosphorylation')
+    assert len(proc.statements) == 1
+    stmt = proc.statements[0]
+    assert proc.get_ev_count(stmt) == 3
+    assert proc.get_source_count(stmt) == {'reach': 2, 'sparser': 1}
+
+
+def test_roles():
+    index = make_local_index()
+    assert len(index.query(subject='6840@HGNC').statements) == 1
+    assert len(index.query(object='6840@HGNC').statements) == 2
+    assert len(index.query(agents=['6840@HGNC']).statements) == 3
+    assert len(index.query(subject='1097@HGNC',
+                           object='6840@HGNC').statements) == 1
+    # Members of complexes are neither subjects nor objects.
+    assert len(index.query(subject='KRAS@TEXT').statements) == 1
+    assert len(index.query(agents=['KRAS@TEXT']).statements) == 2
+
+
+def test_types_and_limits():
+    index = make_local_index()
+    proc = index.query(agents=['6840@HGNC'], stmt_type='Modification')
+    assert len(proc.statements) == 1
+    proc = index.query(agents=['6840@HGNC'], stmt_type='Modification',
+                       use_exact_type=True)
+    assert not proc.statements
+    proc = index.query(agents=['6840@HGNC'], max_stmts=1, ev_limit=1)
+    assert len(proc.statements) == 1
+    stmt = proc.statements[0]
+    assert isinstance(stmt, Phosphorylation), stmt
+    assert len(stmt.evidence) == 1
+    assert proc.get_ev_count(stmt) == 3
+    # The indexed statement keeps all its evidence.
+    assert len(index.statements[0].evidence) == 3
+
+
+def test_finders():
+    index = make_local_index()
+    finder = Neighborhood(mek, index=index)
+    assert len(finder.get_statements()) == 3
+    finder = BinaryDirected(braf, mek, index=index)
+    assert len(finder.get_statements()) == 1
+    finder = FromSource(mek, index=index)
+    assert len(finder.get_statements()) == 1
+    finder = CommonUpstreams(mek, erk, index=index)
+    assert finder.get_common_entities() == [], finder.commons
+
+
+def test_make_query_kwargs():
+    # The kwargs are those of the query the finder makes, so that queries can
+    # be prefetched into the statement cache.
+    index = make_local_index()
+    kwargs = FromSource.make_query_kwargs(mek, ev_limit=3, persist=False)
+    finder = FromSource(mek, index=index, ev_limit=3, persist=False)
+    assert kwargs == finder._get_query_kwargs()
+    assert kwargs['subject'] == '6840@HGNC'
@@ -0,0 +1,47 @@
+import os
+import json
+import tempfile
+from kqml import KQMLList
+from bioagents.metrics import TaskStats
+
+
+def test_task_latency_and_errors():
+    stats = TaskStats('test')
+    start = stats.start_task('FOO')
+    assert stats.get_stats()['tasks']['FOO']['in_flight'] == 1
+    stats.finish_task('FOO', start, KQMLList('SUCCESS'))
+    start = stats.start_task('FOO')
+    failure = KQMLList('FAILURE')
+    failure.set('reason', 'MISSING_TARGET')
+    stats.finish_task('FOO', start, failure)
+    start = stats.start_task('FOO')
+    stats.finish_task('FOO', start, error='ValueError')
+
+    foo = stats.get_stats()['tasks']['FOO']
+    assert foo['count'] == 3, foo
+    assert foo['in_flight'] == 0, foo
+    assert foo['errors'] == {'MISSING_TARGET': 1, 'ValueError': 1}, foo
+    assert sum(b['count'] for b in foo['latency_histogram']) == 3
+    assert foo['p50_latency'] is not None
+    assert foo['max_latency'] >= 0
+
+
+def test_reply_sizes():
+    stats = TaskStats('test')
+    stats.record_reply('FOO', 10)
+    stats.record_reply('FOO', 30)
+    foo = stats.get_stats()['tasks']['FOO']
+    assert foo['num_replies'] == 2
+    assert foo['mean_reply_size'] == 20
+    assert foo['max_reply_size'] == 30
+
+
+def test_dump():
+    stats = TaskStats('test')
+    stats.record_reply('FOO', 10)
+    fname = os.path.join(tempfile.mkdtemp(), 'stats.json')
+    stats.dump(fname)
+    with open(fname, 'r') as f:
+        dumped = json.load(f)
+    assert dumped['agent'] == 'test'
+    assert 'FOO' in dumped['tasks']
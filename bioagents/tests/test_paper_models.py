@@ -0,0 +1,38 @@
+from indra.statements import Agent, Phosphorylation, Activation
+from bioagents.msa import paper_models
+from bioagents.msa.paper_models import PaperModels, get_paper_model_key
+
+stmts = [Phosphorylation(Agent('MAP2K1'), Agent('MAPK1')),
+         Activation(Agent('BRAF'), Agent('MAP2K1'))]
+
+
+def test_paper_model_key():
+    assert get_paper_model_key('1234', stmts) == \
+        get_paper_model_key('1234', stmts[::-1])
+    assert get_paper_model_key('1234', stmts) != \
+        get_paper_model_key('1234', stmts[:1])
+    assert get_paper_model_key('1234', stmts) != \
+        get_paper_model_key('5678', stmts)
+
+
+def test_models_are_cached():
+    assembled = []
+
+    def assemble(stmts):
+        assembled.append(stmts)
+        return len(stmts), {'sbgn': '<sbgn/>'}
+
+    assemble_paper_model = paper_models.assemble_paper_model
+    paper_models.assemble_paper_model = assemble
+    try:
+        models = PaperModels(num_processes=0)
+        assert models.get_model('1234', stmts) == (2, {'sbgn': '<sbgn/>'})
+        assert models.get_model('1234', stmts[::-1]) == \
+            (2, {'sbgn': '<sbgn/>'})
+        assert len(assembled) == 1
+        # New statements for a paper are assembled again.
+        models.get_model('1234', stmts[:1])
+        assert len(assembled) == 2
+        assert models.get_stats()['cache']['hits'] == 1
+    finally:
+        paper_models.assemble_paper_model = assemble_paper_model
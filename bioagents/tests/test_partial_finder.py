@@ -0,0 +1,83 @@
+from bioagents.msa.statement_cache import StaticProcessor
+from bioagents.msa.msa import Neighborhood
+from bioagents.msa.msa_module import MSA_Module
+from bioagents.tests.util import make_local_index, mek
+
+
+class _WorkingProcessor(StaticProcessor):
+    """A processor that has found some statements and is still working."""
+    def is_working(self):
+        return True
+
+    def wait_until_done(self, timeout=None):
+        return False
+
+
+class _WorkingIndex(object):
+    def __init__(self, index):
+        self.index = index
+
+    def query(self, **kwargs):
+        processor = self.index.query(**kwargs)
+        return _WorkingProcessor(processor.statements[:1],
+                                 processor.get_ev_counts(),
+                                 processor.get_source_counts())
+
+
+class _FinishingProcessor(StaticProcessor):
+    """A processor that finds the rest of its statements when waited on."""
+    def __init__(self, statements, rest, ev_counts, source_counts):
+        super(_FinishingProcessor, self).__init__(statements, ev_counts,
+                                                  source_counts)
+        self._rest = rest
+
+    def is_working(self):
+        return bool(self._rest)
+
+    def wait_until_done(self, timeout=None):
+        self.statements += self._rest
+        self._rest = []
+        return True
+
+
+class _FinishingIndex(object):
+    def __init__(self, index):
+        self.index = index
+
+    def query(self, **kwargs):
+        processor = self.index.query(**kwargs)
+        return _FinishingProcessor(processor.statements[:1],
+                                   processor.statements[1:],
+                                   processor.get_ev_counts(),
+                                   processor.get_source_counts())
+
+
+def test_partial_finder():
+    finder = Neighborhood(mek, index=_WorkingIndex(make_local_index()))
+    assert not finder.is_complete()
+    assert finder.get_statements(block=False) is None
+    partial = finder.get_partial_finder()
+    assert not partial.is_complete()
+    assert len(partial.get_statements()) == 1
+    assert [ag.name for ag in partial.get_other_agents()] == ['MAPK1']
+    assert 'MAPK1' in partial.describe()
+
+    finder = Neighborhood(mek, index=make_local_index())
+    assert finder.is_complete()
+    assert finder.get_partial_finder() is finder
+
+
+def test_partial_then_full_provenance():
+    msa = MSA_Module(testing=True)
+    sent = []
+
+    def send_provenance_for_stmts(stmts, for_what, **kwargs):
+        sent.append((len(stmts), for_what))
+
+    msa.send_provenance_for_stmts = send_provenance_for_stmts
+    finder = Neighborhood(mek, index=_FinishingIndex(make_local_index()))
+    msa._send_display_stmts(finder, 'what interacts with MEK')
+    # The statements found so far are shown first, then all of them once the
+    # query is done.
+    assert sent == [(1, 'what interacts with MEK (partial results)'),
+                    (3, 'what interacts with MEK')], sent
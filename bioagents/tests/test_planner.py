@@ -0,0 +1,86 @@
+import os
+import tempfile
+from indra.statements import Agent, Phosphorylation, Activation, Evidence
+from bioagents.msa.planner import QueryPlanner
+from bioagents.msa.statement_cache import StatementCache, StaticProcessor, \
+    make_query_key
+
+mek = Agent('MAP2K1', db_refs={'HGNC': '6840'})
+erk = Agent('MAPK1', db_refs={'HGNC': '6871'})
+braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+
+
+def _make_planner():
+    stmts = [Phosphorylation(mek, erk, evidence=[Evidence(source_api='reach')]),
+             Activation(mek, erk, evidence=[Evidence(source_api='reach')]),
+             Activation(braf, mek, evidence=[Evidence(source_api='reach')])]
+    hashes = [stmt.get_hash(shallow=True) for stmt in stmts]
+    processor = StaticProcessor(stmts, {str(h): 5 for h in hashes},
+                                {h: {'reach': 5} for h in hashes})
+    cache = StatementCache(os.path.join(tempfile.mkdtemp(), 'stmts.db'))
+    # The complete neighborhood of MAP2K1.
+    cache.put(make_query_key({'agents': ['6840@HGNC']}), processor)
+    return QueryPlanner(cache)
+
+
+def test_subset_queries_are_served():
+    planner = _make_planner()
+    processor = planner.find({'subject': '6840@HGNC', 'persist': False,
+                              'ev_limit': 3, 'timeout': 5})
+    assert len(processor.statements) == 2
+    processor = planner.find({'subject': '6840@HGNC', 'object': '6871@HGNC',
+                              'stmt_type': 'Phosphorylation'})
+    assert len(processor.statements) == 1
+    stmt = processor.statements[0]
+    assert processor.get_ev_count(stmt) == 5
+    processor = planner.find({'object': '6840@HGNC'})
+    assert [type(s).__name__ for s in processor.statements] == ['Activation']
+    stats = planner.get_stats()
+    assert stats['served'] == 3, stats
+    assert stats['served_by'] == {'neighborhood': 3}, stats
+
+
+def test_other_queries_are_not_served():
+    planner = _make_planner()
+    # The evidence of the cached statements is limited to 10 per statement.
+    assert planner.find({'subject': '6840@HGNC', 'ev_limit': None}) is None
+    assert planner.find({'subject': '6871@HGNC'}) is None
+    assert planner.find({'agents': ['6840@HGNC']}) is None
+    assert planner.get_stats()['served'] == 0
+
+
+def test_indexes_are_reused():
+    planner = _make_planner()
+    planner.find({'subject': '6840@HGNC'})
+    planner.find({'object': '6840@HGNC'})
+    stats = planner.get_stats()['indexes']
+    assert stats['misses'] == 1 and stats['hits'] == 1, stats
+    # Looking up broader queries doesn't change the hit rate of the cache.
+    assert planner.cache.get_stats()['misses'] == 0
+    # New results for the broader query are indexed again.
+    stmt = Activation(mek, braf, evidence=[Evidence(source_api='reach')])
+    planner.cache.put(make_query_key({'agents': ['6840@HGNC']}),
+                      StaticProcessor([stmt]))
+    processor = planner.find({'subject': '6840@HGNC'})
+    assert [s.get_hash() for s in processor.statements] == [stmt.get_hash()]
+
+
+def test_short_results_without_persist_are_served():
+    from bioagents.msa import planner as planner_module
+    planner = _make_planner()
+    stmt = Activation(mek, braf, evidence=[Evidence(source_api='reach')])
+    # The first page of the neighborhood of MAPK1, as the MSA queries it.
+    planner.cache.put(make_query_key({'agents': ['6871@HGNC'],
+                                      'persist': False, 'ev_limit': 3}),
+                      StaticProcessor([stmt, Activation(erk, braf)]))
+    processor = planner.find({'subject': '6871@HGNC', 'persist': False,
+                              'ev_limit': 3})
+    assert len(processor.statements) == 1
+    # A full page may have more pages after it.
+    default = planner_module.DB_PAGE_SIZE
+    planner_module.DB_PAGE_SIZE = 2
+    try:
+        assert planner.find({'subject': '6871@HGNC', 'persist': False,
+                             'ev_limit': 3}) is None
+    finally:
+        planner_module.DB_PAGE_SIZE = default
@@ -0,0 +1,141 @@
+import os
+import time
+import tempfile
+from threading import Event
+from indra.statements import Agent, Phosphorylation, Evidence
+from bioagents.provenance import ProvenancePublisher, FileProvenanceStore, \
+    S3ProvenanceStore, LocalS3Client, make_provenance_key
+
+
+def test_reports_are_published():
+    publisher = ProvenancePublisher(2)
+    done = []
+    for idx in range(5):
+        assert publisher.publish(idx, done.append, idx)
+    publisher.shutdown()
+    assert sorted(done) == list(range(5)), done
+
+
+def test_duplicates_are_coalesced():
+    publisher = ProvenancePublisher(1)
+    release = Event()
+    started = Event()
+    done = []
+
+    def block():
+        started.set()
+        release.wait()
+
+    assert publisher.publish('block', block)
+    started.wait(5)
+    assert publisher.publish('report', done.append, 1)
+    assert not publisher.publish('report', done.append, 2)
+    release.set()
+    publisher.shutdown()
+    assert done == [1], done
+    assert publisher.get_stats()['coalesced'] == 1
+
+
+def test_full_queue_publishes_inline():
+    publisher = ProvenancePublisher(1, max_queue_size=1)
+    release = Event()
+    started = Event()
+    done = []
+
+    def block():
+        started.set()
+        release.wait()
+
+    assert publisher.publish('block', block)
+    started.wait(5)
+    assert publisher.publish('waiting', done.append, 'waiting')
+    assert publisher.publish('inline', done.append, 'inline')
+    # The last report did not fit in the queue, so it was already sent.
+    assert done == ['inline'], done
+    release.set()
+    publisher.shutdown()
+    assert done == ['inline', 'waiting'], done
+
+
+def test_shutdown_is_bounded():
+    publisher = ProvenancePublisher(1)
+    release = Event()
+    started = Event()
+    done = []
+
+    def block():
+        started.set()
+        release.wait()
+
+    assert publisher.publish('block', block)
+    started.wait(5)
+    assert publisher.publish('waiting', done.append, 'waiting')
+    start = time.time()
+    # A stuck report doesn't hold up the shutdown beyond its timeout.
+    assert publisher.shutdown(timeout=0.1) == 2
+    assert time.time() - start < 2
+    assert publisher.drop_queued() == 1
+    release.set()
+    assert publisher.shutdown() == 0
+    assert done == [], done
+
+
+def test_provenance_key():
+    st1 = Phosphorylation(Agent('MAP2K1'), Agent('MAPK1'),
+                          evidence=[Evidence(source_api='reach', text='a')])
+    st2 = Phosphorylation(Agent('MAP2K1'), Agent('MAPK1'),
+                          evidence=[Evidence(source_api='reach', text='b')])
+    key = make_provenance_key([st1], title='x')
+    assert key == make_provenance_key([st1], title='x')
+    assert key != make_provenance_key([st1], title='y')
+    assert key != make_provenance_key([st2], title='x')
+    assert key != make_provenance_key([st1], {st1.get_hash(): 5}, title='x')
+
+
+def test_file_store():
+    dirname = tempfile.mkdtemp()
+    store = FileProvenanceStore(dirname, max_size=25)
+    key_a, key_b, key_c = ['a' * 64, 'b' * 64, 'c' * 64]
+    assert store.get_link(key_a) is None
+    link = store.put(key_a, 'x' * 10)
+    assert store.get_link(key_a) == link
+    with open(link, 'r') as f:
+        assert f.read() == 'x' * 10
+    old_time = time.time() - 100
+    os.utime(link, (old_time, old_time))
+    store.put(key_b, 'y' * 10)
+    store.put(key_c, 'z' * 10)
+    # The least recently used page was removed to fit the size limit.
+    assert store.evict(force=True) == 1
+    assert store.get_link(key_a) is None
+    assert store.get_link(key_b) and store.get_link(key_c)
+
+
+def test_file_store_max_age():
+    dirname = tempfile.mkdtemp()
+    store = FileProvenanceStore(dirname, max_age=50)
+    link = store.put('a' * 64, 'x')
+    old_time = time.time() - 100
+    os.utime(link, (old_time, old_time))
+    # Files not named by a key are never evicted.
+    other = os.path.join(dirname, 'other.html')
+    with open(other, 'w') as f:
+        f.write('y')
+    os.utime(other, (old_time, old_time))
+    store.put('b' * 64, 'y')
+    assert store.evict(force=True) == 1
+    assert store.get_link('a' * 64) is None
+    assert store.get_link('b' * 64) is not None
+    assert os.path.exists(other)
+
+
+def test_local_s3_store():
+    root = tempfile.mkdtemp()
+    store = S3ProvenanceStore('bucket', 'some/prefix/', LocalS3Client(root))
+    assert store.get_link('a') is None
+    link = store.put('a', '<html></html>')
+    assert link == os.path.join(root, 'bucket', 'some', 'prefix', 'a.html')
+    assert os.path.exists(link)
+    new_store = S3ProvenanceStore('bucket', 'some/prefix/',
+                                  LocalS3Client(root))
+    assert new_store.get_link('a') == link
@@ -0,0 +1,40 @@
+from threading import Thread
+from bioagents.resources.registry import ResourceRegistry
+
+
+def test_resource_loaded_once():
+    registry = ResourceRegistry()
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {'a': 1}
+
+    registry.register('test', load)
+    assert not registry.is_loaded('test')
+    threads = [Thread(target=registry.get, args=('test',)) for _ in range(5)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert registry.get('test') is registry.get('test')
+    assert len(calls) == 1
+    assert registry.is_loaded('test')
+    assert registry.get_stats()['loaded'] == ['test']
+
+
+def test_unknown_resource():
+    registry = ResourceRegistry()
+    try:
+        registry.get('missing')
+        assert False, 'Expected a KeyError.'
+    except KeyError:
+        pass
+
+
+def test_load_all():
+    registry = ResourceRegistry()
+    registry.register('a', lambda: 1)
+    registry.register('b', lambda: 2)
+    registry.load_all()
+    assert registry.is_loaded('a') and registry.is_loaded('b')
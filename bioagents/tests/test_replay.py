@@ -0,0 +1,83 @@
+import json
+import base64
+import tempfile
+from os import path
+import requests
+from kqml import KQMLList, KQMLPerformative
+from bioagents import Bioagent
+from bioagents.replay import HttpStandIn, ReplayRunner, load_traffic, \
+    get_percentile, stop_recording_http
+
+
+class ReplayTestAgent(Bioagent):
+    name = 'ReplayTest'
+    tasks = ['TEST']
+
+    def respond_test(self, content):
+        msg = KQMLList('SUCCESS')
+        msg.sets('echo', content.gets('value'))
+        return msg
+
+
+def _make_request(value):
+    content = KQMLList('TEST')
+    content.sets('value', value)
+    msg = KQMLPerformative('request')
+    msg.set('content', content)
+    return msg, content
+
+
+def test_record_and_replay():
+    record_dir = tempfile.mkdtemp()
+    agent = ReplayTestAgent(testing=True, record_dir=record_dir)
+    try:
+        for value in ['a', 'b']:
+            agent.receive_request(*_make_request(value))
+    finally:
+        stop_recording_http()
+    traffic = load_traffic(path.join(record_dir, 'ReplayTest_kqml.jsonl'))
+    assert [item['task'] for item in traffic] == ['TEST', 'TEST']
+    assert traffic[0]['reply'].startswith('(SUCCESS')
+
+    agent = ReplayTestAgent(testing=True, num_workers=2)
+    report = ReplayRunner(agent, traffic, concurrency=2, repeat=3).run()
+    assert report['requests'] == 6, report
+    assert report['replies'] == 6, report
+    task_report = report['tasks']['TEST']
+    assert task_report['count'] == 6
+    assert task_report['p50_latency'] is not None
+    assert not task_report['errors']
+    assert task_report['mismatched_replies'] == 0
+
+
+def test_http_stand_in():
+    fname = path.join(tempfile.mkdtemp(), 'http.jsonl')
+    key = json.dumps(['GET', 'http://example.com/api', ['q=1'], None])
+    record = {'key': key, 'url': 'http://example.com/api?q=1', 'status': 200,
+              'headers': {'Content-Type': 'application/json'},
+              'content': base64.b64encode(b'{"a": 1}').decode('ascii')}
+    with open(fname, 'w') as fh:
+        fh.write(json.dumps(record) + '\n')
+    stand_in = HttpStandIn(fname, mode='replay')
+    stand_in.install()
+    try:
+        resp = requests.get('http://example.com/api', params={'q': 1,
+                                                              'api_key': 'x'})
+        assert resp.status_code == 200
+        assert resp.json() == {'a': 1}
+        try:
+            requests.get('http://example.com/other')
+            assert False, 'Expected a ConnectionError.'
+        except requests.exceptions.ConnectionError:
+            pass
+    finally:
+        stand_in.uninstall()
+    assert stand_in.num_served == 1
+    assert stand_in.num_missing == 1
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert get_percentile(values, 50) == 50
+    assert get_percentile(values, 99) == 99
+    assert get_percentile([], 50) is None
@@ -0,0 +1,100 @@
+import os
+import time
+import tempfile
+from indra.statements import Agent, Phosphorylation, Activation, Evidence
+from bioagents.msa.statement_cache import StatementCache, StaticProcessor, \
+    make_query_key
+
+
+def _make_processor():
+    stmts = [Phosphorylation(Agent('MAP2K1', db_refs={'HGNC': '6840'}),
+                             Agent('MAPK1', db_refs={'HGNC': '6871'}),
+                             evidence=[Evidence(source_api='reach')]),
+             Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                        Agent('MAP2K1', db_refs={'HGNC': '6840'}))]
+    hashes = [stmt.get_hash(shallow=True) for stmt in stmts]
+    return StaticProcessor(stmts, {str(h): 3 for h in hashes},
+                           {h: {'reach': 3} for h in hashes})
+
+
+def _make_cache(**kwargs):
+    fname = os.path.join(tempfile.mkdtemp(), 'stmts.db')
+    return StatementCache(fname, **kwargs)
+
+
+def test_query_key():
+    key = make_query_key({'agents': ['MEK@FPLX', 'ERK@FPLX'], 'timeout': 10,
+                          'ev_limit': 2})
+    assert key == make_query_key({'ev_limit': 2,
+                                  'agents': ['ERK@FPLX', 'MEK@FPLX']})
+    assert key != make_query_key({'agents': ['MEK@FPLX', 'ERK@FPLX'],
+                                  'ev_limit': 3})
+    assert make_query_key({'subject': 'MEK@FPLX', 'agents': []}) == \
+        make_query_key({'subject': 'MEK@FPLX', 'object': None})
+    # Default values are the same as no values.
+    assert make_query_key({'subject': 'MEK@FPLX', 'persist': True,
+                           'ev_limit': 10, 'tries': 3}) == \
+        make_query_key({'subject': 'MEK@FPLX'})
+
+
+def test_round_trip():
+    cache = _make_cache()
+    processor = _make_processor()
+    assert cache.get('query') is None
+    cache.put('query', processor)
+    cached = cache.get('query')
+    assert not cached.is_working()
+    assert [s.get_hash(shallow=True) for s in cached.statements] == \
+        [s.get_hash(shallow=True) for s in processor.statements]
+    for stmt in cached.statements:
+        assert cached.get_ev_count(stmt) == 3
+        assert cached.get_source_count(stmt) == {'reach': 3}
+    stats = cache.get_stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1, stats
+    assert stats['entries'] == 1, stats
+
+
+def test_expired_entries_are_not_used():
+    cache = _make_cache(ttl=0.1)
+    cache.put('query', _make_processor())
+    assert cache.get('query') is not None
+    time.sleep(0.2)
+    assert cache.get('query') is None
+    stats = cache.get_stats()
+    assert stats['expirations'] == 1 and stats['entries'] == 0, stats
+
+
+def test_least_recently_used_are_evicted():
+    cache = _make_cache()
+    cache.put('first', _make_processor())
+    size = cache.get_stats()['size']
+    # There is room for two entries, even if their compressed sizes differ a
+    # little, but not for three.
+    cache.max_size = int(2.5 * size)
+    cache.put('second', _make_processor())
+    assert cache.get('first') is not None
+    cache.put('third', _make_processor())
+    assert cache.get('second') is None
+    assert cache.get('first') is not None
+    assert cache.get('third') is not None
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_merge_results():
+    processor = _make_processor()
+    other = _make_processor()
+    processor.merge_results(other)
+    assert len(processor.statements) == 2
+
+
+def test_prefetch_hits():
+    cache = _make_cache()
+    cache.put('prefetched', _make_processor(), prefetched=True)
+    cache.put('asked', _make_processor())
+    assert cache.contains('prefetched')
+    assert cache.get_stats()['hits'] == 0
+    assert cache.get('prefetched') is not None
+    assert cache.get('prefetched') is not None
+    assert cache.get('asked') is not None
+    stats = cache.get_stats()
+    assert stats['prefetch_hits'] == 1 and stats['hits'] == 3, stats
@@ -0,0 +1,26 @@
+from indra.statements import Phosphorylation
+from bioagents.msa.msa import Neighborhood
+from bioagents.tests.util import make_local_index, mek
+
+
+def test_statement_metadata():
+    finder = Neighborhood(mek, index=make_local_index())
+    metadata = finder.get_metadata()
+    assert len(metadata) == 3
+    assert metadata is finder.get_metadata()
+    assert sorted(finder.get_ev_totals().values()) == [1, 1, 3]
+    assert finder.get_stmt_types() == ['phosphorylation', 'activation']
+    assert [ag.name for ag in finder.get_other_agents()] == \
+        ['MAPK1', 'BRAF', 'KRAS']
+    assert len(finder.get_summary_stmts()) == 3
+
+
+def test_top_summaries():
+    finder = Neighborhood(mek, index=make_local_index())
+    agents = [ag.name for ag in finder.get_other_agents()]
+    assert [ag.name for ag in finder.get_other_agents(limit=2)] == agents[:2]
+    assert finder.get_stmt_types(limit=1) == ['phosphorylation']
+    stmts = finder.get_summary_stmts(num=1)
+    assert len(stmts) == 1
+    assert isinstance(stmts[0], Phosphorylation), stmts
+    assert [ag.name for ag in stmts[0].agent_list()] == ['MAP2K1', 'MAPK1']
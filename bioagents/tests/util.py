@@ -4,9 +4,11 @@ from collections import OrderedDict
 import xml.etree.ElementTree as ET
 from kqml import KQMLString, KQMLPerformative
 from indra.sources import trips
-from indra.statements import stmts_to_json
+from indra.statements import Agent, Phosphorylation, Activation, Complex, \
+    Evidence, stmts_to_json
 from bioagents import Bioagent
 from bioagents.ekb import set_cell_line_context, get_cell_line
+from bioagents.msa.local_index import LocalStatementIndex
 
 
 def ekb_from_text(text):
@@ -79,6 +81,29 @@ def get_request(content):
     return msg
 
 
+def _grounded_agent(name, hgnc_id):
+    return Agent(name, db_refs={'HGNC': hgnc_id, 'TEXT': name})
+
+
+# Agents of the statements in the local index made by make_local_index.
+braf = _grounded_agent('BRAF', '1097')
+kras = _grounded_agent('KRAS', '6407')
+mek = _grounded_agent('MAP2K1', '6840')
+erk = _grounded_agent('MAPK1', '6871')
+
+
+def make_local_index():
+    """Make a LocalStatementIndex of a few statements about MEK."""
+    stmts = [Phosphorylation(mek, erk,
+                             evidence=[Evidence(source_api='reach'),
+                                       Evidence(source_api='sparser')]),
+             Phosphorylation(mek, erk, evidence=[Evidence(source_api='reach')]),
+             Activation(braf, mek, evidence=[Evidence(source_api='reach')]),
+             Activation(kras, mek, evidence=[Evidence(source_api='trips')]),
+             Complex([braf, kras], evidence=[Evidence(source_api='bel')])]
+    return LocalStatementIndex(stmts)
+
+
 cache_file = os.path.join(os.path.dirname(os.path.abspath(__file__)),
                           'ekb_cache.json')
 
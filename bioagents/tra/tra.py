@@ -18,15 +18,12 @@ import indra.statements as ist
 import indra.assemblers.pysb.assembler as pa
 from indra.assemblers.english import assembler as english_assembler
 from pysb import Observable
-from pysb.integrate import Solver
 from pysb.export.kappa import KappaExporter
 from pysb.core import ComponentDuplicateNameError
 import bioagents.tra.model_checker as mc
-import matplotlib
 from bioagents import BioagentException, get_img_path
-
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from bioagents.deadline import DeadlineExceeded, check_deadline, \
+    deadline_passed
 
 
 logger = logging.getLogger('TRA')
@@ -162,6 +159,7 @@ class TRA(object):
         return res, fig_path
 
     def plot_compare_conditions(self, ts, results, agent, obs_name):
+        plt = _get_pyplot()
         plt.figure()
         plt.ion()
         plt.plot(ts, results[0][:len(ts)], label='Without condition')
@@ -176,16 +174,16 @@ class TRA(object):
         return fig_path
 
     def plot_results(self, results, agent, obs_name, thresh=50):
+        from matplotlib.patches import Rectangle
+        plt = _get_pyplot()
         plt.figure()
         plt.ion()
         max_val_lim = max(max((numpy.max(results[0][1][obs_name]) + 0.25*numpy.max(results[0][1][obs_name])), 101.0),
                           thresh)
         max_time = max([result[0][-1] for result in results])
-        lr = matplotlib.patches.Rectangle((0, 0), max_time, thresh, color='red',
-                                          alpha=0.1)
-        hr = matplotlib.patches.Rectangle((0, thresh), max_time,
-                                          max_val_lim-thresh,
-                                          color='green', alpha=0.1)
+        lr = Rectangle((0, 0), max_time, thresh, color='red', alpha=0.1)
+        hr = Rectangle((0, thresh), max_time, max_val_lim-thresh,
+                       color='green', alpha=0.1)
         ax = plt.gca()
         ax.add_patch(lr)
         ax.add_patch(hr)
@@ -209,6 +207,7 @@ class TRA(object):
         self.sol = None
         results = []
         for i in range(num_sim):
+            check_deadline('running simulation %d of %d' % (i+1, num_sim))
             # Apply molecular condition to model
             try:
                 model_sim = self.condition_model(model, conditions)
@@ -224,6 +223,8 @@ class TRA(object):
                 try:
                     tspan, yobs = self.simulate_kappa(model_sim, max_time,
                                                       plot_period)
+                except DeadlineExceeded:
+                    raise
                 except Exception as e:
                     logger.exception(e)
                     raise SimulatorError('Kappa simulation failed.')
@@ -277,6 +278,11 @@ class TRA(object):
             is_running = status_json.get('simulation_progress_is_running')
             if not is_running:
                 break
+            elif deadline_passed():
+                # Stop the simulation so it doesn't keep using the simulator.
+                self.kappa.reset_project()
+                raise DeadlineExceeded('The deadline of the request passed '
+                                       'during a Kappa simulation.')
             else:
                 if status_json.get('time_percentage') is not None:
                     logger.info(
@@ -290,11 +296,21 @@ class TRA(object):
     def simulate_odes(self, model_sim, max_time, plot_period):
         ts = numpy.linspace(0, max_time, int(1.0*max_time/plot_period) + 1)
         if self.sol is None:
+            from pysb.integrate import Solver
             self.sol = Solver(model_sim, ts)
         self.sol.run()
         return ts, self.sol.yobs
 
 
+def _get_pyplot():
+    # Matplotlib is slow to import, so it is only imported once a plot is
+    # made.
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
 def get_ltl_from_pattern(pattern, obs):
     if not pattern.pattern_type:
         return None
@@ -1,6 +1,7 @@
 import sys
 import json
 import logging
+from threading import Lock
 from kqml import KQMLList, KQMLPerformative
 from indra.assemblers.pysb import assembler as pysb_assembler
 from indra.assemblers.pysb import PysbAssembler
@@ -29,7 +30,9 @@ def get_bool_arg(arg_name, kwargs, default=True):
 
 class TRA_Module(Bioagent):
     name = "TRA"
-    tasks = ['SATISFIES-PATTERN', 'MODEL-COMPARE-CONDITIONS']
+    # Simulations are slow and use a single simulator, so we handle one
+    # request per task at a time.
+    tasks = [('SATISFIES-PATTERN', 1), ('MODEL-COMPARE-CONDITIONS', 1)]
 
     def __init__(self, **kwargs):
         use_kappa = get_bool_arg('use_kappa', kwargs, default=False)
@@ -40,6 +43,9 @@ class TRA_Module(Bioagent):
             logger.warning('You have chosen to not use Kappa.')
 
         self.tra = tra.TRA(use_kappa, use_kappa_rest)
+        # The TRA keeps simulator state, so simulations for different tasks
+        # must not run at the same time.
+        self._tra_lock = Lock()
         super(TRA_Module, self).__init__(**kwargs)
         return
 
@@ -86,8 +92,10 @@ class TRA_Module(Bioagent):
                 return reply_content
 
         try:
-            sat_rate, num_sim, suggestion_kqml, suggestion_obj, fig_path = \
-                self.tra.check_property(model, pattern, conditions)
+            with self._tra_lock:
+                sat_rate, num_sim, suggestion_kqml, suggestion_obj, \
+                    fig_path = self.tra.check_property(model, pattern,
+                                                       conditions)
         except tra.MissingMonomerError as e:
             logger.exception(e)
             reply_content = self.make_failure('MODEL_MISSING_MONOMER')
@@ -143,9 +151,10 @@ class TRA_Module(Bioagent):
             logger.info('Checking %s against %s with polarity %s' %
                         (condition_agent, target_agent, up_dn))
 
-            result, fig_path = \
-                self.tra.compare_conditions(model, condition_agent,
-                                            target_agent, up_dn)
+            with self._tra_lock:
+                result, fig_path = \
+                    self.tra.compare_conditions(model, condition_agent,
+                                                target_agent, up_dn)
         except tra.MissingMonomerError as e:
             logger.exception(e)
             reply_content = self.make_failure('MODEL_MISSING_MONOMER')
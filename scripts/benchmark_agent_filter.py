@@ -0,0 +1,100 @@
+"""Measure how long the MSA takes to filter statements to some agents.
+
+Random statements about one agent, as found for its neighborhood, are
+filtered to a number of other agents with the AgentFilter, and with the previous implementation of the filter,
+which looped over the filter agents for each statement. For example:
+
+    python scripts/benchmark_agent_filter.py --stmts 50000 --filter-agents 20
+"""
+import time
+import random
+import argparse
+from statistics import median
+
+from indra.statements import Agent, Activation, Phosphorylation, Complex
+
+from bioagents.msa.local_index import LocalStatementIndex
+from bioagents.msa.msa import Neighborhood
+
+
+def make_statements(num_stmts, num_agents, seed=0):
+    """Make random statements, each of which involves the first agent."""
+    rng = random.Random(seed)
+    agents = [Agent('GENE%d' % idx, db_refs={'HGNC': str(idx),
+                                             'TEXT': 'GENE%d' % idx})
+              for idx in range(num_agents)]
+    stmts = []
+    for _ in range(num_stmts):
+        other = agents[rng.randrange(1, num_agents)]
+        stmt_type = rng.choice([Activation, Phosphorylation, Complex])
+        if stmt_type is Complex:
+            stmt = Complex([agents[0], other])
+        elif rng.random() < 0.5:
+            stmt = stmt_type(agents[0], other)
+        else:
+            stmt = stmt_type(other, agents[0])
+        stmts.append(stmt)
+    return agents, stmts
+
+
+def filter_by_loops(finder, stmts):
+    """The implementation of the filter before the AgentFilter."""
+    filtered_stmts = []
+    for stmt in stmts:
+        for filter_agent in finder.query.filter_agents:
+            dbi, dbn = finder.query.get_agent_grounding(filter_agent)
+            for agent in finder.get_other_agents_for_stmt(
+                    stmt, list(finder.query.entities.values())):
+                if agent is None:
+                    continue
+                if agent.db_refs.get(dbn) == dbi:
+                    filtered_stmts.append(stmt)
+                    break
+            else:
+                continue
+            break
+    return filtered_stmts
+
+
+def time_it(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        res = func()
+        times.append(time.time() - start)
+    return median(times), res
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stmts', type=int, default=20000,
+                        help='The number of statements in the neighborhood.')
+    parser.add_argument('--agents', type=int, default=2000,
+                        help='The number of distinct agents.')
+    parser.add_argument('--filter-agents', type=int, default=10,
+                        help='The number of agents to filter to.')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='The number of runs to take the median of.')
+    args = parser.parse_args()
+
+    agents, all_stmts = make_statements(args.stmts, args.agents)
+    # The finder only provides the query, the statements are filtered as they
+    # are, including repeated ones.
+    filter_agents = agents[1:args.filter_agents + 1]
+    finder = Neighborhood(agents[0], index=LocalStatementIndex(all_stmts),
+                          filter_agents=filter_agents)
+    print('Filtering %d statements to %d agents.'
+          % (len(all_stmts), len(filter_agents)))
+
+    loop_time, loop_res = time_it(lambda: filter_by_loops(finder, all_stmts),
+                                  args.repeat)
+    index_time, index_res = \
+        time_it(lambda: finder._filter_stmts_for_agents(all_stmts),
+                args.repeat)
+    assert [id(s) for s in loop_res] == [id(s) for s in index_res], \
+        'The filters selected different statements.'
+    print('Kept %d statements.' % len(index_res))
+    print('%-12s %10s' % ('filter', 'median (s)'))
+    print('%-12s %10.4f' % ('loops', loop_time))
+    print('%-12s %10.4f' % ('indexed', index_time))
+    print('Speedup: %.1fx' % (loop_time / index_time if index_time else 0))
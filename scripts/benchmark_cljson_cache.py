@@ -0,0 +1,59 @@
+"""Measure how long agents take to get the cl-json of Agents and Statements.
+
+The cl-json is made by converting the JSON of the entity each time, and by
+Bioagent.make_cljson once the entity is in its cache, which makes a key for
+the entity and copies the lists of the cached cl-json. For example:
+
+    python scripts/benchmark_cljson_cache.py --evidence 20 --repeat 5000
+"""
+import time
+import argparse
+
+from indra.statements import Agent, Phosphorylation, Evidence, ModCondition
+
+from bioagents import Bioagent
+
+
+def make_entities(num_evidence):
+    """Make an Agent and a Statement like those in the replies of agents."""
+    agent = Agent('MAP2K1', db_refs={'HGNC': '6840', 'UP': 'Q02750',
+                                     'TEXT': 'MEK1'},
+                  mods=[ModCondition('phosphorylation', 'S', '218')])
+    evidence = [Evidence(source_api='reach', pmid=str(idx),
+                         text='MEK1 phosphorylates ERK2 (%d).' % idx)
+                for idx in range(num_evidence)]
+    stmt = Phosphorylation(agent, Agent('MAPK1', db_refs={'HGNC': '6871'}),
+                           evidence=evidence)
+    return [('Agent', agent), ('Statement', stmt)]
+
+
+def time_it(func, repeat):
+    start = time.time()
+    for _ in range(repeat):
+        res = func()
+    return (time.time() - start) / repeat, res
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--evidence', type=int, default=5,
+                        help='The number of evidences of the Statement.')
+    parser.add_argument('--repeat', type=int, default=2000,
+                        help='The number of calls to take the mean of.')
+    args = parser.parse_args()
+
+    print('%-10s %15s %15s %8s' % ('entity', 'convert (us)', 'cached (us)',
+                                   'speedup'))
+    for name, entity in make_entities(args.evidence):
+        convert_time, convert_res = \
+            time_it(lambda: Bioagent.converter.cl_from_json(entity.to_json()),
+                    args.repeat)
+        # The first call puts the entity in the cache.
+        Bioagent.make_cljson(entity)
+        cached_time, cached_res = \
+            time_it(lambda: Bioagent.make_cljson(entity), args.repeat)
+        assert cached_res.to_string() == convert_res.to_string(), \
+            'The cache gave a different cl-json.'
+        print('%-10s %15.1f %15.1f %7.1fx'
+              % (name, convert_time * 1e6, cached_time * 1e6,
+                 convert_time / cached_time if cached_time else 0))
@@ -0,0 +1,99 @@
+"""Measure the time and memory the MSA takes to export statements.
+
+Random statements with evidence are exported as TSV, JSON and pickle, with the
+streaming exporters and with the previous implementations, which built the
+TSV by string concatenation, and dumped the JSON and pickle of the whole
+list. The peak memory allocated by each export is measured with tracemalloc.
+For example:
+
+    python scripts/benchmark_exporters.py --stmts 50000
+"""
+import os
+import json
+import time
+import pickle
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+from indra.statements import Agent, Activation, Phosphorylation, Evidence, \
+    stmts_to_json
+
+from bioagents.msa.exporters import write_tsv, write_jsonl, write_pickle, \
+    get_tsv_line
+
+
+def make_statements(num_stmts, num_agents, seed=0):
+    """Make random statements with one to three pieces of evidence each."""
+    rng = random.Random(seed)
+    agents = [Agent('GENE%d' % idx, db_refs={'HGNC': str(idx)})
+              for idx in range(num_agents)]
+    stmts = []
+    for idx in range(num_stmts):
+        subj, obj = rng.sample(agents, 2)
+        evidence = [Evidence(source_api='reach', pmid=str(idx),
+                             text='%s activates %s in sentence %d.'
+                                  % (subj.name, obj.name, ev_idx))
+                    for ev_idx in range(rng.randint(1, 3))]
+        stmt_type = rng.choice([Activation, Phosphorylation])
+        stmts.append(stmt_type(subj, obj, evidence=evidence))
+    return stmts
+
+
+def tsv_by_concatenation(stmts, fh):
+    """The TSV export before the streaming exporters."""
+    msg = ''
+    for stmt in stmts:
+        msg += get_tsv_line(stmt)
+    fh.write(msg)
+
+
+def json_by_list(stmts, fh):
+    """The JSON export before the streaming exporters."""
+    fh.write(json.dumps(stmts_to_json(stmts), indent=1))
+
+
+def pickle_by_list(stmts, fh):
+    """The pickle export before the streaming exporters."""
+    pickle.dump(stmts, fh)
+
+
+def measure(export, stmts, mode, dirname):
+    """Get the time and peak memory (in MB) of an export to a new file."""
+    fname = os.path.join(dirname, 'export')
+    tracemalloc.start()
+    start = time.time()
+    with open(fname, mode) as fh:
+        export(stmts, fh)
+    elapsed = time.time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    os.remove(fname)
+    return elapsed, peak / 1024**2
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stmts', type=int, default=50000,
+                        help='The number of statements to export.')
+    parser.add_argument('--agents', type=int, default=2000,
+                        help='The number of distinct agents.')
+    args = parser.parse_args()
+
+    stmts = make_statements(args.stmts, args.agents)
+    # The hashes and uuids are made once, so they aren't counted in exports.
+    stmts_to_json(stmts)
+    dirname = tempfile.mkdtemp()
+    print('Exporting %d statements.' % len(stmts))
+    print('%-8s %-10s %10s %14s' % ('format', 'exporter', 'time (s)',
+                                    'peak mem (MB)'))
+    exports = [('tsv', 'w', tsv_by_concatenation, write_tsv),
+               ('json', 'w', json_by_list, write_jsonl),
+               ('pickle', 'wb', pickle_by_list, write_pickle)]
+    for fmt, mode, previous, streaming in exports:
+        for name, export in [('previous', previous),
+                             ('streaming', streaming)]:
+            elapsed, peak = measure(export, stmts, mode, dirname)
+            print('%-8s %-10s %10.3f %14.1f' % (fmt, name, elapsed, peak))
+    os.rmdir(dirname)
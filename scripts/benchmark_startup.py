@@ -0,0 +1,125 @@
+"""Measure how long each bioagent takes to import and to become ready.
+
+Each agent module (bioagents/*/*_module.py) is imported in a fresh Python
+process, and the bioagent defined in it is then instantiated in testing mode,
+which registers and subscribes to its tasks without connecting to the
+Facilitator. The import time and the time to ready (import plus
+instantiation) are reported as the median over a number of runs.
+
+The results can be saved and used as a baseline for later runs, in which case
+the script exits with an error if any agent became slower than the baseline
+by more than the given tolerance. For example:
+
+    python scripts/benchmark_startup.py --save startup.json
+    python scripts/benchmark_startup.py --baseline startup.json
+"""
+import os
+import sys
+import glob
+import json
+import argparse
+import subprocess
+from statistics import median
+
+here = os.path.dirname(os.path.abspath(__file__))
+repo_root = os.path.abspath(os.path.join(here, os.pardir))
+
+# The code run in a fresh process for each measurement. It prints the times
+# as json on the last line of its output.
+_measure_code = """
+import sys, json, time, inspect, importlib
+start = time.time()
+module = importlib.import_module(sys.argv[1])
+import_time = time.time() - start
+from bioagents import Bioagent
+agent_classes = [cls for _, cls in inspect.getmembers(module, inspect.isclass)
+                 if issubclass(cls, Bioagent) and cls is not Bioagent
+                 and cls.__module__ == module.__name__]
+for cls in agent_classes:
+    cls(testing=True)
+ready_time = time.time() - start
+print(json.dumps({'import': import_time, 'ready': ready_time}))
+"""
+
+
+def get_agent_modules():
+    fnames = glob.glob(os.path.join(repo_root, 'bioagents', '*',
+                                    '*_module.py'))
+    modules = []
+    for fname in sorted(fnames):
+        rel = os.path.relpath(fname, repo_root)[:-len('.py')]
+        modules.append(rel.replace(os.sep, '.'))
+    return modules
+
+
+def measure(module_name, timeout=600):
+    """Return the import and ready times of a module in a fresh process."""
+    res = subprocess.run([sys.executable, '-c', _measure_code, module_name],
+                         cwd=repo_root, stdout=subprocess.PIPE,
+                         stderr=subprocess.PIPE, timeout=timeout)
+    if res.returncode != 0:
+        err = res.stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(err.splitlines()[-1] if err else 'Unknown error')
+    out_lines = res.stdout.decode('utf-8').strip().splitlines()
+    return json.loads(out_lines[-1])
+
+
+def benchmark(modules, num_runs):
+    results = {}
+    for module_name in modules:
+        runs = []
+        try:
+            for _ in range(num_runs):
+                runs.append(measure(module_name))
+        except Exception as e:
+            print('%-40s failed: %s' % (module_name, e))
+            continue
+        results[module_name] = {
+            'import': median([r['import'] for r in runs]),
+            'ready': median([r['ready'] for r in runs])
+            }
+        print('%-40s import: %6.2fs  ready: %6.2fs'
+              % (module_name, results[module_name]['import'],
+                 results[module_name]['ready']))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print regressions relative to the baseline, returning their number."""
+    num_regressions = 0
+    for module_name, times in sorted(results.items()):
+        if module_name not in baseline:
+            continue
+        for key in ('import', 'ready'):
+            old = baseline[module_name][key]
+            new = times[key]
+            if new > old * (1 + tolerance):
+                print('Regression in %s %s time: %.2fs -> %.2fs'
+                      % (module_name, key, old, new))
+                num_regressions += 1
+    return num_regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*',
+                        help='The agent modules to measure, by default all.')
+    parser.add_argument('--runs', type=int, default=3,
+                        help='The number of runs for each module.')
+    parser.add_argument('--save', help='Save the results to this json file.')
+    parser.add_argument('--baseline',
+                        help='Compare the results to this json file.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='The relative slowdown counted as a regression.')
+    args = parser.parse_args()
+
+    modules = args.modules if args.modules else get_agent_modules()
+    results = benchmark(modules, args.runs)
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump(results, fh, indent=1)
+    if args.baseline:
+        with open(args.baseline, 'r') as fh:
+            baseline = json.load(fh)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
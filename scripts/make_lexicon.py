@@ -0,0 +1,32 @@
+"""Compile the lexicon of kinases, phosphatases and transcription factors.
+
+The tables distributed with INDRA are compiled into the lexicon used by
+BioSense and the MSA, and saved as JSON in the given file, or, if none is
+given, in the LEXICON_FILE set in bioagents.settings. The agents compile the
+lexicon themselves when it is missing or out of date, so this is only needed
+to prepare it ahead of time. For example:
+
+    python scripts/make_lexicon.py --out lexicon.json
+"""
+import time
+import argparse
+
+from bioagents.settings import LEXICON_FILE
+from bioagents.resources.lexicon import Lexicon
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', default=LEXICON_FILE,
+                        required=LEXICON_FILE is None,
+                        help='The file in which the lexicon is saved.')
+    args = parser.parse_args()
+
+    start = time.time()
+    lexicon = Lexicon.build()
+    lexicon.save(args.out)
+    for ent_type in ('kinase', 'phosphatase', 'transcription factor'):
+        print('%-22s %6d names' % (ent_type,
+                                   len(lexicon.get_names(ent_type))))
+    print('Saved the lexicon to %s in %.2fs.' % (args.out,
+                                                 time.time() - start))
@@ -0,0 +1,58 @@
+"""Replay recorded KQML traffic against a bioagent to measure its load.
+
+The traffic is recorded by running the agents with the TRAFFIC_RECORD_DIR
+setting (see bioagents.replay). The agent is run in this process in testing
+mode, and the HTTP responses recorded with the traffic are served instead of
+the real services. For example:
+
+    python scripts/replay_traffic.py MSA records/MSA_kqml.jsonl \\
+        --http records/MSA_http.jsonl --concurrency 8 --workers 8
+"""
+import json
+import argparse
+
+from bioagents.host import get_agent_class
+from bioagents.replay import HttpStandIn, ReplayRunner, load_traffic, \
+    print_report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('agent', help='The name of the agent, e.g. MSA.')
+    parser.add_argument('traffic', help='The file of recorded KQML traffic.')
+    parser.add_argument('--http',
+                        help='The file of recorded HTTP responses to serve. '
+                             'If not given, the real services are used.')
+    parser.add_argument('--http-delay', type=float, default=0,
+                        help='Seconds to wait before serving each recorded '
+                             'HTTP response.')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='The number of outstanding requests.')
+    parser.add_argument('--rate', type=float,
+                        help='The number of requests started per second. By '
+                             'default, requests are sent as fast as they '
+                             'are answered.')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='The number of times to replay the traffic.')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='The number of request workers of the agent.')
+    parser.add_argument('--tasks', nargs='+',
+                        help='Only replay requests for these tasks.')
+    parser.add_argument('--json', help='Save the report to this json file.')
+    args = parser.parse_args()
+
+    if args.http:
+        HttpStandIn(args.http, mode='replay', delay=args.http_delay).install()
+    traffic = load_traffic(args.traffic)
+    if args.tasks:
+        tasks = {task.upper() for task in args.tasks}
+        traffic = [item for item in traffic if item['task'] in tasks]
+    agent_class = get_agent_class(args.agent)
+    agent = agent_class(testing=True, num_workers=args.workers)
+    runner = ReplayRunner(agent, traffic, concurrency=args.concurrency,
+                          rate=args.rate, repeat=args.repeat)
+    report = runner.run()
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(report, fh, indent=1)